@@ -0,0 +1,123 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+from services.indicators_helper import (
+    calculate_supertrend, calculate_supertrend_legacy, calculate_wma,
+    calculate_high_low
+)
+
+# =====================================================
+# CONFIG
+# =====================================================
+BAR_COUNTS = [500, 2_000, 5_000]   # bars per synthetic symbol
+REPEATS = 3                         # best-of timing
+ATR_PERIODS = [10, 1]               # 1 = no ATR warm-up, so the bands never go NaN
+SEED = 42
+
+# =====================================================
+# SYNTHETIC OHLC
+# =====================================================
+def make_ohlc(n, seed=SEED):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    spread = rng.random(n)
+    return pd.DataFrame({
+        "open": close + rng.normal(0, 0.3, n),
+        "high": close + spread,
+        "low": close - spread,
+        "close": close,
+    })
+
+def best_of(fn, *args):
+    best = float("inf")
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+# =====================================================
+# BENCHMARKS
+# =====================================================
+def bench_supertrend():
+    print("Supertrend: legacy (.iloc loops) vs supertrend_kernel")
+    for atr_period in ATR_PERIODS:
+        for n in BAR_COUNTS:
+            df = make_ohlc(n)
+
+            t_old, (st_old, dir_old) = best_of(calculate_supertrend_legacy, df, atr_period)
+            t_new, (st_new, dir_new) = best_of(calculate_supertrend, df, atr_period)
+
+            same = st_old.equals(st_new) and (dir_old.to_numpy() == dir_new.to_numpy()).all()
+            print(
+                f"  atr={atr_period:<2} {n:>6} bars | legacy {t_old * 1000:9.1f} ms | "
+                f"kernel {t_new * 1000:7.2f} ms | x{t_old / t_new:6.1f} | identical={same}"
+            )
+            if not same:
+                sys.exit(1)
+
+def wma_rolling_apply(series, period):
+    """Previous calculate_wma: one Python callback per window."""
+    weights = np.arange(1, period + 1)
+    return series.rolling(period).apply(
+        lambda x: np.dot(x, weights) / weights.sum(), raw=True
+    ).round(2)
+
+def bench_wma(period=21):
+    print(f"WMA({period}): rolling().apply(lambda) vs convolution")
+    for n in BAR_COUNTS:
+        series = make_ohlc(n)["close"]
+        series.iloc[n // 2] = np.nan   # exercise NaN handling mid-series
+
+        t_old, wma_old = best_of(wma_rolling_apply, series, period)
+        t_new, wma_new = best_of(calculate_wma, series, period)
+
+        same = wma_old.equals(wma_new)
+        print(
+            f"  {n:>6} bars | rolling.apply {t_old * 1000:8.1f} ms | "
+            f"convolve {t_new * 1000:6.2f} ms | x{t_old / t_new:6.1f} | identical={same}"
+        )
+        if not same:
+            sys.exit(1)
+
+def high_low_window_scan(df, window):
+    """Naive O(n * window) rescan of every window."""
+    high = df["high"].to_numpy()
+    low = df["low"].to_numpy()
+    n = len(df)
+    out_high = np.full(n, np.nan)
+    out_low = np.full(n, np.nan)
+    for i in range(window - 1, n):
+        out_high[i] = high[i - window + 1:i + 1].max()
+        out_low[i] = low[i - window + 1:i + 1].min()
+    return pd.Series(out_high).round(2), pd.Series(out_low).round(2)
+
+def bench_high_low(window=252):
+    print(f"Rolling {window}-bar high/low: window rescan vs monotonic deque")
+    for n in BAR_COUNTS:
+        df = make_ohlc(n)
+
+        t_old, (high_old, low_old) = best_of(high_low_window_scan, df, window)
+        t_new, (high_new, low_new) = best_of(calculate_high_low, df, window)
+
+        same = (
+            high_old.equals(high_new) and low_old.equals(low_new)
+            and high_new.equals(df["high"].rolling(window).max().round(2))
+            and low_new.equals(df["low"].rolling(window).min().round(2))
+        )
+        print(
+            f"  {n:>6} bars | rescan {t_old * 1000:8.1f} ms | "
+            f"deque {t_new * 1000:6.2f} ms | x{t_old / t_new:6.1f} | identical={same}"
+        )
+        if not same:
+            sys.exit(1)
+
+# =====================================================
+# MAIN
+# =====================================================
+if __name__ == "__main__":
+    bench_supertrend()
+    bench_wma()
+    bench_high_low()
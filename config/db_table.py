@@ -15,6 +15,10 @@ DB_CONFIG = {
     "password": "1977",
     "port": 5432
 }
+# ---------------- Connection pool ----------------
+DB_POOL_MIN = 4              # connections kept open between calls
+DB_POOL_MAX = 24             # hard cap on connections in use per process
+DB_POOL_PING_AFTER = 300     # seconds idle before a pooled connection is pinged
 SYMBOL_SOURCES = [
     ("india_equity_symbols", INDIA_EQUITY),
     ("usa_equity_symbols",   USA_EQUITY),
@@ -60,6 +64,9 @@ ASSET_TABLE_MAP = {
     "crypto":       ("crypto_symbols",          "crypto_price_data",        "crypto_indicators",        "crypto_52week_stats"),
     "forex":        ("forex_symbols",           "forex_price_data",         "forex_indicators",         "forex_52week_stats"),
 }
+FORWARD_RETURNS_TABLE_MAP = {
+    asset_type: f"{asset_type}_forward_returns" for asset_type in ASSET_TABLE_MAP
+}
 DATA_TABLES = [
     "india_equity_price_data",
     "india_equity_indicators",
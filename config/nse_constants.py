@@ -55,7 +55,41 @@ ALLOWED_INDEX_TYPES = {"india_index", "global_index"}
 # ---------------- Frequencies ----------------
 FREQUENCIES = ["1d", "1wk", "1mo"]
 
+# ---------------- Yahoo download ----------------
+YAHOO_BATCH_SIZE = 50        # tickers per yf.download call (1 = one call per symbol)
+YAHOO_MAX_WORKERS = 8        # concurrent download threads
+YAHOO_RATE_PER_SEC = 5.0     # token-bucket refill rate (ticker requests per second)
+YAHOO_MAX_RETRIES = 3        # retries per unit, exponential backoff
+YAHOO_BACKOFF_BASE = 2.0     # seconds; delay = base * 2**attempt
+YAHOO_TIMEOUT = 30           # per-request HTTP timeout in seconds
+
 # ---------------- NSE URLs ----------------
 NSE_URL_BHAV_DAILY = "https://nsearchives.nseindia.com/products/content/sec_bhavdata_full_{}.csv"
+
+# ---------------- Bhavcopy ingest ----------------
+BHAVCOPY_SERIES = ["EQ", "BE", "BZ", "SM", "ST"]   # series preference when a symbol trades in several
+BHAVCOPY_ADJUST_TOLERANCE = 0.005  # PREV_CLOSE vs stored close gap that flags a corporate action
+BHAV_MAX_WORKERS = 4         # concurrent bhavcopy downloads (one keep-alive session)
+BHAV_RATE_PER_SEC = 4.0      # token-bucket refill rate (requests per second)
+BHAV_MAX_RETRIES = 3         # retries on timeouts / 5xx / 429, exponential backoff
+BHAV_BACKOFF_BASE = 1.0      # seconds; delay = base * 2**attempt
+BHAV_TIMEOUT = 20            # per-request HTTP timeout in seconds
+BHAV_HIST_WORKERS = 8        # parser threads for the per-symbol historical archive
+
+# ---------------- Trading calendars ----------------
+# weekmask: Mon..Sun, "1" = regular session day
+# derive  : learn holidays / special sessions from the stored daily bars of `asset_types`
+CALENDAR_MARKETS = {
+    "NSE":    {"weekmask": "1111100", "derive": True,  "asset_types": ["india_equity", "india_index"]},
+    "US":     {"weekmask": "1111100", "derive": True,  "asset_types": ["usa_equity", "commodity"]},
+    "GLOBAL": {"weekmask": "1111100", "derive": False, "asset_types": ["global_index"]},
+    "CRYPTO": {"weekmask": "1111111", "derive": False, "asset_types": ["crypto"]},   # 24/7
+    "FOREX":  {"weekmask": "1111100", "derive": False, "asset_types": ["forex"]},    # 24/5
+}
+CALENDAR_START = "2000-01-01"      # first calendar day held in memory
+CALENDAR_HORIZON_DAYS = 400        # calendar days held past today
+CALENDAR_MIN_COVERAGE = 0.5        # share of the usual symbol count a date needs to be a session
+# ---------------- Symbol refresh ----------------
+SYMBOL_DEACTIVATE_MAX_PCT = 0.2    # larger share of a table dropping out of its CSV is treated as a bad file
 SNP_500 = "https://raw.githubusercontent.com/datasets/s-and-p-500-companies/master/data/constituents.csv"
 NASDAQ_100 = "https://en.wikipedia.org/wiki/Nasdaq-100"
\ No newline at end of file
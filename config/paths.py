@@ -11,6 +11,7 @@ DATA_DIR = BASE_DIR / "data"
 BHAVCOPY_DIR = DATA_DIR / "bhavcopy" / "daily"
 BHAVCOPY_DIR_HIST = DATA_DIR / "bhavcopy" / "equity_bhav_29Dec2025"
 BHAVCOPY_DIR_DB = DATA_DIR / "bhavcopy" / "equity_bhav_29Dec2025_onwards"
+BHAVCOPY_ARCHIVE_DIR = DATA_DIR / "bhavcopy" / "archive"   # <yyyy>/sec_bhavdata_full_<ddmmyyyy>.csv.gz
 # ---------------- Yahoo Directories ----------------
 YAHOO_DIR = DATA_DIR / "yahoo"
 YAHOO_SYMBOLS = YAHOO_DIR / "symbols"
@@ -21,6 +22,10 @@ SCANNER_FOLDER = DATA_DIR / "scanner_results"
 SCANNER_FOLDER_WEEKLY = SCANNER_FOLDER / "weekly"
 SCANNER_FOLDER_HM = SCANNER_FOLDER / "HM"
 SCANNER_FOLDER_PLAY = SCANNER_FOLDER / "play"
+SCANNER_FOLDER_PARAMS = SCANNER_FOLDER / "param_search"
+# ---------------- Trading calendar ----------------
+CALENDAR_DIR = DATA_DIR / "calendar"
+CALENDAR_OVERRIDES = CALENDAR_DIR / "overrides.csv"   # market,date,kind(holiday|session),note
 
 # ---------------- Database ----------------
 # DB_FILE = BASE_DIR / "db" / "markets.db"
@@ -53,7 +58,9 @@ for p in [
     BHAVCOPY_DIR,
     BHAVCOPY_DIR_HIST,
     BHAVCOPY_DIR_DB,
+    BHAVCOPY_ARCHIVE_DIR,
     SCANNER_FOLDER,
     ANALYSIS_FOLDER,
+    CALENDAR_DIR,
 ]:
     ensure_folder(p)
\ No newline at end of file
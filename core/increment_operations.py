@@ -9,7 +9,7 @@ from services.utility_service import show_latest_dates
 from services.equity_service import insert_equity_price_data_pipeline
 from services.index_service import insert_index_price_data_pipeline
 from services.asset_service import insert_asset_price_data_pipeline
-from services.indicator_service import refresh_indicators
+from services.indicator_service import refresh_indicators_incremental
 from services.weekly_monthly_service import refresh_all_week52_stats
 
 console = Console()
@@ -60,56 +60,56 @@ def action_increment_india_equity() -> None:
     clear_log()
     syms = Prompt.ask("Enter symbols (ALL or comma-separated, e.g., RELIANCE,TCS)").upper()
     console.print("[bold green]India Equity Price Data Update Start....[/bold green]")
-    insert_equity_price_data_pipeline(syms,type="india_equity",mode="incr")
+    insert_equity_price_data_pipeline(syms,asset_type="india_equity",mode="incr")
     console.print("[bold green]India Equity Price Data Update Finish....[/bold green]")
 # Menu 3
 def action_increment_usa_equity() -> None:
     clear_log()
     syms = Prompt.ask("Enter symbols (ALL or comma-separated, e.g., RELIANCE,TCS)").upper()
     console.print("[bold green]USA Equity Price Data Update Start....[/bold green]")
-    insert_equity_price_data_pipeline(syms,type="usa_equity",mode="incr")
+    insert_equity_price_data_pipeline(syms,asset_type="usa_equity",mode="incr")
     console.print("[bold green]USA Equity Price Data Update Finish....[/bold green]")
 # Menu 4
 def action_increment_india_index() -> None:
     clear_log()
     console.print("[bold green]India Index Price Data Update Start....[/bold green]")
-    insert_index_price_data_pipeline(type="india_index",mode="incr")
+    insert_index_price_data_pipeline(asset_type="india_index",mode="incr")
     console.print("[bold green]India Index Price Data Update Finish....[/bold green]") 
 # Menu 5
 def action_increment_global_index() -> None:
     clear_log()
     console.print("[bold green]USA Index Price Data Update Start....[/bold green]")
-    insert_index_price_data_pipeline(type="global_index",mode="incr")
+    insert_index_price_data_pipeline(asset_type="global_index",mode="incr")
     console.print("[bold green]USA Index Price Data Update Finish....[/bold green]")
 # Menu 6
 def action_increment_commodity() -> None:
     clear_log()
     console.print("[bold green]COMMODITY Price Data Update Start....[/bold green]") 
-    insert_asset_price_data_pipeline(type="commodity",mode="incr")
+    insert_asset_price_data_pipeline(asset_type="commodity",mode="incr")
     console.print("[bold green]COMMODITY Price Data Update Finish....[/bold green]")
 # Menu 7
 def action_increment_crypto() -> None:
     clear_log()
     console.print("[bold green]CRYPTO Price Data Update Start....[/bold green]") 
-    insert_asset_price_data_pipeline(type="crypto",mode="incr")
+    insert_asset_price_data_pipeline(asset_type="crypto",mode="incr")
     console.print("[bold green]CRYPTO Price Data Update Finish....[/bold green]")
 # Menu 8
 def action_increment_forex() -> None:
     clear_log()
     console.print("[bold green]FOREX Price Data Update Start....[/bold green]") 
-    insert_asset_price_data_pipeline(type="forex",mode="incr")
+    insert_asset_price_data_pipeline(asset_type="forex",mode="incr")
     console.print("[bold green]FOREX Price Data Update Finish....[/bold green]")
 # Menu 9
 def action_increment_indicators() -> None:
     clear_log()
     console.print("[bold green]Refresh India and USA Indicators Start....[/bold green]")
-    refresh_indicators() 
+    refresh_indicators_incremental()
     console.print("[bold green]Refresh India and USA Indicators Finish....[/bold green]")
 # Menu 10
 def action_increment_52weeks() -> None:
     clear_log()
     console.print("[bold green]Refresh India and USA 52 WEEKS Start....[/bold green]") 
-    refresh_all_week52_stats()
+    refresh_all_week52_stats(mode="incr")
     console.print("[bold green]Refresh India and USA 52 WEEKS Finish....[/bold green]") 
 # =====================================================================
 # MAIN LOOP (SCANNERS ONLY)
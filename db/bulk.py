@@ -0,0 +1,31 @@
+"""
+Bulk-write helpers shared by the loaders (PostgreSQL).
+"""
+import io
+import pandas as pd
+
+#################################################################################################
+# Converts DataFrame columns to a list of plain tuples ready for psycopg2,
+# replacing NaN/NaT with None (NULL) and numpy scalars with Python types.
+#################################################################################################
+def frame_to_records(df: pd.DataFrame, columns: list) -> list:
+    if df.empty:
+        return []
+    sub = df[columns]
+    return list(sub.astype(object).where(sub.notna(), None).itertuples(index=False, name=None))
+
+#################################################################################################
+# Streams DataFrame columns into `table` with COPY ... FROM STDIN (CSV, empty field = NULL).
+# Returns the number of rows sent.
+#################################################################################################
+def copy_frame(cur, df: pd.DataFrame, table: str, columns: list) -> int:
+    if df.empty:
+        return 0
+    buf = io.StringIO()
+    df[columns].to_csv(buf, index=False, header=False, na_rep="")
+    buf.seek(0)
+    cur.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        buf
+    )
+    return len(df)
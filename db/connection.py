@@ -1,24 +1,93 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
 import psycopg2
+from psycopg2 import pool, extensions
 from psycopg2.extras import RealDictCursor
 from config.logger import log
-from config.db_table import DB_CONFIG   # expects dict with host, dbname, user, password, port
+from config.db_table import (   # expects dict with host, dbname, user, password, port
+    DB_CONFIG, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_PING_AFTER
+)
+
+# =====================================================================
+# Process-wide connection pool
+# - created lazily, re-created after fork (a child never reuses the parent's sockets)
+# - session settings are sent as startup options, so they cost no extra round trip
+# - DB_POOL_MIN connections are kept open between calls, up to DB_POOL_MAX in use
+# =====================================================================
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_last_used = {}   # id(conn) → time the connection went back to the pool
+_inherited_pools = []   # pools a forked child inherited: kept alive, never closed
+
+
+def _get_pool():
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            # Freeing the parent's pool in a worker would send a terminate message over
+            # sockets the parent still uses — keep the reference instead
+            if _pool is not None:
+                _inherited_pools.append(_pool)
+            _pool = pool.ThreadedConnectionPool(
+                DB_POOL_MIN,
+                DB_POOL_MAX,
+                host=DB_CONFIG["host"],
+                dbname=DB_CONFIG["dbname"],
+                user=DB_CONFIG["user"],
+                password=DB_CONFIG["password"],
+                port=DB_CONFIG.get("port", 5432),
+                connect_timeout=30,
+                # Session-level settings (applied once per physical connection)
+                options="-c statement_timeout=5min"
+            )
+            _pool_pid = pid
+            _last_used.clear()
+            log(f"DB POOL CREATED | pid={pid} | min={DB_POOL_MIN} | max={DB_POOL_MAX}")
+
+    return _pool
+
+
+def _is_healthy(conn) -> bool:
+    """Cheap checks first; ping only connections that sat idle for a while."""
+    if conn.closed:
+        return False
+    if conn.info.transaction_status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+
+    idle_since = _last_used.get(id(conn))
+    if idle_since is not None and time.monotonic() - idle_since > DB_POOL_PING_AFTER:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+        except Exception:
+            return False
+
+    return True
+
 
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            host=DB_CONFIG["host"],
-            dbname=DB_CONFIG["dbname"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            port=DB_CONFIG.get("port", 5432),
-            connect_timeout=30
-        )
+        p = _get_pool()
 
-        # Session-level settings
-        with conn.cursor() as cur:
-            cur.execute("SET statement_timeout = '5min';")
+        # Discard broken connections until a healthy one is handed out
+        for _ in range(DB_POOL_MAX + 1):
+            conn = p.getconn()
+            if _is_healthy(conn):
+                _last_used.pop(id(conn), None)
+                return conn
+            _last_used.pop(id(conn), None)
+            p.putconn(conn, close=True)
 
-        return conn
+        raise psycopg2.OperationalError("No healthy connection available in pool")
 
     except Exception as e:
         log(f"DB CONNECTION FAILED: {e}")
@@ -26,8 +95,68 @@ def get_db_connection():
 
 
 def close_db_connection(conn):
+    """Return a connection to the pool (uncommitted work is rolled back)."""
     try:
-        if conn:
-            conn.close()
+        if not conn:
+            return
+
+        p = _get_pool()
+        if conn.closed:
+            p.putconn(conn, close=True)
+            return
+
+        if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+
+        _last_used[id(conn)] = time.monotonic()
+        p.putconn(conn)
+
+        # Connections beyond DB_POOL_MIN are closed by the pool on return
+        if conn.closed:
+            _last_used.pop(id(conn), None)
+
     except Exception as e:
-        log(f"DB CLOSE FAILED: {e}")
\ No newline at end of file
+        log(f"DB CLOSE FAILED: {e}")
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+@contextmanager
+def db_session(commit: bool = False):
+    """
+    Borrow a pooled connection:
+
+        with db_session() as conn:
+            ...
+
+    Rolls back and re-raises on error, optionally commits on success,
+    and always returns the connection to the pool.
+    """
+    conn = get_db_connection()
+    try:
+        yield conn
+        if commit:
+            conn.commit()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        close_db_connection(conn)
+
+
+def close_db_pool():
+    """Close every pooled connection (e.g. at program exit)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        elif _pool is not None:
+            _inherited_pools.append(_pool)
+        _pool = None
+        _pool_pid = None
+        _last_used.clear()
@@ -1,5 +1,6 @@
 from config.logger import log
 from db.connection import get_db_connection, close_db_connection
+from db.sql import SQL_CREATE_INDICATOR_STATE, SQL_CREATE_FORWARD_RETURNS
 
 # =====================================================================
 # Creates or updates the multi-asset PostgreSQL database schema
@@ -32,6 +33,14 @@ def create_stock_database(drop_existing=True):
             "commodity_price_data",    "commodity_indicators",    "commodity_52week_stats",
             "crypto_price_data",       "crypto_indicators",       "crypto_52week_stats",
             "forex_price_data",        "forex_indicators",        "forex_52week_stats",
+            "india_equity_indicators_state", "india_index_indicators_state",
+            "usa_equity_indicators_state",   "global_index_indicators_state",
+            "commodity_indicators_state",    "crypto_indicators_state",
+            "forex_indicators_state",
+            "india_equity_forward_returns", "india_index_forward_returns",
+            "usa_equity_forward_returns",   "global_index_forward_returns",
+            "commodity_forward_returns",    "crypto_forward_returns",
+            "forex_forward_returns",
         ]
 
         # =================================================
@@ -110,6 +119,8 @@ def create_stock_database(drop_existing=True):
                 ema_rsi_9_3 REAL,
                 wma_rsi_9_21 REAL,
                 pct_price_change REAL,
+                high_252 REAL,
+                low_252 REAL,
                 PRIMARY KEY (symbol_id, timeframe, date),
                 FOREIGN KEY(symbol_id) REFERENCES {symbol_table}(symbol_id)
             );
@@ -156,6 +167,13 @@ def create_stock_database(drop_existing=True):
         for sym_table, price_table, ind_table, stats_table in tables_config:
             create_price_table(price_table, sym_table)
             create_indicator_table(ind_table, sym_table)
+            cur.execute(SQL_CREATE_INDICATOR_STATE.format(
+                state_table=f"{ind_table}_state", symbol_table=sym_table
+            ))
+            cur.execute(SQL_CREATE_FORWARD_RETURNS.format(
+                fwd_table=price_table.replace("_price_data", "_forward_returns"),
+                symbol_table=sym_table
+            ))
             create_52week_table(stats_table, sym_table)
             log(f"✅ Ensured tables for {sym_table}")
 
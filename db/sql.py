@@ -12,9 +12,10 @@ SQL_INSERT = {
             bb_upper, bb_middle, bb_lower,
             atr_14, supertrend, supertrend_dir,
             ema_rsi_9_3, wma_rsi_9_21, pct_price_change,
-            macd, macd_signal
+            macd, macd_signal,
+            high_252, low_252
         )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         ON CONFLICT({col_id}, timeframe, date)
         DO UPDATE SET
             sma_20          = EXCLUDED.sma_20,
@@ -33,11 +34,233 @@ SQL_INSERT = {
             wma_rsi_9_21    = EXCLUDED.wma_rsi_9_21,
             pct_price_change = EXCLUDED.pct_price_change,
             macd            = EXCLUDED.macd,
-            macd_signal     = EXCLUDED.macd_signal
+            macd_signal     = EXCLUDED.macd_signal,
+            high_252        = EXCLUDED.high_252,
+            low_252         = EXCLUDED.low_252
     """
 }
 
 # Map all asset types to the generic template
 for key in ["india_equity", "usa_equity", "india_index", "global_index",
             "commodity", "crypto", "forex"]:
-    SQL_INSERT[key] = SQL_INSERT["generic"]
\ No newline at end of file
+    SQL_INSERT[key] = SQL_INSERT["generic"]
+
+# Column order of the VALUES tuple above
+INDICATOR_COLUMNS = [
+    "symbol_id", "timeframe", "date",
+    "sma_20", "sma_50", "sma_200",
+    "rsi_3", "rsi_9", "rsi_14",
+    "bb_upper", "bb_middle", "bb_lower",
+    "atr_14", "supertrend", "supertrend_dir",
+    "ema_rsi_9_3", "wma_rsi_9_21", "pct_price_change",
+    "macd", "macd_signal",
+    "high_252", "low_252",
+]
+
+# Same upsert for psycopg2.extras.execute_values (VALUES %s → one statement per page)
+_VALUES_ROW = "VALUES (" + ", ".join(["%s"] * len(INDICATOR_COLUMNS)) + ")"
+SQL_INSERT_BULK = {
+    key: sql.replace(_VALUES_ROW, "VALUES %s")
+    for key, sql in SQL_INSERT.items()
+}
+
+# Rolling 252-bar high/low columns, added in place to indicator tables created before them
+SQL_ADD_INDICATOR_HIGH_LOW = """
+    ALTER TABLE {indicator_table}
+        ADD COLUMN IF NOT EXISTS high_252 REAL,
+        ADD COLUMN IF NOT EXISTS low_252 REAL
+"""
+
+# Backfill of high_252 / low_252 on existing indicator rows (execute_values)
+SQL_UPDATE_INDICATOR_HIGH_LOW = """
+    UPDATE {indicator_table} AS i
+    SET high_252 = v.high_252,
+        low_252  = v.low_252
+    FROM (VALUES %s) AS v(symbol_id, timeframe, date, high_252, low_252)
+    WHERE i.symbol_id = v.symbol_id
+      AND i.timeframe = v.timeframe
+      AND i.date = v.date
+"""
+
+# =====================================================================
+# Price bulk load: per-transaction temp staging table + one set-based merge
+# (private to the connection, so overlapping imports never see each other's rows)
+# =====================================================================
+SQL_PRICE_STAGING = """
+    CREATE TEMP TABLE {staging_table} (
+        symbol_id INTEGER,
+        timeframe TEXT,
+        date DATE,
+        open REAL,
+        high REAL,
+        low REAL,
+        close REAL,
+        adj_close REAL,
+        volume REAL
+    ) ON COMMIT DROP
+"""
+
+SQL_PRICE_MERGE = """
+    INSERT INTO {price_table}
+        (symbol_id, timeframe, date, open, high, low, close, adj_close, volume)
+    SELECT DISTINCT ON (symbol_id, timeframe, date)
+        symbol_id, timeframe, date, open, high, low, close, adj_close, volume
+    FROM {staging_table}
+    WHERE timeframe = %s
+      AND date IS NOT NULL
+    ORDER BY symbol_id, timeframe, date
+    ON CONFLICT (symbol_id, timeframe, date)
+    DO UPDATE SET
+        open      = EXCLUDED.open,
+        high      = EXCLUDED.high,
+        low       = EXCLUDED.low,
+        close     = EXCLUDED.close,
+        adj_close = EXCLUDED.adj_close,
+        volume    = EXCLUDED.volume
+"""
+
+# Historical delivery % (per-symbol bhavcopy archive) staged with COPY, then applied
+# to the daily bars in one UPDATE
+SQL_DELV_STAGING = """
+    CREATE TEMP TABLE {staging_table} (
+        symbol_id INTEGER,
+        date DATE,
+        delv_pct REAL
+    ) ON COMMIT DROP
+"""
+
+SQL_DELV_MERGE = """
+    UPDATE {price_table} AS p
+    SET delv_pct = s.delv_pct
+    FROM (
+        SELECT DISTINCT ON (symbol_id, date) symbol_id, date, delv_pct
+        FROM {staging_table}
+        WHERE date IS NOT NULL
+        ORDER BY symbol_id, date
+    ) AS s
+    WHERE p.symbol_id = s.symbol_id
+      AND p.timeframe = '1d'
+      AND p.date = s.date
+      AND p.delv_pct IS DISTINCT FROM s.delv_pct
+"""
+
+# Persisted EWM/Wilder state + rolling-window tails per (symbol, timeframe),
+# used by the incremental indicator refresh
+SQL_CREATE_INDICATOR_STATE = """
+    CREATE TABLE IF NOT EXISTS {state_table} (
+        symbol_id  INTEGER,
+        timeframe  TEXT,
+        last_date  DATE NOT NULL,
+        last_close REAL,
+        last_adj_close REAL,
+        state      JSONB NOT NULL,
+        updated_at TIMESTAMP DEFAULT now(),
+        PRIMARY KEY (symbol_id, timeframe),
+        FOREIGN KEY(symbol_id) REFERENCES {symbol_table}(symbol_id)
+    )
+"""
+
+# last_adj_close added in place to state tables created before it (NULL → reseeded once)
+SQL_ADD_INDICATOR_STATE_ADJ = """
+    ALTER TABLE {state_table}
+    ADD COLUMN IF NOT EXISTS last_adj_close REAL
+"""
+
+SQL_UPSERT_INDICATOR_STATE = """
+    INSERT INTO {state_table} (symbol_id, timeframe, last_date, last_close, last_adj_close, state, updated_at)
+    VALUES %s
+    ON CONFLICT (symbol_id, timeframe)
+    DO UPDATE SET
+        last_date  = EXCLUDED.last_date,
+        last_close = EXCLUDED.last_close,
+        last_adj_close = EXCLUDED.last_adj_close,
+        state      = EXCLUDED.state,
+        updated_at = EXCLUDED.updated_at
+"""
+
+# Forward prices per daily bar (entry at next open, exits N bars later / at week end),
+# maintained by forward_returns_service and joined by the backtests
+SQL_CREATE_FORWARD_RETURNS = """
+    CREATE TABLE IF NOT EXISTS {fwd_table} (
+        symbol_id      INTEGER,
+        date           DATE,
+        open           REAL,
+        next_date      DATE,
+        next_open      REAL,
+        date_1d        DATE,
+        close_1d       REAL,
+        date_5d        DATE,
+        close_5d       REAL,
+        date_10d       DATE,
+        close_10d      REAL,
+        date_20d       DATE,
+        close_20d      REAL,
+        week_end_date  DATE,
+        week_end_close REAL,
+        PRIMARY KEY (symbol_id, date),
+        FOREIGN KEY(symbol_id) REFERENCES {symbol_table}(symbol_id)
+    )
+"""
+
+# =====================================================================
+# Symbol refresh: CSV universe COPY'd into a per-transaction temp table, then
+# applied to the symbol table as set-based statements (each RETURNING the symbols hit)
+# =====================================================================
+SQL_SYMBOL_STAGING = """
+    CREATE TEMP TABLE {staging_table} (
+        name         TEXT,
+        yahoo_symbol TEXT PRIMARY KEY,
+        exchange     TEXT
+    ) ON COMMIT DROP
+"""
+
+SQL_SYMBOL_INSERT = """
+    INSERT INTO {symbol_table} (name, yahoo_symbol, exchange)
+    SELECT name, yahoo_symbol, exchange
+    FROM {staging_table}
+    ON CONFLICT (yahoo_symbol) DO NOTHING
+    RETURNING yahoo_symbol
+"""
+
+# Fill in name / exchange on rows where either is blank
+SQL_SYMBOL_PATCH = """
+    UPDATE {symbol_table} AS t
+    SET name = s.name,
+        exchange = s.exchange
+    FROM {staging_table} AS s
+    WHERE t.yahoo_symbol = s.yahoo_symbol
+      AND (
+            t.name IS NULL OR t.name = '' OR
+            t.exchange IS NULL OR t.exchange = ''
+          )
+    RETURNING t.yahoo_symbol
+"""
+
+SQL_SYMBOL_REACTIVATE = """
+    UPDATE {symbol_table} AS t
+    SET is_active = TRUE
+    FROM {staging_table} AS s
+    WHERE t.yahoo_symbol = s.yahoo_symbol
+      AND t.is_active IS NOT TRUE
+    RETURNING t.yahoo_symbol
+"""
+
+# Active symbols that dropped out of the CSV universe, plus the active count before the refresh
+SQL_SYMBOL_DROPPED = """
+    SELECT t.yahoo_symbol, COUNT(*) OVER () AS n_dropped,
+           (SELECT COUNT(*) FROM {symbol_table} WHERE is_active) AS n_active
+    FROM {symbol_table} AS t
+    WHERE t.is_active
+      AND NOT EXISTS (
+            SELECT 1 FROM {staging_table} AS s
+            WHERE s.yahoo_symbol = t.yahoo_symbol
+          )
+"""
+
+SQL_SYMBOL_DEACTIVATE = """
+    UPDATE {symbol_table}
+    SET is_active = FALSE
+    WHERE yahoo_symbol = ANY(%s)
+      AND is_active
+    RETURNING yahoo_symbol
+"""
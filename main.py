@@ -5,6 +5,7 @@ from rich.prompt import Prompt
 
 from config.nse_constants import MAIN_MENU_ITEMS
 from config.logger import clear_log
+from db.connection import close_db_pool
 from core.data_operations import data_manager_user_input
 from core.increment_operations import increment_manager_user_input
 from core.scanner_operations import scanner_manager_user_input
@@ -54,6 +55,7 @@ def main():
         elif choice == "0":
             console.print("[bold green]Exiting...[/bold green]")
             clear_log()
+            close_db_pool()
             break
 
         else:
@@ -0,0 +1,108 @@
+import os
+import gzip
+import shutil
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+from config.logger import log
+from config.paths import BHAVCOPY_ARCHIVE_DIR
+
+ARCHIVE_PREFIX = "sec_bhavdata_full_"
+ARCHIVE_SUFFIX = ".csv.gz"
+ARCHIVE_COMPRESSLEVEL = 6
+
+#################################################################################################
+# Local bhavcopy archive: one gzip-compressed CSV per trading day, keyed by its date
+#   <BHAVCOPY_ARCHIVE_DIR>/<yyyy>/sec_bhavdata_full_<ddmmyyyy>.csv.gz
+# The path is a pure function of the date, so lookups never scan the archive.
+# pandas reads the .gz files directly (streamed decompression, nothing is extracted).
+#################################################################################################
+def archive_path(day, archive_dir=BHAVCOPY_ARCHIVE_DIR) -> Path:
+    day = pd.Timestamp(day).date()
+    return Path(archive_dir) / f"{day.year}" / f"{ARCHIVE_PREFIX}{day.strftime('%d%m%Y')}{ARCHIVE_SUFFIX}"
+
+
+def has_bhavcopy(day, archive_dir=BHAVCOPY_ARCHIVE_DIR) -> bool:
+    return archive_path(day, archive_dir).exists()
+
+#################################################################################################
+# Stores one day's CSV bytes compressed. Written to <file>.part and renamed, so a crash never
+# leaves a truncated archive member. Returns the archive path.
+#################################################################################################
+def store_bhavcopy(day, content: bytes, archive_dir=BHAVCOPY_ARCHIVE_DIR) -> Path:
+    path = archive_path(day, archive_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".part")
+    with open(tmp_path, "wb") as f:
+        f.write(gzip.compress(content, compresslevel=ARCHIVE_COMPRESSLEVEL))
+    os.replace(tmp_path, path)
+    return path
+
+#################################################################################################
+# Archived dates in [start, end] (either bound optional), ascending.
+# Only the year folders inside the range are listed.
+#################################################################################################
+def archived_dates(start=None, end=None, archive_dir=BHAVCOPY_ARCHIVE_DIR) -> list:
+    root = Path(archive_dir)
+    if not root.exists():
+        return []
+
+    start = pd.Timestamp(start).date() if start is not None else None
+    end = pd.Timestamp(end).date() if end is not None else None
+
+    days = []
+    for year_dir in root.iterdir():
+        if not year_dir.is_dir() or not year_dir.name.isdigit():
+            continue
+        year = int(year_dir.name)
+        if (start and year < start.year) or (end and year > end.year):
+            continue
+        for f in year_dir.iterdir():
+            if not (f.name.startswith(ARCHIVE_PREFIX) and f.name.endswith(ARCHIVE_SUFFIX)):
+                continue
+            try:
+                day = datetime.strptime(f.name[len(ARCHIVE_PREFIX):-len(ARCHIVE_SUFFIX)], "%d%m%Y").date()
+            except ValueError:
+                continue
+            if (start and day < start) or (end and day > end):
+                continue
+            days.append(day)
+    return sorted(days)
+
+
+def archive_files(start=None, end=None, archive_dir=BHAVCOPY_ARCHIVE_DIR) -> list:
+    """Archive paths (as str) for the archived dates in [start, end], in date order."""
+    return [str(archive_path(d, archive_dir)) for d in archived_dates(start, end, archive_dir)]
+
+#################################################################################################
+# Adds the plain sec_bhavdata_full_<ddmmyyyy>.csv files of `folder` to the archive
+# (dates already archived are left alone; the source files are not touched).
+# Returns the number of files added.
+#################################################################################################
+def archive_folder(folder, archive_dir=BHAVCOPY_ARCHIVE_DIR) -> int:
+    folder = Path(folder)
+    if not folder.exists():
+        return 0
+
+    added = 0
+    for f in sorted(folder.iterdir()):
+        if not (f.is_file() and f.name.startswith(ARCHIVE_PREFIX) and f.name.endswith(".csv")):
+            continue
+        try:
+            day = datetime.strptime(f.stem[len(ARCHIVE_PREFIX):], "%d%m%Y").date()
+        except ValueError:
+            continue
+        if has_bhavcopy(day, archive_dir):
+            continue
+
+        path = archive_path(day, archive_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".part")
+        with open(f, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=ARCHIVE_COMPRESSLEVEL) as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, path)
+        added += 1
+
+    if added:
+        log(f"🗄 Archived {added} bhavcopy files from {folder}")
+    return added
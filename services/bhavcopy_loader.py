@@ -1,30 +1,114 @@
 import os
+import time
 import requests
+from requests.adapters import HTTPAdapter
 import traceback
-import shutil
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta,date
 from psycopg2.extras import execute_values
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 from db.connection import get_db_connection, close_db_connection
-from services.cleanup_service import delete_files_in_folder
+from db.bulk import frame_to_records, copy_frame
+from db.sql import SQL_DELV_STAGING, SQL_DELV_MERGE
 from services.symbol_service import (
     retrieve_symbols, get_latest_trading_date,
     get_latest_equity_date_no_delv
 )
 from config.logger import log
-from config.paths import BHAVCOPY_DIR,BHAVCOPY_DIR_HIST
-from config.nse_constants import NSE_URL_BHAV_DAILY
+from config.paths import BHAVCOPY_DIR,BHAVCOPY_DIR_HIST,BHAVCOPY_DIR_DB
+from config.nse_constants import (
+    NSE_URL_BHAV_DAILY, BHAVCOPY_SERIES, BHAVCOPY_ADJUST_TOLERANCE,
+    BHAV_MAX_WORKERS, BHAV_RATE_PER_SEC, BHAV_MAX_RETRIES, BHAV_BACKOFF_BASE, BHAV_TIMEOUT,
+    BHAV_HIST_WORKERS
+)
+from services.download_executor import run_downloads, call_with_retries
+from services.calendar_service import get_calendar
+from services.bhavcopy_archive import (
+    archive_path, has_bhavcopy, store_bhavcopy, archive_files, archive_folder
+)
+
+try:    # optional: multithreaded columnar CSV reader for the historical archive
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa_csv = None
 
 TIMEFRAME = "1d"
 ASSET_TYPE = "india_equity"
 
+# price column → bhavcopy field
+BHAVCOPY_PRICE_FIELDS = {
+    "open": "OPEN_PRICE",
+    "high": "HIGH_PRICE",
+    "low": "LOW_PRICE",
+    "close": "CLOSE_PRICE",
+    "volume": "TTL_TRD_QNTY",
+    "delv_pct": "DELIV_PER",
+    "prev_close": "PREV_CLOSE",
+}
+BHAV_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept": "text/csv,*/*;q=0.8"
+}
+BHAVCOPY_BAR_COLUMNS = [
+    "symbol_id", "date", "open", "high", "low", "close", "adj_close", "volume", "delv_pct"
+]
+
+#################################################################################################
+# Reads one historical per-symbol bhavcopy (<SYMBOL>_*.csv) → DataFrame(date, delv_pct).
+# Uses pyarrow's multithreaded columnar reader when it is installed, pandas otherwise;
+# dates are parsed with the fixed archive format instead of per-value inference.
+#################################################################################################
+HIST_DATE_COL = "Date"
+HIST_DELV_COL = "% Dly Qt to Traded Qty"
+HIST_DATE_FORMAT = "%d-%b-%Y"
+
+_hist_dates = {}   # archive date string → datetime64, shared by all files and threads
+
+def parse_hist_dates(values: pd.Series) -> pd.Series:
+    """Every file repeats the same trading days: parse each distinct string once."""
+    codes, uniques = pd.factorize(values.astype(str).str.strip())
+    new = [v for v in uniques if v not in _hist_dates]
+    if new:
+        parsed = pd.to_datetime(pd.Series(new, dtype=object), format=HIST_DATE_FORMAT, errors="coerce")
+        _hist_dates.update(zip(new, parsed.to_numpy()))
+    lookup = np.array([_hist_dates[v] for v in uniques] + [np.datetime64("NaT")], dtype="datetime64[ns]")
+    return pd.Series(lookup[codes], index=values.index)   # code -1 → trailing NaT
+
+def read_hist_bhavcopy(csv_path: str) -> pd.DataFrame:
+    wanted = (HIST_DATE_COL, HIST_DELV_COL)
+    if pa_csv is not None:
+        df = pa_csv.read_csv(
+            csv_path,
+            read_options=pa_csv.ReadOptions(use_threads=True),
+            convert_options=pa_csv.ConvertOptions(strings_can_be_null=True)
+        ).to_pandas()
+        df = df[[c for c in df.columns if c.strip() in wanted]]
+    else:
+        df = pd.read_csv(csv_path, usecols=lambda c: c.strip() in wanted)
+    df.columns = [c.strip() for c in df.columns]
+
+    if HIST_DATE_COL not in df.columns or HIST_DELV_COL not in df.columns:
+        raise ValueError("missing required columns")
+
+    delv = df[HIST_DELV_COL]
+    out = pd.DataFrame({
+        "date": parse_hist_dates(df[HIST_DATE_COL]),
+        "delv_pct": delv if pd.api.types.is_numeric_dtype(delv) else bhavcopy_numeric(delv),
+    })
+    return out.dropna(subset=["date"])
+
 #################################################################################################
 # Updates only `delv_pct` in equity_price_data using historical bhavcopy files 
-# named <SYMBOL>_*.csv. Reads each CSV, parses Date → yyyy-mm-dd, matches by symbol_id + date, 
-# and performs UPDATE.
+# named <SYMBOL>_*.csv. The archive is parsed on a thread pool (BHAV_HIST_WORKERS), each
+# parsed file is streamed with COPY into a temp staging table (dropped at the commit) as it
+# arrives, and all values are applied with one UPDATE ... FROM staging and one commit.
 #################################################################################################
-def update_hist_delv_pct_from_bhavcopy():
+def update_hist_delv_pct_from_bhavcopy(max_workers: int = BHAV_HIST_WORKERS, folder_path=BHAVCOPY_DIR_HIST):
+    conn = None
+    price_table = f"{ASSET_TYPE}_price_data"
+    staging_table = f"{price_table}_delv_staging"
     try:
         conn = get_db_connection()
         cur = conn.cursor()
@@ -34,112 +118,138 @@ def update_hist_delv_pct_from_bhavcopy():
         symbol_map = {row["yahoo_symbol"].upper(): row["symbol_id"] for _, row in symbols.iterrows()}
         print(f"Loaded {len(symbol_map)} symbols from DB")
 
-        # --- Filter only CSV files
-        files = [f for f in os.listdir(BHAVCOPY_DIR_HIST) if f.lower().endswith(".csv")]
-
-        # --- TQDM progress bar
-        for file_name in tqdm(files, desc="Processing BHAVCOPY files", unit="file"):
-            symbol_from_file = file_name.split("_")[0].upper()
-            symbol = f"{symbol_from_file}.NS"
-
-            if symbol not in symbol_map:
+        # --- CSV files of known symbols only
+        tasks = []
+        for file_name in sorted(os.listdir(folder_path)):
+            if not file_name.lower().endswith(".csv"):
                 continue
+            symbol_id = symbol_map.get(f"{file_name.split('_')[0].upper()}.NS")
+            if symbol_id is not None:
+                tasks.append((file_name, symbol_id))
 
-            symbol_id = symbol_map[symbol]
-            csv_path = os.path.join(BHAVCOPY_DIR_HIST, file_name)
-
-            try:
-                # --- Read CSV
-                df = pd.read_csv(csv_path)
-                df.columns = [c.strip() for c in df.columns]
-
-                if "Date" not in df.columns or "% Dly Qt to Traded Qty" not in df.columns:
-                    log(f"❌ Missing required columns in {file_name}")
-                    continue
-
-                # --- Prepare data for batch update
-                df = df[["Date", "% Dly Qt to Traded Qty"]].copy()
-                df["delv_pct"] = pd.to_numeric(df["% Dly Qt to Traded Qty"], errors='coerce')
+        if not tasks:
+            log(f"⚠ No historical bhavcopy files for known symbols in {folder_path}")
+            return
 
-                # --- Convert to datetime, keep as datetime object for psycopg2
-                df["date"] = pd.to_datetime(df["Date"], format="%d-%b-%Y", errors='coerce')
-                df = df.dropna(subset=["date"])
+        cur.execute(SQL_DELV_STAGING.format(staging_table=staging_table))
 
-                if df.empty:
+        def parse(task):
+            file_name, symbol_id = task
+            try:
+                df = read_hist_bhavcopy(os.path.join(folder_path, file_name))
+                df.insert(0, "symbol_id", symbol_id)
+                return file_name, df, None
+            except Exception as e:
+                return file_name, None, e
+
+        # --- Parse in parallel, COPY each file as soon as it is parsed
+        start = time.time()
+        rows_staged = files_failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, int(max_workers or 1))) as pool:
+            for file_name, df, error in tqdm(
+                pool.map(parse, tasks), total=len(tasks), desc="Processing BHAVCOPY files", unit="file"
+            ):
+                if error is not None:
+                    log(f"❌ Failed processing {file_name}: {error}")
+                    files_failed += 1
                     continue
+                rows_staged += copy_frame(cur, df, staging_table, ["symbol_id", "date", "delv_pct"])
 
-                # --- Prepare values for execute_values
-                values = [(row["delv_pct"], symbol_id, TIMEFRAME, row["date"]) for _, row in df.iterrows()]
-
-                sql = f"""
-                    UPDATE {ASSET_TYPE}_price_data
-                    SET delv_pct = data.delv_pct
-                    FROM (VALUES %s) AS data(delv_pct, symbol_id, timeframe, date)
-                    WHERE {ASSET_TYPE}_price_data.symbol_id = data.symbol_id
-                      AND {ASSET_TYPE}_price_data.timeframe = data.timeframe
-                      AND {ASSET_TYPE}_price_data.date = data.date
-                      AND ({ASSET_TYPE}_price_data.delv_pct IS DISTINCT FROM data.delv_pct)
-                """
-
-                execute_values(cur, sql, values)
-                conn.commit()
-
-                # --- Log rows processed
-                print(f"✔ {symbol}: {len(values)} rows processed from {file_name}")
-
-            except Exception as e_file:
-                log(f"❌ Failed processing {file_name}: {e_file}")
-                traceback.print_exc()
-                conn.rollback()
+        # --- One set-based update + commit
+        cur.execute(SQL_DELV_MERGE.format(price_table=price_table, staging_table=staging_table))
+        rows_updated = cur.rowcount
+        conn.commit()
 
-        print("🎉 Done updating delivery percentages.")
+        elapsed = max(time.time() - start, 1e-6)
+        log(
+            f"HIST DELV | files={len(tasks)} | failed={files_failed} | staged={rows_staged} | "
+            f"updated={rows_updated} | {elapsed:.1f}s | reader={'pyarrow' if pa_csv else 'pandas'}"
+        )
+        print(f"🎉 Done updating delivery percentages. {rows_updated} rows updated in {elapsed:.1f}s")
 
     except Exception as e:
+        if conn:
+            conn.rollback()
         log(f"❗ ERROR during update: {e}")
         traceback.print_exc()
 
     finally:
-        close_db_connection(conn)
+        if conn:
+            close_db_connection(conn)
+#################################################################################################
+# One keep-alive HTTP session for NSE archive downloads, with a connection pool sized for
+# `max_workers` concurrent requests.
+#################################################################################################
+def bhavcopy_session(max_workers: int = BHAV_MAX_WORKERS) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_workers))
+    session.mount("https://", adapter)
+    session.headers.update(BHAV_HEADERS)
+    return session
+
 #################################################################################################
-# Downloads the NSE bhavcopy CSV for a given date (default: today), saves it locally, 
-# and returns the file path.Handles missing files (holidays/weekends) and errors 
-# gracefully while logging all events.
+# Fetches the bhavcopy for one ddmmyyyy date into the compressed archive.
+#   returns the archive path, or None when NSE has no file for the date (holiday / not yet published)
+#   raises on timeouts, 5xx and 429 so the caller can retry
 #################################################################################################
-def download_bhavcopy(date_str=None):
+def fetch_bhavcopy(date_str: str, session, timeout=BHAV_TIMEOUT):
+    url = NSE_URL_BHAV_DAILY.format(date_str)
+
+    response = session.get(url, timeout=timeout)
+    if response.status_code == 429 or response.status_code >= 500:
+        raise requests.HTTPError(f"HTTP {response.status_code} for {date_str}")
+    if response.status_code != 200:
+        log(f"❗ HTTP {response.status_code} | {date_str}: file missing (holiday / not available)")
+        return None
+    if not response.content.lstrip().upper().startswith(b"SYMBOL"):
+        log(f"❗ {date_str}: response is not a bhavcopy CSV, skipping")
+        return None
+
+    save_path = str(store_bhavcopy(datetime.strptime(date_str, "%d%m%Y").date(), response.content))
+    log(f"✔ Saved: {save_path}")
+    return save_path
+
+#################################################################################################
+# Downloads the NSE bhavcopy CSV for a given date (default: today) into the archive
+# and returns the file path (an already archived date is not downloaded again).
+# Handles missing files (holidays/weekends) and errors gracefully while logging all events.
+#################################################################################################
+def download_bhavcopy(date_str=None, session=None):
     """Download NSE bhavcopy for given date (ddmmyyyy)."""
     try:
         # ---- Today's bhavcopy if no date passed ----
         if date_str is None:
             date_str = datetime.now().strftime("%d%m%Y")
-        # ---- Ensure folder exists ----
-        os.makedirs(BHAVCOPY_DIR, exist_ok=True)
-        # ---- Prepare URL and save path ----
-        save_path = os.path.join(
-            BHAVCOPY_DIR,
-            f"sec_bhavdata_full_{date_str}.csv"
+        day = datetime.strptime(date_str, "%d%m%Y").date()
+        if has_bhavcopy(day):
+            return str(archive_path(day))
+        log(f"⬇ Downloading bhavcopy: {date_str}")
+        return call_with_retries(
+            lambda d, timeout=None: fetch_bhavcopy(d, session or bhavcopy_session(1), timeout=timeout),
+            date_str,
+            max_retries=BHAV_MAX_RETRIES,
+            backoff_base=BHAV_BACKOFF_BASE,
+            timeout=BHAV_TIMEOUT
         )
-        url = NSE_URL_BHAV_DAILY.format(date_str)
-        log(f"⬇ Downloading bhavcopy: {date_str} -> {url}")
-        headers = {
-            "User-Agent": "Mozilla/5.0",
-            "Accept": "text/csv,*/*;q=0.8"
-        }
-        response = requests.get(url, headers=headers, timeout=20)
-        if response.status_code != 200:
-            log(f"❗ HTTP {response.status_code} | File missing (holiday / weekend / not available)")
-            return None
-        with open(save_path, "wb") as f:
-            f.write(response.content)
-        log(f"✔ Saved: {save_path}")
-        return save_path
     except Exception as e:
         log(f"❗ Unexpected error: {e}")
         traceback.print_exc()
         return None
+
 #################################################################################################
-# Detects missing NSE bhavcopy dates from the database and downloads all required daily CSVs 
-# into the bhavcopy folder.Supports override date, clears old files once, loops through dates, 
-# and logs the full download summary.
+# NSE sessions after `latest_date` up to `end_date` — weekends and known holidays never
+# have a bhavcopy, so they are not requested at all
+#################################################################################################
+def bhavcopy_dates(latest_date, end_date) -> list:
+    return get_calendar("NSE").sessions_between(latest_date + timedelta(days=1), end_date)
+
+#################################################################################################
+# Detects missing NSE bhavcopy dates from the database and makes sure every NSE session
+# after it is in the compressed archive. Supports override date. Sessions already archived
+# are read from disk; only the others are fetched, concurrently over one keep-alive session
+# (bounded by BHAV_MAX_WORKERS and BHAV_RATE_PER_SEC, retried with backoff).
+# Returns (archive paths of the requested sessions in date order, sessions whose download
+# still failed after the retries) — callers must fill those sessions from another source.
 #################################################################################################
 def download_missing_bhavcopies(override_date=None, asset_type="india_equity"):
     try:
@@ -159,7 +269,7 @@ def download_missing_bhavcopies(override_date=None, asset_type="india_equity"):
                 log(f"⚠ OVERRIDE latest date: {latest_date}")
             except Exception as e:
                 log(f"❗ Failed to parse override_date: {e}")
-                return
+                return [], []
         else:
             try:
                 latest_date = get_latest_trading_date(asset_type=asset_type, timeframe="1d")
@@ -172,189 +282,294 @@ def download_missing_bhavcopies(override_date=None, asset_type="india_equity"):
             log("⚠ No price data found in DB. Starting fresh from today-30days.")
             latest_date = datetime.now().date() - timedelta(days=30)
 
-        start_date = latest_date + timedelta(days=1)
         today = datetime.now().date()
+        days = bhavcopy_dates(latest_date, today)
 
-        if start_date > today:
+        if not days:
             log("✔ No missing dates. Database already up to date.")
-            return
+            return [], []
 
-        # ---- 🔥 CLEAR OLD FILES ----
-        try:
-            os.makedirs(BHAVCOPY_DIR, exist_ok=True)
-            for filename in os.listdir(BHAVCOPY_DIR):
-                file_path = os.path.join(BHAVCOPY_DIR, filename)
-                try:
-                    if os.path.isfile(file_path) or os.path.islink(file_path):
-                        os.unlink(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path)
-                except Exception as e_inner:
-                    log(f"❗ Failed to delete {file_path}: {e_inner}")
-            log(f"🧹 Cleared old files in {BHAVCOPY_DIR}")
-        except Exception as e_clear:
-            log(f"❗ Failed to prepare bhavcopy directory: {e_clear}")
-            return
+        # ---- Plain CSVs left by older runs join the archive ----
+        archive_folder(BHAVCOPY_DIR)
+        archive_folder(BHAVCOPY_DIR_DB)
+
+        to_fetch = [d for d in days if not has_bhavcopy(d)]
+        log(f"🗄 {len(days) - len(to_fetch)} of {len(days)} sessions already archived")
 
         # ---- 🔽 DOWNLOAD MISSING FILES ----
-        download_count = 0
-        curr = start_date
-        while curr <= today:
-            try:
-                formatted = curr.strftime("%d%m%Y")
-                log(f"📌 Processing {curr.strftime('%Y-%m-%d')}")
-                download_bhavcopy(formatted)  # your download function
-                download_count += 1
-            except Exception as e_download:
-                log(f"❗ Failed to download bhavcopy for {curr}: {e_download}")
-            finally:
-                curr += timedelta(days=1)
-
-        log(f"🎉 Download completed. Total downloaded: {download_count}")
-        print(f"🎉 Download completed. Total downloaded: {download_count}")
+        if to_fetch:
+            log(f"📌 {len(to_fetch)} sessions to fetch: {to_fetch[0]} → {to_fetch[-1]}")
+        session = bhavcopy_session(BHAV_MAX_WORKERS)
+        try:
+            results, failed = run_downloads(
+                [d.strftime("%d%m%Y") for d in to_fetch],
+                lambda date_str, timeout=None: fetch_bhavcopy(date_str, session, timeout=timeout),
+                max_workers=BHAV_MAX_WORKERS,
+                rate_per_sec=BHAV_RATE_PER_SEC,
+                max_retries=BHAV_MAX_RETRIES,
+                backoff_base=BHAV_BACKOFF_BASE,
+                timeout=BHAV_TIMEOUT,
+                desc="bhavcopy"
+            )
+        finally:
+            session.close()
+
+        saved = [path for _, path in results if path]
+        failed_days = sorted(datetime.strptime(date_str, "%d%m%Y").date() for date_str in failed)
+        for day in failed_days:
+            log(f"❗ Failed to download bhavcopy for {day}")
+
+        log(f"🎉 Download completed. Saved: {len(saved)} | no file: {len(results) - len(saved)} | failed: {len(failed)}")
+        print(f"🎉 Download completed. Total downloaded: {len(saved)}")
+        return archive_files(days[0], days[-1]), failed_days
 
     except Exception as e_outer:
         log(f"❗ Unexpected error in download_missing_bhavcopies: {e_outer}")
         traceback.print_exc()
+        return [], []
 #################################################################################################
-# Inserts/updates daily OHLCV + delivery % for all symbols in DB using downloaded bhavcopy CSVs.
-# Loops CSV-by-CSV and symbol-by-symbol, maps fields, performs UPSERT into equity_price_data, 
-# and logs results.
+# Bhavcopy files to load, in date order:
+#   folder_path given → its sec_bhavdata_full_<ddmmyyyy>.csv[.gz] files (e.g. local fixtures)
+#   otherwise         → archived sessions in [start_date, end_date]
 #################################################################################################
-def update_equity_price_from_bhavcopy(symbol="ALL"):
+def bhavcopy_files(folder_path=None, start_date=None, end_date=None) -> list:
+    if folder_path is None:
+        return archive_files(start_date, end_date)
+    names = [
+        f for f in os.listdir(folder_path)
+        if f.startswith("sec_bhavdata_full_") and f.endswith((".csv", ".csv.gz")) and bhavcopy_file_date(f)
+    ]
+    return [os.path.join(folder_path, f) for f in sorted(names, key=bhavcopy_file_date)]
 
+#################################################################################################
+# Inserts/updates daily OHLCV + delivery % for all symbols from the bhavcopy files picked by
+# bhavcopy_files (archive date range, or a plain folder).
+# Every file is joined to the symbol map in one merge and all rows of all files go to the
+# price table in one execute_values upsert. Returns a summary the incremental pipeline uses
+# to decide which symbols still need Yahoo:
+#   adjusted → PREV_CLOSE disagrees with the stored close (split / bonus / other corporate action)
+#   missing  → active symbols absent from every file (suspended, renamed, not in the series list)
+#################################################################################################
+def update_equity_price_from_bhavcopy(
+    symbol="ALL", asset_type="india_equity", folder_path=None, start_date=None, end_date=None
+):
     conn = get_db_connection()
     cur = conn.cursor()
-    type = "india"
+    price_table = f"{asset_type}_price_data"
     try:
         log("🚀 Starting equity_price_data update from bhavcopy CSV files")
 
         # ---- Load symbols ----
-        df_symbols = retrieve_symbols(symbol=symbol, conn=conn, asset_type="india_equity")
+        df_symbols = retrieve_symbols(symbol=symbol, conn=conn, asset_type=asset_type)
         if df_symbols.empty:
             log("❗ No symbols found to process")
-            return
+            return None
 
         log(f"🔎 Symbols to process: {len(df_symbols)}")
+        symbol_map = bhavcopy_symbol_map(df_symbols)
 
         # ---- Locate CSV files ----
-        csv_files = sorted([
-            f for f in os.listdir(BHAVCOPY_DIR)
-            if f.endswith(".csv") and "sec_bhavdata_full_" in f
-        ])
+        csv_files = bhavcopy_files(folder_path, start_date, end_date)
 
         if not csv_files:
             log("❗ No bhavcopy CSV files found to process")
-            return
+            return None
 
+        bars = build_bhavcopy_bars(csv_files, symbol_map)
+        if bars.empty:
+            log("⚠ No bhavcopy rows matched the symbol table")
+            return None
+
+        # ---- Corporate actions: PREV_CLOSE vs last stored close ----
+        cur.execute(f"""
+            SELECT DISTINCT ON (symbol_id) symbol_id, date, close
+            FROM {price_table}
+            WHERE timeframe = '1d' AND symbol_id = ANY(%s) AND date < %s
+            ORDER BY symbol_id, date DESC
+        """, (bars["symbol_id"].unique().tolist(), bars["date"].min()))
+        last_close = pd.DataFrame(cur.fetchall(), columns=["symbol_id", "date", "close"])
+        adjusted_ids = find_bhavcopy_adjustments(bars, last_close)
+
+        # ---- One upsert for all files ----
         insert_sql = f"""
-            INSERT INTO {type}_equity_price_data
+            INSERT INTO {price_table}
             (symbol_id, timeframe, date, open, high, low, close, adj_close, volume, delv_pct)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(symbol_id, timeframe, date)
+            VALUES %s
+            ON CONFLICT (symbol_id, timeframe, date)
             DO UPDATE SET
-                open      = excluded.open,
-                high      = excluded.high,
-                low       = excluded.low,
-                close     = excluded.close,
-                adj_close = excluded.adj_close,
-                volume    = excluded.volume,
-                delv_pct  = excluded.delv_pct
+                open      = EXCLUDED.open,
+                high      = EXCLUDED.high,
+                low       = EXCLUDED.low,
+                close     = EXCLUDED.close,
+                adj_close = EXCLUDED.adj_close,
+                volume    = EXCLUDED.volume,
+                delv_pct  = EXCLUDED.delv_pct
         """
+        records = frame_to_records(bars, BHAVCOPY_BAR_COLUMNS)
+        execute_values(
+            cur, insert_sql, records,
+            template="(%s, '1d', %s, %s, %s, %s, %s, %s, %s, %s)", page_size=10000
+        )
+        conn.commit()
 
-        total_updates = 0
-
-        # ---- Process each CSV ----
-        for file in csv_files:
-            csv_path = os.path.join(BHAVCOPY_DIR, file)
-
-            # ---- Extract date (ddmmyyyy) from filename ----
-            try:
-                date_str = file.split("_")[-1].split(".")[0]  # 31122025
-                file_date = datetime.strptime(date_str, "%d%m%Y").strftime("%Y-%m-%d")
-            except Exception:
-                log(f"⚠ Skipping invalid filename format: {file}")
-                continue
+        by_id = df_symbols.set_index("symbol_id")["yahoo_symbol"]
+        seen = set(bars["symbol_id"])
+        summary = {
+            "rows": len(records),
+            "dates": sorted(bars["date"].unique()),
+            "adjusted_ids": adjusted_ids,
+            "adjusted": [by_id[i] for i in adjusted_ids],
+            "missing": sorted(by_id[~by_id.index.isin(seen)].tolist()),
+        }
 
-            log(f"\n📂 Processing: {file} | Date: {file_date}")
+        log(
+            f"\n🎉 Update complete — {summary['rows']} rows from {len(csv_files)} files | "
+            f"adjusted={len(summary['adjusted'])} | missing={len(summary['missing'])}"
+        )
+        print(f"\n🎉 Update complete — total DB rows inserted/updated: {summary['rows']}")
+        return summary
 
-            # ---- Load CSV ----
-            try:
-                df_csv = pd.read_csv(csv_path)
-            except Exception:
-                log(f"❗ Failed reading CSV: {file}")
-                continue
+    except Exception as e:
+        log(f"❗ ERROR during update: {e}")
+        traceback.print_exc()
+        conn.rollback()
+        return None
 
-            if df_csv.empty:
-                log(f"⚠ Empty CSV, skipping: {file}")
-                continue
+    finally:
+        close_db_connection(conn)
+        log("🔚 DB connection closed")
+#################################################################################################
+# Date of a sec_bhavdata_full_<ddmmyyyy>.csv file (None if the name does not match)
+#################################################################################################
+def bhavcopy_file_date(file_name: str):
+    try:
+        date_str = file_name.split("_")[-1].split(".")[0]  # e.g., 31122025
+        return datetime.strptime(date_str, "%d%m%Y").date()
+    except Exception:
+        return None
 
-            # ---- Normalize column names ----
-            df_csv.columns = [c.strip().upper() for c in df_csv.columns]
+#################################################################################################
+# Reads one bhavcopy CSV with upper-case, stripped column names and SYMBOL values
+#################################################################################################
+def read_bhavcopy_csv(csv_path: str) -> pd.DataFrame:
+    df_csv = pd.read_csv(csv_path)
+    df_csv.columns = [c.strip().upper() for c in df_csv.columns]
+    if "SYMBOL" in df_csv.columns:
+        df_csv["SYMBOL"] = df_csv["SYMBOL"].astype(str).str.upper().str.strip()
+    return df_csv
 
-            # ---- Process each symbol ----
-            for _, row_sym in df_symbols.iterrows():
-                sid = row_sym["symbol_id"]
-                sym = row_sym["symbol"]
+#################################################################################################
+# Bhavcopy numeric column → float Series ("1,234.5" → 1234.5, "-" / blanks → NaN)
+#################################################################################################
+def bhavcopy_numeric(series: pd.Series) -> pd.Series:
+    return pd.to_numeric(
+        series.astype(str).str.replace(",", "", regex=False).str.strip(),
+        errors="coerce"
+    )
 
-                df_row = df_csv[df_csv["SYMBOL"] == sym]
+#################################################################################################
+# Symbol table rows → DataFrame(SYMBOL, symbol_id, ...) keyed by the bhavcopy SYMBOL
+# (yahoo_symbol without the .NS suffix)
+#################################################################################################
+def bhavcopy_symbol_map(df_symbols: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "SYMBOL": df_symbols["yahoo_symbol"].str.replace(".NS", "", regex=False).str.upper().str.strip(),
+        "symbol_id": df_symbols["symbol_id"]
+    })
 
-                if df_row.empty:
-                    log(f"⚠ {sym}: not found in CSV for {file_date}")
-                    continue
+#################################################################################################
+# Daily bars for every mapped symbol in the given bhavcopy files (no database access).
+# When a symbol trades in several series the first one in BHAVCOPY_SERIES wins.
+# close and adj_close both take CLOSE_PRICE (the official close Yahoo also reports);
+# PREV_CLOSE is kept for corporate-action detection.
+#################################################################################################
+def build_bhavcopy_bars(csv_paths: list, symbol_map: pd.DataFrame) -> pd.DataFrame:
+    frames = []
+    series_rank = {s: i for i, s in enumerate(BHAVCOPY_SERIES)}
 
-                # df_row = df_row.iloc[0]  # first match
-
-                # # ---- Map columns ----
-                # record = (
-                #     sid,
-                #     "1d",
-                #     file_date,
-                #     df_row.get("OPEN_PRICE", None),
-                #     df_row.get("HIGH_PRICE", None),
-                #     df_row.get("LOW_PRICE", None),
-                #     df_row.get("LAST_PRICE", None),
-                #     df_row.get("CLOSE_PRICE", None),
-                #     df_row.get("TTL_TRD_QNTY", None),
-                #     df_row.get("DELIV_PER", None),
-                # )
-                df_row = df_row.iloc[0]
-
-                # --- fix numeric fields ---
-                clean_int = lambda x: int(str(x).replace(",", "")) if pd.notna(x) else None
-                clean_float = lambda x: float(str(x).replace(",", "")) if pd.notna(x) else None
-
-                open_p  = clean_float(df_row.get("OPEN_PRICE"))
-                high_p  = clean_float(df_row.get("HIGH_PRICE"))
-                low_p   = clean_float(df_row.get("LOW_PRICE"))
-                close_p = clean_float(df_row.get("LAST_PRICE"))
-                adj_c   = clean_float(df_row.get("CLOSE_PRICE"))
-                volume  = clean_int(df_row.get("TTL_TRD_QNTY"))
-                delv    = clean_float(df_row.get("DELIV_PER"))
-
-                record = (sid, "1d", file_date, open_p, high_p, low_p, close_p, adj_c, volume, delv)
-
-                cur.execute(insert_sql, record)
-                total_updates += 1
-
-                log(f"✔ {sym:<12} updated for {file_date}")
+    for csv_path in csv_paths:
+        file_name = os.path.basename(csv_path)
+        file_date = bhavcopy_file_date(file_name)
+        if file_date is None:
+            log(f"⚠ Skipping invalid filename format: {file_name}")
+            continue
 
-        conn.commit()
-        log(f"\n🎉 Update complete — total DB rows inserted/updated: {total_updates}")
-        print(f"\n🎉 Update complete — total DB rows inserted/updated: {total_updates}")
+        try:
+            df_csv = read_bhavcopy_csv(csv_path)
+        except Exception:
+            log(f"❗ Failed reading CSV: {file_name}")
+            continue
+
+        missing_cols = set(BHAVCOPY_PRICE_FIELDS.values()) - set(df_csv.columns)
+        if df_csv.empty or missing_cols:
+            log(f"⚠ Skipping {file_name}: empty or missing {sorted(missing_cols)}")
+            continue
+
+        if "SERIES" in df_csv.columns:
+            rank = df_csv["SERIES"].astype(str).str.strip().str.upper().map(series_rank)
+            df_csv = df_csv[rank.notna()].assign(_rank=rank).sort_values("_rank", kind="stable")
+        df_csv = df_csv.drop_duplicates("SYMBOL", keep="first")
+
+        df_file = symbol_map.merge(df_csv, on="SYMBOL", how="inner")
+        bars = pd.DataFrame({"symbol_id": df_file["symbol_id"], "date": file_date})
+        for col, field in BHAVCOPY_PRICE_FIELDS.items():
+            bars[col] = bhavcopy_numeric(df_file[field])
+        bars["adj_close"] = bars["close"]
+        bars = bars.dropna(subset=["close"])
+
+        frames.append(bars)
+        log(f"📂 {file_name} | Date: {file_date} | {len(bars)} symbols matched")
+
+    if not frames:
+        return pd.DataFrame(columns=BHAVCOPY_BAR_COLUMNS + ["prev_close"])
+
+    bars = pd.concat(frames, ignore_index=True)
+    bars = bars.drop_duplicates(["symbol_id", "date"], keep="last")
+    bars["volume"] = bars["volume"].round().astype("Int64")
+    return bars.sort_values(["symbol_id", "date"], ignore_index=True)
 
-    except Exception as e:
-        log(f"❗ ERROR during update: {e}")
-        conn.rollback()
+#################################################################################################
+# Symbols whose bhavcopy PREV_CLOSE differs from the close before it (the previous file's
+# close, or the last stored close (symbol_id, date, close) for the first file). NSE restates
+# PREV_CLOSE on the ex-date of splits, bonuses and similar actions, so these need a
+# re-adjusted Yahoo history. Only rows whose prior bar is from the previous NSE session are
+# compared: across a missing session (failed download, untraded day) the gap is a price move.
+#################################################################################################
+def find_bhavcopy_adjustments(
+    bars: pd.DataFrame,
+    last_close: pd.DataFrame,
+    tolerance: float = BHAVCOPY_ADJUST_TOLERANCE,
+    calendar=None
+) -> list:
+    if bars.empty:
+        return []
+
+    calendar = calendar or get_calendar("NSE")
+    bars = bars.sort_values(["symbol_id", "date"])
+    by_symbol = bars.groupby("symbol_id")
+    prior = by_symbol["close"].shift(1)
+    prior_date = pd.to_datetime(by_symbol["date"].shift(1))
+
+    first = ~bars["symbol_id"].duplicated()
+    stored = last_close.set_index("symbol_id")
+    prior = prior.where(~first, bars["symbol_id"].map(stored["close"]))
+    prior_date = prior_date.where(~first, pd.to_datetime(bars["symbol_id"].map(stored["date"])))
+
+    prev_session = pd.Series(calendar.prev_session(bars["date"]), index=bars.index)
+    consecutive = prior_date.notna() & (prior_date == prev_session)
+
+    gap = (bars["prev_close"] / prior.astype(float) - 1).abs()
+    return sorted(int(i) for i in bars.loc[consecutive & (gap > tolerance), "symbol_id"].unique())
 
-    finally:
-        close_db_connection(conn)
-        log("🔚 DB connection closed")
 #################################################################################################
 # Reads bhavcopy CSVs and updates only the `delv_pct` field in `equity_price_data` 
 # for matching dates/symbols,inserting missing rows and leaving all price fields untouched.
+# Each file is hash-joined to the symbol map in one merge; all values of all files go to
+# the database in one execute_values batch.
 #################################################################################################
-def update_equity_delv_pct_from_bhavcopy(symbol="ALL", asset_type="india_equity"):
+def update_equity_delv_pct_from_bhavcopy(
+    symbol="ALL", asset_type="india_equity", folder_path=None, start_date=None, end_date=None
+):
     """
     Update delv_pct in PostgreSQL from bhavcopy CSV files.
 
@@ -375,11 +590,11 @@ def update_equity_delv_pct_from_bhavcopy(symbol="ALL", asset_type="india_equity"
 
         log(f"🔎 Symbols to process: {len(df_symbols)}")
 
+        # CSV SYMBOL → symbol_id (strip .NS for CSV matching)
+        symbol_map = bhavcopy_symbol_map(df_symbols)
+
         # ---- Locate CSV files ----
-        csv_files = sorted([
-            f for f in os.listdir(BHAVCOPY_DIR)
-            if f.endswith(".csv") and "sec_bhavdata_full_" in f
-        ])
+        csv_files = bhavcopy_files(folder_path, start_date, end_date)
 
         if not csv_files:
             log("❗ No bhavcopy CSV files found to process")
@@ -388,82 +603,69 @@ def update_equity_delv_pct_from_bhavcopy(symbol="ALL", asset_type="india_equity"
         # ---- PostgreSQL UPSERT SQL ----
         sql_delv = f"""
             INSERT INTO {asset_type}_price_data (symbol_id, timeframe, date, delv_pct)
-            VALUES (%s, '1d', %s, %s)
+            VALUES %s
             ON CONFLICT (symbol_id, timeframe, date)
             DO UPDATE SET delv_pct = EXCLUDED.delv_pct
         """
 
-        total_updates = 0
+        frames = []
 
         # ---- Process each CSV with progress bar ----
-        for file in tqdm(csv_files, desc="Processing BHAVCOPY CSVs", unit="file"):
-            csv_path = os.path.join(BHAVCOPY_DIR, file)
+        for csv_path in tqdm(csv_files, desc="Processing BHAVCOPY CSVs", unit="file"):
+            file = os.path.basename(csv_path)
 
             # Extract date from filename
-            try:
-                date_str = file.split("_")[-1].split(".")[0]  # e.g., 31122025
-                file_date = datetime.strptime(date_str, "%d%m%Y").date()
-            except Exception:
+            file_date = bhavcopy_file_date(file)
+            if file_date is None:
                 log(f"⚠ Skipping invalid filename format: {file}")
                 continue
 
-            log(f"\n📂 Processing: {file} | Date: {file_date}")
-
             # Read CSV
             try:
-                df_csv = pd.read_csv(csv_path)
+                df_csv = read_bhavcopy_csv(csv_path)
             except Exception:
                 log(f"❗ Failed to read CSV: {file}")
                 continue
 
             if df_csv.empty:
-                log(f"⚠ Empty CSV, skipping")
+                log(f"⚠ Empty CSV, skipping: {file}")
                 continue
 
-            # Clean CSV columns and SYMBOL values
-            df_csv.columns = [c.strip().upper() for c in df_csv.columns]
             if "SYMBOL" not in df_csv.columns or "DELIV_PER" not in df_csv.columns:
                 log(f"❌ Missing required columns in CSV: {file}")
                 continue
 
-            df_csv["SYMBOL"] = df_csv["SYMBOL"].astype(str).str.upper().str.strip()
-
-            # ---- Process each symbol ----
-            for _, row_sym in df_symbols.iterrows():
-                sid = row_sym["symbol_id"]
-
-                # Strip .NS for CSV matching
-                sym = row_sym["yahoo_symbol"].replace(".NS", "").upper().strip()
-
-                df_row = df_csv[df_csv["SYMBOL"] == sym]
-                if df_row.empty:
-                    log(f"⚠ SYMBOL NOT FOUND IN CSV: {sym}")
-                    continue
-
-                df_row = df_row.iloc[0]
+            # First row per SYMBOL (as before), joined to the symbol map
+            df_csv = df_csv.drop_duplicates("SYMBOL", keep="first")
+            df_file = symbol_map.merge(df_csv[["SYMBOL", "DELIV_PER"]], on="SYMBOL", how="inner")
 
-                # Clean delv_pct
-                try:
-                    delv = float(str(df_row.get("DELIV_PER")).replace(",", "")) \
-                        if pd.notna(df_row.get("DELIV_PER")) else None
-                except:
-                    delv = None
+            missing = len(symbol_map) - len(df_file)
+            if missing:
+                log(f"⚠ {file_date}: {missing} symbols not found in CSV")
 
-                try:
-                    cur.execute(sql_delv, (sid, file_date, delv))
-                    total_updates += 1
-                except Exception as e_row:
-                    log(f"❗ Failed to update {sym} for {file_date}: {e}")
-                    continue
+            frames.append(pd.DataFrame({
+                "symbol_id": df_file["symbol_id"],
+                "date": file_date,
+                "delv_pct": bhavcopy_numeric(df_file["DELIV_PER"])
+            }))
+            log(f"📂 {file} | Date: {file_date} | {len(df_file)} symbols matched")
 
-                log(f"✔ {sym:<12} delv_pct updated for {file_date}")
+        if not frames:
+            log("⚠ No delv_pct values to update")
+            return
 
+        # ---- One batch for all files ----
+        records = frame_to_records(pd.concat(frames, ignore_index=True), ["symbol_id", "date", "delv_pct"])
+        execute_values(cur, sql_delv, records, template="(%s, '1d', %s, %s)", page_size=10000)
         conn.commit()
+
+        total_updates = len(records)
         log(f"\n🎉 DELV_PCT update complete — total rows affected: {total_updates}")
         print(f"\n🎉 DELV_PCT update complete — total rows affected: {total_updates}")
 
     except Exception as e:
         log(f"❗ ERROR during delv update: {e}")
+        traceback.print_exc()
         conn.rollback()
 
     finally:
@@ -471,8 +673,8 @@ def update_equity_delv_pct_from_bhavcopy(symbol="ALL", asset_type="india_equity"
         log("🔚 DB connection closed")
 
 #################################################################################################
-# Finds the latest date where delivery % is missing, downloads only those bhavcopies, 
-# updates `delv_pct` in the database, and cleans up downloaded files.
+# Finds the latest date where delivery % is missing, makes sure the later bhavcopies are
+# archived (downloading only the ones that are not) and updates `delv_pct` from the archive.
 #################################################################################################
 def update_latest_delv_pct_from_bhavcopy():
     # type="india"
@@ -490,22 +692,21 @@ def update_latest_delv_pct_from_bhavcopy():
         
         log(f"===== DOWNLOAD MISSING BHAVCOPY STARTED =====")
         print(f"===== DOWNLOAD MISSING BHAVCOPY STARTED =====")
-        download_missing_bhavcopies(latest_date_str,ASSET_TYPE)
+        files, failed_days = download_missing_bhavcopies(latest_date_str,ASSET_TYPE)
+        if failed_days:
+            log(f"⚠ delv_pct stays empty for {len(failed_days)} sessions without a bhavcopy: {failed_days}")
         print(f"===== DOWNLOAD MISSING BHAVCOPY FINISHED =====")
         log(f"===== DOWNLOAD MISSING BHAVCOPY FINISHED =====")
 
         log(f"===== UPDATE EQUITY DELIVERY PERCENTAGE STARTED =====")
         print(f"===== UPDATE EQUITY DELIVERY PERCENTAGE STARTED =====")
-        update_equity_delv_pct_from_bhavcopy("All", ASSET_TYPE)
+        if files:
+            update_equity_delv_pct_from_bhavcopy(
+                "All", ASSET_TYPE, start_date=bhavcopy_file_date(os.path.basename(files[0]))
+            )
         print(f"===== UPDATE EQUITY DELIVERY PERCENTAGE FINISHED =====")
         log(f"===== UPDATE EQUITY DELIVERY PERCENTAGE FINISHED =====")
         
-        log(f"===== DELETING FILES STARTED =====")
-        print(f"===== DELETING FILES STARTED =====")
-        delete_files_in_folder(BHAVCOPY_DIR)
-        print(f"===== DELETING FILES FINISHED =====")
-        log(f"===== DELETING FILES FINISHED =====")
-        
     except Exception as e:
         log(f"❗ ERROR: {e}")
         traceback.print_exc(0)
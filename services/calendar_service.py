@@ -0,0 +1,254 @@
+import os
+import threading
+import traceback
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+from db.connection import get_db_connection, close_db_connection
+from config.logger import log
+from config.paths import CALENDAR_OVERRIDES
+from config.db_table import ASSET_TABLE_MAP
+from config.nse_constants import (
+    CALENDAR_MARKETS, CALENDAR_START, CALENDAR_HORIZON_DAYS, CALENDAR_MIN_COVERAGE
+)
+
+PERIOD_KINDS = ("1wk", "1mo")
+
+_calendars = {}                  # market → TradingCalendar (per process)
+_calendars_lock = threading.Lock()
+
+#################################################################################################
+# Sessions of one market held as flat per-day arrays over [start, end], so every lookup is
+# an index into a precomputed array:
+#   is_session / next_session / prev_session / sessions_between
+#   period_start / period_end → first / last session of the week ('1wk') or month ('1mo')
+# Scalars (date, datetime, str, Timestamp) return a date (or None); array-likes return a
+# DatetimeIndex with NaT where no session exists.
+#################################################################################################
+class TradingCalendar:
+    def __init__(self, market: str, sessions, start, end):
+        self.market = market
+        self.start = np.datetime64(pd.Timestamp(start).date(), "D")
+        self.end = np.datetime64(pd.Timestamp(end).date(), "D")
+        self._start_date = pd.Timestamp(start).date()
+
+        days = np.arange(self.start, self.end + 1, dtype="datetime64[D]")
+        sessions = np.unique(np.asarray(sessions, dtype="datetime64[D]"))
+        self.sessions = sessions[(sessions >= self.start) & (sessions <= self.end)]
+
+        n = len(days)
+        self._is_session = np.zeros(n, dtype=bool)
+        self._is_session[(self.sessions - self.start).astype(np.int64)] = True
+
+        # Position in self.sessions of the last session <= day / first session >= day
+        self._on_or_before = np.searchsorted(self.sessions, days, side="right") - 1
+        self._on_or_after = np.searchsorted(self.sessions, days, side="left")
+
+        # First / last session of each day's week and month (-1 when the period has none)
+        self._bounds = {}
+        for kind in PERIOD_KINDS:
+            day_key = _period_key(days, kind)
+            sess_key = _period_key(self.sessions, kind)
+            first = np.searchsorted(sess_key, day_key, side="left")
+            last = np.searchsorted(sess_key, day_key, side="right") - 1
+            has = first <= last
+            self._bounds[kind] = (np.where(has, first, -1), np.where(has, last, -1))
+
+    # -------------------------------------------------------------
+    def _index(self, values):
+        # Fast path for a single date: plain integer arithmetic, no array conversion
+        if isinstance(values, (date, str)):
+            day = pd.Timestamp(values).date() if isinstance(values, (datetime, str)) else values
+            i = (day - self._start_date).days
+            if not 0 <= i < len(self._is_session):
+                raise ValueError(f"{self.market} calendar covers {self.start} → {self.end}, got {day}")
+            return np.array([i]), True
+
+        scalar = np.ndim(values) == 0 and not isinstance(values, (list, tuple))
+        days = pd.to_datetime(np.atleast_1d(values)).to_numpy(dtype="datetime64[D]")
+        if len(days) and (days.min() < self.start or days.max() > self.end):
+            raise ValueError(
+                f"{self.market} calendar covers {self.start} → {self.end}, got {days.min()} → {days.max()}"
+            )
+        return (days - self.start).astype(np.int64), scalar
+
+    def _out(self, pos, scalar):
+        ok = (pos >= 0) & (pos < len(self.sessions))
+        if len(self.sessions):
+            picked = self.sessions[np.clip(pos, 0, len(self.sessions) - 1)]
+        else:
+            picked = np.full(len(pos), np.datetime64("NaT"), dtype="datetime64[D]")
+        out = np.where(ok, picked, np.datetime64("NaT"))
+        if scalar:
+            return None if not ok[0] else pd.Timestamp(out[0]).date()
+        return pd.DatetimeIndex(out)
+
+    # -------------------------------------------------------------
+    def is_session(self, values):
+        idx, scalar = self._index(values)
+        res = self._is_session[idx]
+        return bool(res[0]) if scalar else res
+
+    def next_session(self, values):
+        """First session strictly after the day."""
+        idx, scalar = self._index(values)
+        nxt = np.minimum(idx + 1, len(self._on_or_after) - 1)
+        pos = np.where(idx + 1 < len(self._on_or_after), self._on_or_after[nxt], len(self.sessions))
+        return self._out(pos, scalar)
+
+    def prev_session(self, values):
+        """Last session strictly before the day."""
+        idx, scalar = self._index(values)
+        pos = np.where(idx > 0, self._on_or_before[np.maximum(idx - 1, 0)], -1)
+        return self._out(pos, scalar)
+
+    def session_on_or_before(self, values):
+        idx, scalar = self._index(values)
+        return self._out(self._on_or_before[idx], scalar)
+
+    def sessions_between(self, start, end) -> list:
+        """Sessions in [start, end] as dates."""
+        (i,), _ = self._index(start)
+        (j,), _ = self._index(end)
+        lo, hi = self._on_or_after[i], self._on_or_before[j]
+        return [pd.Timestamp(d).date() for d in self.sessions[lo:hi + 1]]
+
+    def period_start(self, values, kind: str = "1wk"):
+        idx, scalar = self._index(values)
+        return self._out(self._bounds[kind][0][idx], scalar)
+
+    def period_end(self, values, kind: str = "1wk"):
+        idx, scalar = self._index(values)
+        return self._out(self._bounds[kind][1][idx], scalar)
+
+
+def _period_key(days: np.ndarray, kind: str) -> np.ndarray:
+    if kind == "1wk":
+        # 1970-01-01 was a Thursday: shift so weeks start on Monday
+        return (days.astype(np.int64) + 3) // 7
+    if kind == "1mo":
+        return days.astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"Unsupported period: {kind}")
+
+#################################################################################################
+# Market of an asset_type (or the market name itself)
+#################################################################################################
+def market_for(asset_type: str) -> str:
+    if asset_type in CALENDAR_MARKETS:
+        return asset_type
+    for market, spec in CALENDAR_MARKETS.items():
+        if asset_type in spec["asset_types"]:
+            return market
+    raise ValueError(f"No trading calendar for: {asset_type}")
+
+#################################################################################################
+# Overrides file rows for one market → ({holiday dates}, {extra session dates}).
+# A missing file means no overrides.
+#################################################################################################
+def load_calendar_overrides(market: str, path=CALENDAR_OVERRIDES):
+    if not os.path.exists(path):
+        return set(), set()
+
+    df = pd.read_csv(path, comment="#")
+    df.columns = [c.strip().lower() for c in df.columns]
+    df = df[df["market"].astype(str).str.strip().str.upper() == market]
+    dates = pd.to_datetime(df["date"], errors="coerce").dt.date
+    kinds = df["kind"].astype(str).str.strip().str.lower()
+
+    bad = dates.isna() | ~kinds.isin(["holiday", "session"])
+    if bad.any():
+        log(f"⚠ {path}: {int(bad.sum())} invalid {market} override rows ignored")
+
+    return set(dates[~bad & (kinds == "holiday")]), set(dates[~bad & (kinds == "session")])
+
+#################################################################################################
+# Daily bar count per date across the market's price tables (one GROUP BY per table)
+#################################################################################################
+def load_session_counts(market: str, conn=None) -> pd.DataFrame:
+    own_conn = conn is None
+    try:
+        if own_conn:
+            conn = get_db_connection()
+        frames = []
+        with conn.cursor() as cur:
+            for asset_type in CALENDAR_MARKETS[market]["asset_types"]:
+                price_table = ASSET_TABLE_MAP[asset_type][1]
+                cur.execute(f"""
+                    SELECT date, COUNT(*) FROM {price_table}
+                    WHERE timeframe = '1d'
+                    GROUP BY date
+                """)
+                frames.append(pd.DataFrame(cur.fetchall(), columns=["date", "bars"]))
+        counts = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["date", "bars"])
+        return counts.groupby("date", as_index=False)["bars"].sum()
+    finally:
+        if own_conn and conn:
+            close_db_connection(conn)
+
+#################################################################################################
+# Builds a market calendar:
+#   1. regular days from the market's weekmask
+#   2. inside the stored history (derive=True), a date is a session when its bar count
+#      reaches CALENDAR_MIN_COVERAGE of the rolling median — weekday holidays drop out,
+#      special weekend sessions come in
+#   3. the overrides file wins over both (future holidays, corrections)
+# `counts` (date, bars) can be passed in instead of reading the database.
+#################################################################################################
+def build_trading_calendar(market: str, counts: pd.DataFrame | None = None, today=None) -> TradingCalendar:
+    market = market_for(market)
+    spec = CALENDAR_MARKETS[market]
+    today = pd.Timestamp(today or date.today()).date()
+    start = pd.Timestamp(CALENDAR_START).date()
+    end = today + timedelta(days=CALENDAR_HORIZON_DAYS)
+
+    days = pd.date_range(start, end, freq="D")
+    weekmask = np.array([c == "1" for c in spec["weekmask"]])
+    regular = weekmask[days.weekday]
+
+    sessions = pd.Series(regular, index=days)
+
+    if spec["derive"]:
+        if counts is None:
+            try:
+                counts = load_session_counts(market)
+            except Exception as e:
+                log(f"⚠ {market} calendar: stored bars unavailable, using weekmask only | {e}")
+                traceback.print_exc()
+                counts = pd.DataFrame(columns=["date", "bars"])
+
+        if not counts.empty:
+            counts = counts.assign(date=pd.to_datetime(counts["date"])).set_index("date")["bars"].sort_index()
+            counts = counts[(counts.index >= days[0]) & (counts.index <= days[-1])]
+
+        if len(counts):
+            usual = counts.rolling(21, center=True, min_periods=1).median()
+            traded = counts[counts >= usual * CALENDAR_MIN_COVERAGE].index
+            inside = (days >= counts.index.min()) & (days <= counts.index.max())
+            sessions[inside] = days[inside].isin(traded)
+            log(
+                f"📅 {market} calendar derived from {len(counts)} stored dates | "
+                f"{int((regular & inside & ~sessions.to_numpy()).sum())} holidays, "
+                f"{int((~regular & sessions.to_numpy()).sum())} special sessions"
+            )
+
+    holidays, extra = load_calendar_overrides(market)
+    if holidays or extra:
+        day_dates = days.date
+        sessions[np.isin(day_dates, list(holidays))] = False
+        sessions[np.isin(day_dates, list(extra))] = True
+
+    return TradingCalendar(market, days[sessions.to_numpy()], start, end)
+
+#################################################################################################
+# Cached calendar for an asset_type or market (built once per process; refresh=True rebuilds,
+# e.g. after new bars or override edits)
+#################################################################################################
+def get_calendar(asset_type: str, refresh: bool = False) -> TradingCalendar:
+    market = market_for(asset_type)
+    today = date.today()
+    with _calendars_lock:
+        cal = _calendars.get(market)
+        if refresh or cal is None or cal.end < np.datetime64(today + timedelta(days=7), "D"):
+            cal = build_trading_calendar(market, today=today)
+            _calendars[market] = cal
+    return cal
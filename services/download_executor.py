@@ -0,0 +1,123 @@
+import time
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+from config.logger import log
+
+#################################################################################################
+# Thread-safe token bucket. Refills `rate` tokens per second up to `capacity`;
+# acquire() blocks until the requested number of tokens is available.
+# A request larger than the bucket waits for a full bucket and is then charged in full,
+# leaving the bucket in debt: later requests wait until the debt is refilled, so the
+# long-run rate stays at `rate` tokens per second whatever the unit cost.
+#################################################################################################
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> None:
+        if self.rate <= 0:
+            return
+
+        tokens = float(tokens)
+        # A request larger than the bucket would never fit: it only waits for a full bucket
+        needed = min(tokens, self.capacity)
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= needed:
+                    self.tokens -= tokens
+                    return
+
+                wait = (needed - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+#################################################################################################
+# Calls fetch_fn(unit, timeout=...) with exponential backoff.
+# Retries only on exceptions; the last exception is re-raised once retries are exhausted.
+#################################################################################################
+def call_with_retries(
+    fetch_fn,
+    unit,
+    limiter: TokenBucket | None = None,
+    cost: float = 1,
+    max_retries: int = 3,
+    backoff_base: float = 1.0,
+    timeout: float | None = None
+):
+    attempt = 0
+    while True:
+        if limiter:
+            limiter.acquire(cost)
+        try:
+            return fetch_fn(unit, timeout=timeout)
+        except Exception as e:
+            if attempt >= max_retries:
+                raise
+            delay = backoff_base * (2 ** attempt)
+            log(f"↻ Retry {attempt + 1}/{max_retries} in {delay:.1f}s | {e}")
+            time.sleep(delay)
+            attempt += 1
+
+#################################################################################################
+# Runs fetch_fn over all units on a thread pool, sharing one rate limiter.
+# Each unit is charged cost_fn(unit) tokens per attempt (e.g. number of tickers in a batch).
+# Returns (results, failed):
+#   results : list of (unit, value) for units that completed
+#   failed  : list of units that still raised after all retries
+#################################################################################################
+def run_downloads(
+    units,
+    fetch_fn,
+    max_workers: int = 8,
+    rate_per_sec: float = 5.0,
+    max_retries: int = 3,
+    backoff_base: float = 1.0,
+    timeout: float | None = 30,
+    cost_fn=None,
+    desc: str = "download"
+):
+    units = list(units)
+    results, failed = [], []
+    if not units:
+        return results, failed
+
+    limiter = TokenBucket(rate_per_sec) if rate_per_sec else None
+    cost_fn = cost_fn or (lambda unit: 1)
+    max_workers = max(1, min(int(max_workers or 1), len(units)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(
+                call_with_retries,
+                fetch_fn,
+                unit,
+                limiter=limiter,
+                cost=cost_fn(unit),
+                max_retries=max_retries,
+                backoff_base=backoff_base,
+                timeout=timeout
+            ): unit
+            for unit in units
+        }
+
+        for future in tqdm(as_completed(futures), total=len(futures), desc=desc, ncols=100):
+            unit = futures[future]
+            try:
+                results.append((unit, future.result()))
+            except Exception as e:
+                log(f"❌ Download unit failed after {max_retries} retries | {e}")
+                traceback.print_exc()
+                failed.append(unit)
+
+    return results, failed
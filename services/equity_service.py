@@ -1,22 +1,26 @@
 import yfinance as yf
 import os
 import traceback
+from datetime import timedelta
 import pandas as pd
 from services.cleanup_service import (
     delete_invalid_timeframe_rows, 
     delete_files_in_folder
 )
-from config.paths import YAHOO_DIR,BHAVCOPY_DIR,BHAVCOPY_DIR_DB
+from config.paths import YAHOO_DIR
 from config.logger import log
 from services.yahoo_service import download_yahoo_data_all_timeframes
+from services.weekly_monthly_service import build_weekly_monthly_bars
+from services.forward_returns_service import refresh_forward_returns
 from services.symbol_service import get_latest_trading_date
 from services.import_export_service import import_csv_to_db
 from services.bhavcopy_loader import (
     download_missing_bhavcopies, 
-    update_equity_delv_pct_from_bhavcopy
+    update_equity_delv_pct_from_bhavcopy,
+    update_equity_price_from_bhavcopy,
+    bhavcopy_file_date
 )
-from services.cleanup_service import copy_files
-from config.nse_constants import FREQUENCIES
+from config.nse_constants import FREQUENCIES, YAHOO_BATCH_SIZE, YAHOO_MAX_WORKERS
 
 # #################################################################################################
 # Runs the complete equity price pipeline—cleans folders, downloads 
@@ -24,11 +28,18 @@ from config.nse_constants import FREQUENCIES
 # and for incremental India runs also processes bhavcopies to update delivery data.
 # mode = "full" → full refresh
 # mode = "incr" → incremental refresh
+# bhavcopy_first (incr + india_equity) → daily bars come from the NSE bhavcopies; Yahoo is only
+#                  called for symbols missing from them (incremental) and for symbols with a
+#                  corporate action (full re-adjusted history)
 # #################################################################################################
 def insert_equity_price_data_pipeline(
     symbol="ALL",
     asset_type="india_equity",
-    mode="full"   # "full" or "incr"
+    mode="full",  # "full" or "incr"
+    batch_size=YAHOO_BATCH_SIZE,
+    max_workers=YAHOO_MAX_WORKERS,
+    derive_periods=True,  # build 1wk/1mo from stored 1d bars instead of downloading them
+    bhavcopy_first=True
 ):
     try:
         # ------------------------------------------------------------------
@@ -52,7 +63,41 @@ def insert_equity_price_data_pipeline(
             print(f"DAILY LATEST DATE IS: {latest_dt} =====")
 
         # ------------------------------------------------------------------
-        # 3. YAHOO DOWNLOAD
+        # 3. BHAVCOPY INGEST (INCREMENTAL + INDIA)
+        # ------------------------------------------------------------------
+        download_timeframes = ["1d"] if derive_periods else FREQUENCIES
+        use_bhavcopy = bhavcopy_first and mode == "incr" and asset_type == "india_equity"
+        bhav_summary = None
+        bhav_failed = []
+
+        if use_bhavcopy:
+            log("===== BHAVCOPY DOWNLOAD STARTED =====")
+            print("===== BHAVCOPY DOWNLOAD STARTED =====")
+            bhav_files, bhav_failed = download_missing_bhavcopies(latest_dt, asset_type=asset_type)
+            log("===== BHAVCOPY DOWNLOAD FINISHED =====")
+            print("===== BHAVCOPY DOWNLOAD FINISHED =====")
+
+            if bhav_files:
+                log("===== UPDATE PRICES FROM BHAVCOPY STARTED =====")
+                print("===== UPDATE PRICES FROM BHAVCOPY STARTED =====")
+                bhav_summary = update_equity_price_from_bhavcopy(
+                    symbol=symbol,
+                    asset_type=asset_type,
+                    start_date=bhavcopy_file_date(os.path.basename(bhav_files[0])),
+                    end_date=bhavcopy_file_date(os.path.basename(bhav_files[-1]))
+                )
+                log("===== UPDATE PRICES FROM BHAVCOPY FINISHED =====")
+                print("===== UPDATE PRICES FROM BHAVCOPY FINISHED =====")
+
+            if bhav_summary is None:
+                log("⚠ No bhavcopy data ingested, falling back to Yahoo for all symbols")
+            elif bhav_failed:
+                # Sessions still missing after the retries: Yahoo refetches every symbol from the
+                # first of them, otherwise the next run would start after the hole
+                log(f"⚠ No bhavcopy for {len(bhav_failed)} sessions from {bhav_failed[0]}, Yahoo fills them for all symbols")
+
+        # ------------------------------------------------------------------
+        # 3b. YAHOO DOWNLOAD (everything, or only bhavcopy gaps/adjustments)
         # ------------------------------------------------------------------
         log("===== YAHOO DOWNLOAD STARTED =====")
         print("===== YAHOO DOWNLOAD STARTED =====")
@@ -61,15 +106,57 @@ def insert_equity_price_data_pipeline(
             download_yahoo_data_all_timeframes(
                 asset_type = asset_type,
                 symbols = symbol, 
-                mode= mode
+                mode= mode,
+                batch_size=batch_size,
+                max_workers=max_workers,
+                timeframes=download_timeframes
             )
-        else:
+        elif bhav_summary is None:
             download_yahoo_data_all_timeframes(
                 asset_type = asset_type,
                 symbols = symbol, 
                 mode= mode,
-                latest_dt=latest_dt
+                latest_dt=latest_dt,
+                batch_size=batch_size,
+                max_workers=max_workers,
+                timeframes=download_timeframes
             )
+        else:
+            log(
+                f"Yahoo needed for {len(bhav_summary['missing'])} missing and "
+                f"{len(bhav_summary['adjusted'])} adjusted symbols"
+            )
+            # One CSV per symbol, later calls overwrite: order by widening date range
+            # (failed sessions → missing symbols from latest_dt → adjusted symbols in full)
+            if bhav_failed:
+                download_yahoo_data_all_timeframes(
+                    asset_type = asset_type,
+                    symbols = symbol,
+                    mode= mode,
+                    latest_dt=bhav_failed[0] - timedelta(days=1),
+                    batch_size=batch_size,
+                    max_workers=max_workers,
+                    timeframes=download_timeframes
+                )
+            if bhav_summary["missing"]:
+                download_yahoo_data_all_timeframes(
+                    asset_type = asset_type,
+                    symbols = ",".join(bhav_summary["missing"]),
+                    mode= mode,
+                    latest_dt=latest_dt,
+                    batch_size=batch_size,
+                    max_workers=max_workers,
+                    timeframes=download_timeframes
+                )
+            if bhav_summary["adjusted"]:
+                download_yahoo_data_all_timeframes(
+                    asset_type = asset_type,
+                    symbols = ",".join(bhav_summary["adjusted"]),
+                    mode= "full",
+                    batch_size=batch_size,
+                    max_workers=max_workers,
+                    timeframes=download_timeframes
+                )
 
         log("===== YAHOO DOWNLOAD FINISHED =====")
         print("===== YAHOO DOWNLOAD FINISHED =====")
@@ -84,14 +171,41 @@ def insert_equity_price_data_pipeline(
         print("===== CSV TO DATABASE IMPORT FINISHED =====")
 
         # ------------------------------------------------------------------
-        # 5. CLEAN INVALID WEEKLY / MONTHLY
+        # 5. DERIVE WEEKLY / MONTHLY FROM DAILY (or clean downloaded ones)
+        # ------------------------------------------------------------------
+        if derive_periods:
+            log("===== DERIVE WEEKLY & MONTHLY BARS STARTED =====")
+            print("===== DERIVE WEEKLY & MONTHLY BARS STARTED =====")
+            build_weekly_monthly_bars(
+                asset_type=asset_type,
+                mode=mode,
+                since=(latest_dt + timedelta(days=1)) if mode == "incr" and latest_dt else None
+            )
+            if bhav_summary and bhav_summary["adjusted_ids"]:
+                # Re-adjusted histories change every period of those symbols
+                build_weekly_monthly_bars(
+                    asset_type=asset_type,
+                    mode="full",
+                    symbol_ids=bhav_summary["adjusted_ids"]
+                )
+            log("===== DERIVE WEEKLY & MONTHLY BARS FINISHED =====")
+            print("===== DERIVE WEEKLY & MONTHLY BARS FINISHED =====")
+        else:
+            log("===== DELETE INVALID ROWS FOR WEEK & MONTH STARTED =====")
+            print("===== DELETE INVALID ROWS FOR WEEK & MONTH STARTED =====")
+            delete_invalid_timeframe_rows("1wk", data_type="price", asset_type=asset_type)
+            delete_invalid_timeframe_rows("1mo", data_type="price", asset_type=asset_type)
+            log("===== DELETE INVALID ROWS FOR WEEK & MONTH FINISHED =====")
+            print("===== DELETE INVALID ROWS FOR WEEK & MONTH FINISHED =====")
+
+        # ------------------------------------------------------------------
+        # 5b. FORWARD RETURNS (backtest lookup table)
         # ------------------------------------------------------------------
-        log("===== DELETE INVALID ROWS FOR WEEK & MONTH STARTED =====")
-        print("===== DELETE INVALID ROWS FOR WEEK & MONTH STARTED =====")
-        delete_invalid_timeframe_rows("1wk", data_type="price", asset_type=asset_type)
-        delete_invalid_timeframe_rows("1mo", data_type="price", asset_type=asset_type)
-        log("===== DELETE INVALID ROWS FOR WEEK & MONTH FINISHED =====")
-        print("===== DELETE INVALID ROWS FOR WEEK & MONTH FINISHED =====")
+        log("===== REFRESH FORWARD RETURNS STARTED =====")
+        print("===== REFRESH FORWARD RETURNS STARTED =====")
+        refresh_forward_returns(asset_type=asset_type, mode=mode)
+        log("===== REFRESH FORWARD RETURNS FINISHED =====")
+        print("===== REFRESH FORWARD RETURNS FINISHED =====")
 
         # ------------------------------------------------------------------
         # 6. CLEAN YAHOO FOLDERS AGAIN
@@ -103,35 +217,6 @@ def insert_equity_price_data_pipeline(
         # log("===== DELETE YAHOO FILES FROM FOLDERS FINISHED =====")
         # print("===== DELETE YAHOO FILES FROM FOLDERS FINISHED =====")
 
-        # ------------------------------------------------------------------
-        # 7. EXTRA STEPS (ONLY FOR INCREMENTAL + INDIA)
-        # ------------------------------------------------------------------
-        # if mode == "incr" and type == "india":
-
-        #     log("===== BHAVCOPY DOWNLOAD STARTED =====")
-        #     print("===== BHAVCOPY DOWNLOAD STARTED =====")
-        #     download_missing_bhavcopies(latest_dt, type="india")
-        #     log("===== BHAVCOPY DOWNLOAD FINISHED =====")
-        #     print("===== BHAVCOPY DOWNLOAD FINISHED =====")
-
-        #     log("===== UPDATE DELIVERY PERCENTAGE FROM BHAVCOPY STARTED =====")
-        #     print("===== UPDATE DELIVERY PERCENTAGE FROM BHAVCOPY STARTED =====")
-        #     update_equity_delv_pct_from_bhavcopy(symbol="ALL", type="india")
-        #     log("===== UPDATE DELIVERY PERCENTAGE FROM BHAVCOPY FINISHED =====")
-        #     print("===== UPDATE DELIVERY PERCENTAGE FROM BHAVCOPY FINISHED =====")
-
-        #     log("===== COPY BHAVCOPY FILES STARTED =====")
-        #     print("===== COPY BHAVCOPY FILES STARTED =====")
-        #     copy_files(BHAVCOPY_DIR, BHAVCOPY_DIR_DB)
-        #     log("===== COPY BHAVCOPY FILES FINISHED =====")
-        #     print("===== COPY BHAVCOPY FILES FINISHED =====")
-
-        #     log("===== DELETE FILES FROM BHAVCOPY FOLDERS STARTED =====")
-        #     print("===== DELETE FILES FROM BHAVCOPY FOLDERS STARTED =====")
-        #     delete_files_in_folder(BHAVCOPY_DIR)
-        #     log("===== DELETE FILES FROM BHAVCOPY FOLDERS FINISHED =====")
-        #     print("===== DELETE FILES FROM BHAVCOPY FOLDERS FINISHED =====")
-
     except Exception as e:
         log(f"ERROR: {e}")
         traceback.print_exc()
@@ -0,0 +1,143 @@
+import time
+import traceback
+import pandas as pd
+from tqdm import tqdm
+from psycopg2.extras import execute_values
+from db.connection import get_db_connection, close_db_connection
+from db.sql import SQL_CREATE_FORWARD_RETURNS
+from db.bulk import frame_to_records
+from config.logger import log
+from config.db_table import ASSET_TABLE_MAP, FORWARD_RETURNS_TABLE_MAP
+from services.scanners.backtest_engine import (
+    PricePanel, FORWARD_HORIZONS, compute_forward_prices
+)
+
+FORWARD_COLUMNS = (
+    ["symbol_id", "date", "open", "next_date", "next_open"]
+    + [c for n in FORWARD_HORIZONS for c in (f"date_{n}d", f"close_{n}d")]
+    + ["week_end_date", "week_end_close"]
+)
+FORWARD_DATE_COLUMNS = [c for c in FORWARD_COLUMNS if "date" in c]
+
+#################################################################################################
+# Keeps {asset}_forward_returns in sync with the daily bars.
+# mode="full" → recompute every symbol from its first bar
+# mode="incr" → per symbol, recompute from the first row whose forward window was still
+#               open (close_20d IS NULL) — new bars can only change those rows
+#################################################################################################
+def refresh_forward_returns(asset_type: str = "india_equity", mode: str = "incr", block_size: int = 500):
+    if asset_type not in ASSET_TABLE_MAP:
+        raise ValueError(f"Unsupported asset_type: {asset_type}")
+
+    symbol_table, price_table, _, _ = ASSET_TABLE_MAP[asset_type]
+    fwd_table = FORWARD_RETURNS_TABLE_MAP[asset_type]
+    last_horizon = f"close_{max(FORWARD_HORIZONS)}d"
+
+    conn = None
+    try:
+        start = time.time()
+        conn = get_db_connection()
+        cur = conn.cursor()
+
+        cur.execute(SQL_CREATE_FORWARD_RETURNS.format(fwd_table=fwd_table, symbol_table=symbol_table))
+        conn.commit()
+
+        cur.execute(f"SELECT symbol_id FROM {symbol_table} ORDER BY symbol_id")
+        symbol_ids = [r[0] for r in cur.fetchall()]
+        blocks = [symbol_ids[i:i + block_size] for i in range(0, len(symbol_ids), block_size)]
+
+        upsert_sql = f"""
+            INSERT INTO {fwd_table} ({", ".join(FORWARD_COLUMNS)})
+            VALUES %s
+            ON CONFLICT (symbol_id, date)
+            DO UPDATE SET {", ".join(f"{c} = EXCLUDED.{c}" for c in FORWARD_COLUMNS[2:])}
+        """
+
+        total_rows = 0
+        for block in tqdm(blocks, desc=f"{asset_type} | forward returns", ncols=100):
+            try:
+                if mode == "incr":
+                    # Bars from each symbol's first still-open forward row
+                    # (symbols not in the table yet are loaded in full)
+                    df = pd.read_sql(f"""
+                        WITH open_rows AS (
+                            SELECT symbol_id, MIN(date) AS from_date
+                            FROM {fwd_table}
+                            WHERE symbol_id = ANY(%s) AND {last_horizon} IS NULL
+                            GROUP BY symbol_id
+                        ),
+                        known AS (
+                            SELECT symbol_id, MAX(date) AS last_date
+                            FROM {fwd_table}
+                            WHERE symbol_id = ANY(%s)
+                            GROUP BY symbol_id
+                        )
+                        SELECT p.symbol_id, p.date, p.open, p.close
+                        FROM {price_table} p
+                        LEFT JOIN open_rows o ON o.symbol_id = p.symbol_id
+                        LEFT JOIN known k ON k.symbol_id = p.symbol_id
+                        WHERE p.timeframe = '1d'
+                          AND p.symbol_id = ANY(%s)
+                          AND p.date >= COALESCE(o.from_date, k.last_date + 1, DATE '1900-01-01')
+                        ORDER BY p.symbol_id, p.date
+                    """, conn, params=(block, block, block))
+                else:
+                    df = pd.read_sql(f"""
+                        SELECT symbol_id, date, open, close
+                        FROM {price_table}
+                        WHERE timeframe = '1d' AND symbol_id = ANY(%s)
+                        ORDER BY symbol_id, date
+                    """, conn, params=(block,))
+
+                if df.empty:
+                    continue
+
+                df_fwd = compute_forward_prices(PricePanel(df))
+                for col in FORWARD_DATE_COLUMNS:
+                    df_fwd[col] = df_fwd[col].dt.date
+
+                if mode != "incr":
+                    cur.execute(f"DELETE FROM {fwd_table} WHERE symbol_id = ANY(%s)", (block,))
+
+                records = frame_to_records(df_fwd, FORWARD_COLUMNS)
+                execute_values(cur, upsert_sql, records, page_size=5000)
+                conn.commit()
+                total_rows += len(records)
+
+            except Exception as e:
+                conn.rollback()
+                log(f"❌ FORWARD RETURNS FAILED | {asset_type} block {block[0]}..{block[-1]} | {e}")
+                traceback.print_exc()
+
+        log(f"✅ Forward returns refreshed | {asset_type} | {mode} | {total_rows} rows | {time.time() - start:.1f}s")
+        print(f"✅ Forward returns refreshed | {asset_type} | {total_rows} rows")
+
+    except Exception as e:
+        log(f"❌ refresh_forward_returns FAILED | {e}")
+        traceback.print_exc()
+
+    finally:
+        if conn:
+            close_db_connection(conn)
+
+#################################################################################################
+# Forward-returns rows of `symbol_ids` from start_date (to end_date), dates as datetime64
+#################################################################################################
+def load_forward_returns(conn, asset_type, symbol_ids, start_date, end_date=None) -> pd.DataFrame:
+    fwd_table = FORWARD_RETURNS_TABLE_MAP[asset_type]
+    sql = f"""
+        SELECT {", ".join(FORWARD_COLUMNS)}
+        FROM {fwd_table}
+        WHERE symbol_id = ANY(%s) AND date >= %s
+    """
+    params = [sorted({int(s) for s in symbol_ids}), pd.Timestamp(start_date).date()]
+    if end_date is not None:
+        sql += " AND date <= %s"
+        params.append(pd.Timestamp(end_date).date())
+
+    df = pd.read_sql(sql, conn, params=tuple(params))
+    for col in FORWARD_DATE_COLUMNS:
+        df[col] = pd.to_datetime(df[col])
+
+    log(f"📦 Forward returns loaded | {asset_type} | {len(df)} rows")
+    return df
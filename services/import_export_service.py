@@ -1,9 +1,12 @@
 import os
 import pandas as pd
+import time
 import traceback
 from datetime import datetime
 from tqdm import tqdm
 from db.connection import get_db_connection, close_db_connection
+from db.bulk import copy_frame
+from db.sql import SQL_PRICE_STAGING, SQL_PRICE_MERGE
 from config.paths import YAHOO_DIR
 from config.db_table import ASSET_PRICE_SYMBOL_MAP, ASSET_TABLE_MAP
 from config.nse_constants import FREQUENCIES
@@ -11,7 +14,20 @@ from config.logger import log
 
 #################################################################################################
 # Unified CSV importer for ALL asset types (PostgreSQL)
+# Each CSV is streamed with COPY into a temp staging table (dropped at the commit), then
+# every timeframe is merged into the price table with one set-based upsert.
 #################################################################################################
+PRICE_COLUMNS = ["symbol_id", "timeframe", "date", "open", "high", "low", "close", "adj_close", "volume"]
+CSV_COLUMN_MAP = {
+    "Date": "date",
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Adj Close": "adj_close",
+    "Volume": "volume",
+}
+
 def import_csv_to_db(asset_type="india_equity"):
     conn = None
     try:
@@ -23,14 +39,21 @@ def import_csv_to_db(asset_type="india_equity"):
 
         lookup_table = ASSET_TABLE_MAP[asset_type][0]
         table_name = ASSET_TABLE_MAP[asset_type][1]
+        staging_table = f"{table_name}_staging"
 
         id_col = "symbol_id"
         id_lookup_col = "yahoo_symbol"
 
-        numeric_cols = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+        numeric_cols = ["open", "high", "low", "close", "adj_close", "volume"]
 
         print(f"\n[CONFIG] asset_type={asset_type} | price_table={table_name} | lookup_table={lookup_table}")
 
+        # --------------------------------------------------
+        # SYMBOL LOOKUP (ONE QUERY)
+        # --------------------------------------------------
+        cur.execute(f"SELECT {id_lookup_col}, {id_col} FROM {lookup_table}")
+        symbol_ids = {sym: sid for sym, sid in cur.fetchall()}
+
         # --------------------------------------------------
         # PROCESS TIMEFRAMES
         # --------------------------------------------------
@@ -46,7 +69,11 @@ def import_csv_to_db(asset_type="india_equity"):
                 continue
 
             print(f"\n===== IMPORTING {asset_type.upper()} | {timeframe} | {len(files)} files =====")
-            rows_inserted = 0
+            tf_start = time.time()
+            rows_staged = 0
+
+            # Fresh per timeframe: the merge commit drops it
+            cur.execute(SQL_PRICE_STAGING.format(staging_table=staging_table))
 
             # --------------------------------------------------
             # tqdm progress bar for CSV files
@@ -58,84 +85,68 @@ def import_csv_to_db(asset_type="india_equity"):
                 # --------------------------------------------------
                 # LOOKUP SYMBOL_ID
                 # --------------------------------------------------
-                try:
-                    cur.execute(
-                        f"SELECT {id_col} FROM {lookup_table} WHERE {id_lookup_col} = %s",
-                        (symbol_name,)
-                    )
-                    res = cur.fetchone()
-                    if not res:
-                        log(f"❌ LOOKUP FAILED | CSV={symbol_name} | table={lookup_table} | column={id_lookup_col}")
-                        continue
-                    symbol_id = res[0]
+                symbol_id = symbol_ids.get(symbol_name)
+                if symbol_id is None:
+                    log(f"❌ LOOKUP FAILED | CSV={symbol_name} | table={lookup_table} | column={id_lookup_col}")
+                    continue
 
+                # Savepoint keeps one bad file from aborting the timeframe
+                cur.execute("SAVEPOINT csv_file")
+                try:
                     # --------------------------------------------------
                     # READ CSV
                     # --------------------------------------------------
                     df = pd.read_csv(csv_path)
                     if df.empty:
                         log(f"⚠️ CSV EMPTY | {symbol_name}")
+                        cur.execute("RELEASE SAVEPOINT csv_file")
                         continue
 
                     df.columns = [c.strip() for c in df.columns]
-                    df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.strftime("%Y-%m-%d")
+                    df = df.rename(columns=CSV_COLUMN_MAP)
+                    df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.strftime("%Y-%m-%d")
                     for col in numeric_cols:
                         if col in df.columns:
                             df[col] = pd.to_numeric(df[col], errors="coerce").round(2)  # <-- ROUNDING ADDED
+                        else:
+                            df[col] = None
 
-                    # --------------------------------------------------
-                    # PREPARE ROWS
-                    # --------------------------------------------------
-                    rows = [
-                        (
-                            symbol_id,
-                            timeframe,
-                            row["Date"],
-                            row.get("Open"),
-                            row.get("High"),
-                            row.get("Low"),
-                            row.get("Close"),
-                            row.get("Adj Close"),
-                            row.get("Volume"),
-                        )
-                        for _, row in df.iterrows()
-                    ]
-                    if not rows:
-                        log(f"⚠️ No rows prepared | {symbol_name}")
-                        continue
+                    df["symbol_id"] = symbol_id
+                    df["timeframe"] = timeframe
 
                     # --------------------------------------------------
-                    # INSERT INTO DB
+                    # COPY INTO STAGING
                     # --------------------------------------------------
-                    insert_sql = f"""
-                        INSERT INTO {table_name}
-                        (symbol_id, timeframe, date, open, high, low, close, adj_close, volume)
-                        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                        ON CONFLICT (symbol_id, timeframe, date)
-                        DO UPDATE SET
-                            open      = EXCLUDED.open,
-                            high      = EXCLUDED.high,
-                            low       = EXCLUDED.low,
-                            close     = EXCLUDED.close,
-                            adj_close = EXCLUDED.adj_close,
-                            volume    = EXCLUDED.volume
-                    """
-                    cur.executemany(insert_sql, rows)
-                    rows_inserted += len(rows)
+                    rows_staged += copy_frame(cur, df, staging_table, PRICE_COLUMNS)
+                    cur.execute("RELEASE SAVEPOINT csv_file")
 
                 except Exception as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT csv_file")
                     log(f"❌ FAILED {symbol_name} | {timeframe} | {e}")
                     traceback.print_exc()
 
             # --------------------------------------------------
-            # COMMIT PER TIMEFRAME
+            # ONE SET-BASED MERGE + COMMIT PER TIMEFRAME
             # --------------------------------------------------
+            cur.execute(
+                SQL_PRICE_MERGE.format(price_table=table_name, staging_table=staging_table),
+                (timeframe,)
+            )
+            rows_merged = cur.rowcount
             conn.commit()
-            print(f"💾 COMMIT OK | {timeframe} | rows={rows_inserted}")
+
+            elapsed = max(time.time() - tf_start, 1e-6)
+            print(
+                f"💾 COMMIT OK | {timeframe} | staged={rows_staged} | merged={rows_merged} | "
+                f"{elapsed:.1f}s | {rows_staged / elapsed:,.0f} rows/s"
+            )
+            log(f"IMPORT {table_name} | {timeframe} | rows={rows_staged} | {rows_staged / elapsed:,.0f} rows/s")
 
         print(f"\n🎉 ALL {asset_type.upper()} CSV FILES IMPORTED INTO DATABASE")
 
     except Exception as e:
+        if conn:
+            conn.rollback()
         log(f"❌ CRITICAL FAILURE import_csv_to_db | {e}")
         traceback.print_exc()
 
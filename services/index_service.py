@@ -1,6 +1,7 @@
 import yfinance as yf
 import os
 import traceback
+from datetime import timedelta
 import pandas as pd
 from services.import_export_service import import_csv_to_db
 from config.paths import YAHOO_DIR
@@ -12,7 +13,9 @@ from services.cleanup_service import (
 from services.symbol_service import get_latest_trading_date
 
 from services.yahoo_service import download_yahoo_data_all_timeframes
-from config.nse_constants import FREQUENCIES
+from services.weekly_monthly_service import build_weekly_monthly_bars
+from services.forward_returns_service import refresh_forward_returns
+from config.nse_constants import FREQUENCIES, YAHOO_BATCH_SIZE, YAHOO_MAX_WORKERS
 
 #################################################################################################
 # Runs the complete index price pipeline—cleans folders, downloads 
@@ -23,7 +26,10 @@ from config.nse_constants import FREQUENCIES
 #################################################################################################  
 def insert_index_price_data_pipeline(
     asset_type="india_index",
-    mode="full"   # "full" or "incr"
+    mode="full",  # "full" or "incr"
+    batch_size=YAHOO_BATCH_SIZE,
+    max_workers=YAHOO_MAX_WORKERS,
+    derive_periods=True  # build 1wk/1mo from stored 1d bars instead of downloading them
 ):
     try:
         # ------------------------------------------------------------------
@@ -51,19 +57,26 @@ def insert_index_price_data_pipeline(
         # ------------------------------------------------------------------
         log("===== YAHOO DOWNLOAD STARTED =====")
         print("===== YAHOO DOWNLOAD STARTED =====")
+        download_timeframes = ["1d"] if derive_periods else FREQUENCIES
 
         if mode == "full":
             download_yahoo_data_all_timeframes(
                 asset_type=asset_type,
                 symbols="ALL",
-                mode=mode
+                mode=mode,
+                batch_size=batch_size,
+                max_workers=max_workers,
+                timeframes=download_timeframes
             )
         else:
             download_yahoo_data_all_timeframes(
                 asset_type=asset_type,
                 symbols="ALL",
                 mode=mode,
-                latest_dt = latest_dt
+                latest_dt = latest_dt,
+                batch_size=batch_size,
+                max_workers=max_workers,
+                timeframes=download_timeframes
             )
 
         log("===== YAHOO DOWNLOAD FINISHED =====")
@@ -79,14 +92,34 @@ def insert_index_price_data_pipeline(
         print("===== CSV TO DATABASE IMPORT FINISHED =====")
 
         # ------------------------------------------------------------------
-        # 5. CLEAN INVALID WEEKLY / MONTHLY
+        # 5. DERIVE WEEKLY / MONTHLY FROM DAILY (or clean downloaded ones)
+        # ------------------------------------------------------------------
+        if derive_periods:
+            log("===== DERIVE WEEKLY & MONTHLY BARS STARTED =====")
+            print("===== DERIVE WEEKLY & MONTHLY BARS STARTED =====")
+            build_weekly_monthly_bars(
+                asset_type=asset_type,
+                mode=mode,
+                since=(latest_dt + timedelta(days=1)) if mode == "incr" and latest_dt else None
+            )
+            log("===== DERIVE WEEKLY & MONTHLY BARS FINISHED =====")
+            print("===== DERIVE WEEKLY & MONTHLY BARS FINISHED =====")
+        else:
+            log("===== DELETE INVALID ROWS FOR WEEK & MONTH STARTED =====")
+            print("===== DELETE INVALID ROWS FOR WEEK & MONTH STARTED =====")
+            delete_invalid_timeframe_rows("1wk", data_type="price", asset_type=asset_type, is_index=True)
+            delete_invalid_timeframe_rows("1mo", data_type="price", asset_type=asset_type, is_index=True)
+            log("===== DELETE INVALID ROWS FOR WEEK & MONTH FINISHED =====")
+            print("===== DELETE INVALID ROWS FOR WEEK & MONTH FINISHED =====")
+
+        # ------------------------------------------------------------------
+        # 5b. FORWARD RETURNS (backtest lookup table)
         # ------------------------------------------------------------------
-        log("===== DELETE INVALID ROWS FOR WEEK & MONTH STARTED =====")
-        print("===== DELETE INVALID ROWS FOR WEEK & MONTH STARTED =====")
-        delete_invalid_timeframe_rows("1wk", data_type="price", asset_type=asset_type, is_index=True)
-        delete_invalid_timeframe_rows("1mo", data_type="price", asset_type=asset_type, is_index=True)
-        log("===== DELETE INVALID ROWS FOR WEEK & MONTH FINISHED =====")
-        print("===== DELETE INVALID ROWS FOR WEEK & MONTH FINISHED =====")
+        log("===== REFRESH FORWARD RETURNS STARTED =====")
+        print("===== REFRESH FORWARD RETURNS STARTED =====")
+        refresh_forward_returns(asset_type=asset_type, mode=mode)
+        log("===== REFRESH FORWARD RETURNS FINISHED =====")
+        print("===== REFRESH FORWARD RETURNS FINISHED =====")
 
         # ------------------------------------------------------------------
         # 6. CLEAN YAHOO FOLDERS AGAIN
@@ -5,10 +5,24 @@ from config.db_table import ASSET_TABLE_MAP
 from services.indicators_helper import (
     calculate_rsi_series, calculate_bollinger, 
     calculate_atr, calculate_macd, 
-    calculate_supertrend, calculate_ema, calculate_wma
+    calculate_supertrend, calculate_ema, calculate_wma,
+    calculate_supertrend_panel, weighted_moving_average,
+    calculate_high_low
 )
-from db.sql import SQL_INSERT
+from db.sql import (
+    SQL_INSERT, SQL_INSERT_BULK, INDICATOR_COLUMNS,
+    SQL_CREATE_INDICATOR_STATE, SQL_UPSERT_INDICATOR_STATE, SQL_ADD_INDICATOR_STATE_ADJ,
+    SQL_ADD_INDICATOR_HIGH_LOW, SQL_UPDATE_INDICATOR_HIGH_LOW
+)
+from db.bulk import frame_to_records
+from services.indicator_state import (
+    STATE_VERSION, seed_indicator_state, update_indicator_state
+)
+from psycopg2.extras import execute_values, Json
+from datetime import datetime, date
+import copy
 import pandas as pd
+import numpy as np
 import traceback
 import time
 import sys
@@ -16,6 +30,10 @@ from tqdm import tqdm
 import warnings
 warnings.simplefilter(action='ignore', category=UserWarning)
 
+INDICATOR_BLOCK_SIZE = 200
+VERIFY_TOLERANCE = 0.01 + 1e-6     # values are stored rounded to 2 decimals
+PERIOD_FREQ = {"1wk": "W-SUN", "1mo": "M"}   # timeframes whose latest bar is still forming
+
 #################################################################################################
 # Calculates a full set of technical indicators
 #################################################################################################
@@ -37,6 +55,7 @@ def calculate_indicators(df, latest_only=False):
         df["supertrend"], df["supertrend_dir"] = calculate_supertrend(df)
         df["macd"], df["macd_signal"] = calculate_macd(df["close"])
         df["pct_price_change"] = df["close"].pct_change(fill_method=None).mul(100).round(2)
+        df["high_252"], df["low_252"] = calculate_high_low(df)
 
         if latest_only:
             return df.iloc[[-1]].reset_index(drop=True)
@@ -47,13 +66,138 @@ def calculate_indicators(df, latest_only=False):
         traceback.print_exc()
         return df
 
+#################################################################################################
+# Same indicator set as calculate_indicators, computed on a stacked multi-symbol panel
+# (columns: symbol_id, date, open, high, low, close, adj_close) with groupby-aware
+# rolling/ewm kernels, so a whole block of symbols is one vectorized pass.
+#################################################################################################
+def calculate_indicators_panel(df):
+    df = df.sort_values(["symbol_id", "date"]).reset_index(drop=True)
+    groups = df["symbol_id"]
+    g = df.groupby(groups, sort=False)
+
+    def rolling(col, window, how):
+        r = df[col].groupby(groups, sort=False).rolling(window)
+        return getattr(r, how)().droplevel(0)
+
+    def ewm(series, **kwargs):
+        return series.groupby(groups, sort=False).ewm(adjust=False, **kwargs).mean().droplevel(0)
+
+    def rsi(period):
+        delta = g["close"].diff()
+        gain = delta.clip(lower=0)
+        loss = -delta.clip(upper=0)
+        avg_gain = ewm(gain, alpha=1/period, min_periods=period)
+        avg_loss = ewm(loss, alpha=1/period, min_periods=period)
+        rs = avg_gain / avg_loss.replace(0, np.nan)
+        return (100 - (100 / (1 + rs))).fillna(100).round(2)
+
+    df["sma_20"] = rolling("adj_close", 20, "mean").round(2)
+    df["sma_50"] = rolling("adj_close", 50, "mean").round(2)
+    df["sma_200"] = rolling("adj_close", 200, "mean").round(2)
+
+    df["rsi_3"] = rsi(3)
+    df["rsi_9"] = rsi(9)
+    df["rsi_14"] = rsi(14)
+
+    df["ema_rsi_9_3"] = ewm(df["rsi_9"], span=3).round(2)
+    starts = (groups != groups.shift()).to_numpy()
+    df["wma_rsi_9_21"] = pd.Series(
+        weighted_moving_average(df["rsi_9"].to_numpy(dtype=float), np.arange(1, 22), starts),
+        index=df.index
+    ).round(2)
+
+    mid = rolling("close", 20, "mean")
+    std = rolling("close", 20, "std")
+    df["bb_upper"] = (mid + 2 * std).round(2)
+    df["bb_middle"] = mid.round(2)
+    df["bb_lower"] = (mid - 2 * std).round(2)
+
+    prev_close = g["close"].shift()
+    tr = pd.concat(
+        [df["high"] - df["low"], (df["high"] - prev_close).abs(), (df["low"] - prev_close).abs()],
+        axis=1
+    ).max(axis=1)
+    df["atr_14"] = ewm(tr, alpha=1/14, min_periods=14).round(2)
+
+    df["supertrend"], df["supertrend_dir"] = calculate_supertrend_panel(df, groups)
+
+    ema_12 = ewm(df["close"], span=12)
+    ema_26 = ewm(df["close"], span=26)
+    macd = ema_12 - ema_26
+    df["macd"] = macd.round(2)
+    df["macd_signal"] = ewm(macd, span=9).round(2)
+
+    df["pct_price_change"] = (df["close"] / prev_close - 1).mul(100).round(2)
+    df["high_252"], df["low_252"] = calculate_high_low(df, starts=starts)
+
+    return df
+
+#################################################################################################
+# Adds high_252 / low_252 to an indicator table created before those columns existed and
+# backfills them for every stored row (rolling kernel over the price history, one block of
+# symbols per UPDATE). The ALTER and the backfill commit together: an interrupted run rolls
+# back to the table without the columns, so the next call starts the migration again.
+# Returns True when the columns were added.
+#################################################################################################
+def ensure_high_low_columns(cur, conn, price_table, indicator_table, block_size=INDICATOR_BLOCK_SIZE):
+    cur.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_name = %s AND column_name IN ('high_252', 'low_252')
+    """, (indicator_table,))
+    if cur.fetchone()[0] == 2:
+        return False
+
+    try:
+        cur.execute(SQL_ADD_INDICATOR_HIGH_LOW.format(indicator_table=indicator_table))
+        log(f"   ➕ Adding high_252 / low_252 to {indicator_table} | backfilling")
+
+        cur.execute(f"SELECT DISTINCT symbol_id FROM {indicator_table} ORDER BY symbol_id")
+        symbol_ids = [r[0] for r in cur.fetchall()]
+        block_size = block_size or INDICATOR_BLOCK_SIZE
+        update_sql = SQL_UPDATE_INDICATOR_HIGH_LOW.format(indicator_table=indicator_table)
+
+        for i in tqdm(range(0, len(symbol_ids), block_size), desc=f"{indicator_table} | 252 high/low", ncols=100):
+            block = symbol_ids[i:i + block_size]
+            df = pd.read_sql(f"""
+                SELECT symbol_id, timeframe, date, high, low
+                FROM {price_table}
+                WHERE symbol_id = ANY(%s)
+                ORDER BY symbol_id, timeframe, date
+            """, conn, params=(block,))
+            if df.empty:
+                continue
+
+            keys = df["symbol_id"].astype(str) + "|" + df["timeframe"]
+            starts = (keys != keys.shift()).to_numpy()
+            df["high_252"], df["low_252"] = calculate_high_low(df, starts=starts)
+
+            records = frame_to_records(df, ["symbol_id", "timeframe", "date", "high_252", "low_252"])
+            execute_values(
+                cur, update_sql, records,
+                template="(%s, %s, %s::date, %s::real, %s::real)", page_size=5000
+            )
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        log(f"❌ {indicator_table} high_252 / low_252 migration rolled back, retried on the next run")
+        raise
+
+    log(f"   ✅ {indicator_table} high_252 / low_252 backfilled | {len(symbol_ids)} symbols")
+    return True
+
 #################################################################################################
 # Refreshes technical indicators (PostgreSQL)
 #################################################################################################
 def refresh_indicators(
     asset_types=None,  # list of keys from ASSET_TABLE_MAP; if None → all
-    lookback_rows=250
+    lookback_rows=250,
+    block_size=INDICATOR_BLOCK_SIZE   # symbols per batch; None/0 → one symbol at a time
 ):
+    if block_size:
+        return refresh_indicators_batched(asset_types, lookback_rows, block_size)
+
     try:
         conn = get_db_connection()
         cur = conn.cursor()
@@ -67,6 +211,7 @@ def refresh_indicators(
             col_id = "symbol_id"  # all tables use symbol_id
             log(f"\n📂 Processing asset: {asset_key}")
             log(f"   Symbol table: {symbol_table}, Price table: {price_table}, Indicator table: {indicator_table}")
+            ensure_high_low_columns(cur, conn, price_table, indicator_table)
 
             # ------------------------------
             # Load asset IDs
@@ -148,7 +293,8 @@ def refresh_indicators(
                                 row["atr_14"], row["supertrend"], row["supertrend_dir"],
                                 row["ema_rsi_9_3"], row["wma_rsi_9_21"],
                                 row["pct_price_change"],
-                                row["macd"], row["macd_signal"]
+                                row["macd"], row["macd_signal"],
+                                row["high_252"], row["low_252"]
                             )
                             for _, row in df.iterrows()
                         ]
@@ -181,4 +327,404 @@ def refresh_indicators(
             cur.close()
         except:
             pass
-        close_db_connection(conn)
\ No newline at end of file
+        close_db_connection(conn)
+
+#################################################################################################
+# Batched variant of refresh_indicators: per block of symbols and timeframe it runs
+# one price query (new bars + `lookback_rows` warm-up bars per symbol), one panel
+# indicator pass and one bulk upsert + commit.
+#################################################################################################
+def refresh_indicators_batched(
+    asset_types=None,
+    lookback_rows=250,
+    block_size=INDICATOR_BLOCK_SIZE
+):
+    conn = None
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        log(f"🛠 Started refresh_indicators (batched, block_size={block_size})")
+
+        asset_keys = asset_types or ASSET_TABLE_MAP.keys()
+        log(f"🔑 Asset keys to process: {list(asset_keys)}")
+
+        for asset_key in asset_keys:
+            symbol_table, price_table, indicator_table, _ = ASSET_TABLE_MAP[asset_key]
+            log(f"\n📂 Processing asset: {asset_key}")
+            ensure_high_low_columns(cur, conn, price_table, indicator_table, block_size)
+
+            cur.execute(f"SELECT symbol_id FROM {symbol_table} ORDER BY symbol_id")
+            asset_ids = [r[0] for r in cur.fetchall()]
+            blocks = [asset_ids[i:i + block_size] for i in range(0, len(asset_ids), block_size)]
+            log(f"   🔢 Loaded {len(asset_ids)} assets from {symbol_table} | {len(blocks)} blocks")
+
+            insert_sql = SQL_INSERT_BULK["generic"].format(
+                indicator_table=indicator_table,
+                col_id="symbol_id"
+            )
+
+            # Latest bars after each symbol's last indicator date, plus the
+            # lookback_rows + 1 bars up to it (same window as the per-symbol query)
+            price_sql = f"""
+                WITH last AS (
+                    SELECT symbol_id, MAX(date) AS last_dt
+                    FROM {indicator_table}
+                    WHERE symbol_id = ANY(%s) AND timeframe = %s
+                    GROUP BY symbol_id
+                ),
+                ranked AS (
+                    SELECT
+                        p.symbol_id, p.date, p.open, p.high, p.low, p.close, p.adj_close,
+                        l.last_dt,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY p.symbol_id, (p.date <= l.last_dt)
+                            ORDER BY p.date DESC
+                        ) AS rn
+                    FROM {price_table} p
+                    LEFT JOIN last l ON l.symbol_id = p.symbol_id
+                    WHERE p.symbol_id = ANY(%s) AND p.timeframe = %s
+                )
+                SELECT symbol_id, date, open, high, low, close, adj_close, last_dt
+                FROM ranked
+                WHERE last_dt IS NULL OR date > last_dt OR rn <= %s
+                ORDER BY symbol_id, date
+            """
+
+            for timeframe in FREQUENCIES:
+                tf_start = time.time()
+                inserted_rows = 0
+                processed_assets = 0
+
+                for block in tqdm(blocks, desc=f"{asset_key} | {timeframe}", ncols=100):
+                    try:
+                        # 1. One query for the whole block
+                        df = pd.read_sql(
+                            price_sql, conn,
+                            params=(block, timeframe, block, timeframe, lookback_rows + 1)
+                        )
+                        if df.empty:
+                            continue
+
+                        df["date"] = pd.to_datetime(df["date"])
+                        df["last_dt"] = pd.to_datetime(df["last_dt"])
+                        df["is_new"] = df["last_dt"].isna() | (df["date"] > df["last_dt"])
+
+                        # Skip symbols without new bars
+                        has_new = df.groupby("symbol_id")["is_new"].transform("any")
+                        df = df[has_new]
+                        if df.empty:
+                            continue
+
+                        # 2. Vectorized indicators for the stacked panel
+                        df = calculate_indicators_panel(df)
+
+                        # 3. Keep only new rows
+                        df = df[df["is_new"]].copy()
+                        df["timeframe"] = timeframe
+                        df["date"] = df["date"].dt.date
+
+                        # 4. One bulk upsert + commit per block
+                        records = frame_to_records(df, INDICATOR_COLUMNS)
+                        execute_values(cur, insert_sql, records, page_size=5000)
+                        conn.commit()
+
+                        inserted_rows += len(records)
+                        processed_assets += df["symbol_id"].nunique()
+
+                    except Exception as e:
+                        conn.rollback()
+                        log(f"❌ ERROR {asset_key} block {block[0]}..{block[-1]} {timeframe} | {e}")
+                        traceback.print_exc()
+
+                log(
+                    f"  ✔ {asset_key} {timeframe} DONE | "
+                    f"{processed_assets} assets | {inserted_rows} rows | "
+                    f"{time.time() - tf_start:.1f}s"
+                )
+
+        log("🎉 All indicators refreshed successfully!")
+
+    except Exception as e:
+        log(f"❌ CRITICAL FAILURE — REFRESH INDICATORS | {e}")
+        traceback.print_exc()
+
+    finally:
+        if conn:
+            close_db_connection(conn)
+
+#################################################################################################
+# Incremental refresh driven by the persisted indicator state ({indicator_table}_state).
+# Symbols with a valid state only read bars from their last state date onwards and
+# update every indicator in O(1) per bar. Symbols without a state (or whose last bar's
+# close / adj_close was revised since) are recomputed from full history once and their
+# state is seeded. 1wk / 1mo states are anchored on the last completed period, so the
+# bar of the running week / month is recomputed every run without forcing a reseed.
+# verify=True also recomputes updated symbols from full history and logs any mismatch.
+#################################################################################################
+def refresh_indicators_incremental(
+    asset_types=None,
+    verify=False,
+    block_size=INDICATOR_BLOCK_SIZE
+):
+    conn = None
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        log(f"🛠 Started refresh_indicators_incremental (verify={verify})")
+
+        asset_keys = asset_types or ASSET_TABLE_MAP.keys()
+        log(f"🔑 Asset keys to process: {list(asset_keys)}")
+
+        for asset_key in asset_keys:
+            symbol_table, price_table, indicator_table, _ = ASSET_TABLE_MAP[asset_key]
+            state_table = f"{indicator_table}_state"
+            log(f"\n📂 Processing asset: {asset_key}")
+
+            cur.execute(SQL_CREATE_INDICATOR_STATE.format(
+                state_table=state_table, symbol_table=symbol_table
+            ))
+            cur.execute(SQL_ADD_INDICATOR_STATE_ADJ.format(state_table=state_table))
+            conn.commit()
+            ensure_high_low_columns(cur, conn, price_table, indicator_table, block_size)
+
+            cur.execute(f"SELECT symbol_id FROM {symbol_table} ORDER BY symbol_id")
+            asset_ids = [r[0] for r in cur.fetchall()]
+            blocks = [asset_ids[i:i + block_size] for i in range(0, len(asset_ids), block_size)]
+
+            insert_sql = SQL_INSERT_BULK["generic"].format(
+                indicator_table=indicator_table,
+                col_id="symbol_id"
+            )
+            state_sql = SQL_UPSERT_INDICATOR_STATE.format(state_table=state_table)
+
+            for timeframe in FREQUENCIES:
+                tf_start = time.time()
+                stats = {"rows": 0, "updated": 0, "seeded": 0, "mismatches": 0}
+
+                for block in tqdm(blocks, desc=f"{asset_key} | {timeframe}", ncols=100):
+                    try:
+                        _refresh_state_block(
+                            cur, block, timeframe, price_table, indicator_table,
+                            state_table, insert_sql, state_sql, verify, stats, conn
+                        )
+                        conn.commit()
+                    except Exception as e:
+                        conn.rollback()
+                        log(f"❌ ERROR {asset_key} block {block[0]}..{block[-1]} {timeframe} | {e}")
+                        traceback.print_exc()
+
+                log(
+                    f"  ✔ {asset_key} {timeframe} DONE | "
+                    f"{stats['updated']} updated | {stats['seeded']} seeded | "
+                    f"{stats['rows']} rows | {time.time() - tf_start:.1f}s"
+                )
+                if verify:
+                    log(f"  🔍 {asset_key} {timeframe} VERIFY | {stats['mismatches']} mismatched values")
+
+        log("🎉 All indicators refreshed successfully!")
+
+    except Exception as e:
+        log(f"❌ CRITICAL FAILURE — REFRESH INDICATORS INCREMENTAL | {e}")
+        traceback.print_exc()
+
+    finally:
+        if conn:
+            close_db_connection(conn)
+
+#################################################################################################
+# Dates whose bar is final: every daily bar; weekly / monthly bars only when their period
+# ended before today's (the running week / month keeps changing until then)
+#################################################################################################
+def _period_complete(dates, timeframe, today=None):
+    dates = pd.to_datetime(pd.Series(dates))
+    freq = PERIOD_FREQ.get(timeframe)
+    if freq is None:
+        return np.ones(len(dates), dtype=bool)
+    current = pd.Period(today or date.today(), freq=freq)
+    return (dates.dt.to_period(freq) < current).to_numpy()
+
+
+def _same_price(stored, value):
+    """Stored state price vs the price bar (NULL and NaN both mean missing)."""
+    if stored is None or pd.isna(stored):
+        return pd.isna(value)
+    return not pd.isna(value) and float(value) == float(stored)
+
+#################################################################################################
+# One block of symbols for one timeframe: incremental updates, reseeds, optional
+# verification, then bulk writes of indicator rows and states (committed by the caller).
+#################################################################################################
+def _refresh_state_block(
+    cur, block, timeframe, price_table, indicator_table,
+    state_table, insert_sql, state_sql, verify, stats, conn
+):
+    # 1. Stored states for the block
+    cur.execute(f"""
+        SELECT symbol_id, last_date, last_close, last_adj_close, state
+        FROM {state_table}
+        WHERE timeframe = %s AND symbol_id = ANY(%s)
+    """, (timeframe, block))
+    states = {
+        sid: (last_date, last_close, last_adj_close, state)
+        for sid, last_date, last_close, last_adj_close, state in cur.fetchall()
+        if state.get("version") == STATE_VERSION
+    }
+
+    new_rows, new_states, reseed = [], {}, [sid for sid in block if sid not in states]
+    revised = []
+
+    # 2. Bars from each state's last date onwards (the first one must be unchanged)
+    if states:
+        df = pd.read_sql(f"""
+            SELECT p.symbol_id, p.date, p.high, p.low, p.close, p.adj_close
+            FROM {price_table} p
+            JOIN {state_table} s
+              ON s.symbol_id = p.symbol_id AND s.timeframe = p.timeframe
+            WHERE p.timeframe = %s
+              AND p.symbol_id = ANY(%s)
+              AND p.date >= s.last_date
+            ORDER BY p.symbol_id, p.date
+        """, conn, params=(timeframe, list(states)))
+
+        bars_by_symbol = dict(tuple(df.groupby("symbol_id", sort=False))) if not df.empty else {}
+
+        for sid, (last_date, last_close, last_adj_close, state) in states.items():
+            bars = bars_by_symbol.get(sid)
+            if (
+                bars is None
+                or bars["date"].iloc[0] != last_date
+                or not _same_price(last_close, bars["close"].iloc[0])
+                or not _same_price(last_adj_close, bars["adj_close"].iloc[0])
+            ):
+                reseed.append(sid)
+                revised.append(sid)
+                continue
+
+            bars = bars.iloc[1:]
+            if bars.empty:
+                continue
+
+            # Bars are date-ordered, so the completed periods form a prefix; the state is
+            # persisted after them and the running period is applied to a copy
+            n_done = int(_period_complete(bars["date"], timeframe).sum())
+            records = bars.to_dict("records")
+            for i, bar in enumerate(records):
+                if i == n_done:
+                    if n_done:
+                        new_states[sid] = (bars["date"].iloc[i - 1], bars["close"].iloc[i - 1],
+                                           bars["adj_close"].iloc[i - 1], state)
+                    state = copy.deepcopy(state)
+                row = update_indicator_state(state, bar)
+                row["symbol_id"] = sid
+                new_rows.append(row)
+
+            if n_done == len(records):
+                new_states[sid] = (bars["date"].iloc[-1], bars["close"].iloc[-1],
+                                   bars["adj_close"].iloc[-1], state)
+            stats["updated"] += 1
+
+    df_new = pd.DataFrame(new_rows)
+
+    # 3. Full-history recompute for symbols without a usable state
+    if reseed:
+        df_seeded, seeded_states = _seed_states(
+            cur, conn, reseed, timeframe, price_table, indicator_table, rewrite=revised
+        )
+        new_states.update(seeded_states)
+        stats["seeded"] += len(seeded_states)
+        df_new = pd.concat([df_new, df_seeded], ignore_index=True) if not df_new.empty else df_seeded
+
+    # 4. Optional verification against a full recompute
+    if verify and new_rows:
+        stats["mismatches"] += _verify_rows(conn, pd.DataFrame(new_rows), timeframe, price_table)
+
+    # 5. Bulk writes
+    if not df_new.empty:
+        df_new["timeframe"] = timeframe
+        records = frame_to_records(df_new, INDICATOR_COLUMNS)
+        execute_values(cur, insert_sql, records, page_size=5000)
+        stats["rows"] += len(records)
+
+    if new_states:
+        now = datetime.now()
+        execute_values(cur, state_sql, [
+            (sid, timeframe, last_date, _price_or_none(last_close), _price_or_none(last_adj_close), Json(state), now)
+            for sid, (last_date, last_close, last_adj_close, state) in new_states.items()
+        ], page_size=1000)
+
+
+def _price_or_none(value):
+    return None if value is None or pd.isna(value) else float(value)
+
+#################################################################################################
+# Recomputes `symbol_ids` from full history, returns the indicator rows from each symbol's
+# last stored indicator date onwards (every row for `rewrite` symbols, whose history was
+# revised, e.g. adj_close after a dividend) plus the freshly seeded states.
+#################################################################################################
+def _seed_states(cur, conn, symbol_ids, timeframe, price_table, indicator_table, rewrite=()):
+    df = pd.read_sql(f"""
+        SELECT symbol_id, date, open, high, low, close, adj_close
+        FROM {price_table}
+        WHERE timeframe = %s AND symbol_id = ANY(%s)
+        ORDER BY symbol_id, date
+    """, conn, params=(timeframe, symbol_ids))
+    if df.empty:
+        return pd.DataFrame(), {}
+
+    cur.execute(f"""
+        SELECT symbol_id, MAX(date)
+        FROM {indicator_table}
+        WHERE timeframe = %s AND symbol_id = ANY(%s)
+        GROUP BY symbol_id
+    """, (timeframe, symbol_ids))
+    last_dates = dict(cur.fetchall())
+
+    df = calculate_indicators_panel(df)
+
+    # States are seeded on the completed periods only (see _period_complete)
+    states = {}
+    complete = _period_complete(df["date"], timeframe)
+    for sid, sub in df[complete].groupby("symbol_id", sort=False):
+        states[sid] = (sub["date"].iloc[-1], sub["close"].iloc[-1], sub["adj_close"].iloc[-1],
+                       seed_indicator_state(sub))
+
+    # The last stored row is rewritten too: it may hold a period that was still running
+    rewrite = set(rewrite)
+    last_dates = {sid: d for sid, d in last_dates.items() if sid not in rewrite}
+    last_dt = pd.to_datetime(df["symbol_id"].map(last_dates))
+    df = df[last_dt.isna() | (pd.to_datetime(df["date"]) >= last_dt)]
+
+    return df, states
+
+#################################################################################################
+# Compares incrementally computed rows with a full recompute of the same symbols.
+# Returns the number of mismatched values (first few are logged).
+#################################################################################################
+def _verify_rows(conn, df_incr, timeframe, price_table):
+    symbol_ids = [int(s) for s in df_incr["symbol_id"].unique()]
+    df_full = pd.read_sql(f"""
+        SELECT symbol_id, date, open, high, low, close, adj_close
+        FROM {price_table}
+        WHERE timeframe = %s AND symbol_id = ANY(%s)
+        ORDER BY symbol_id, date
+    """, conn, params=(timeframe, symbol_ids))
+    df_full = calculate_indicators_panel(df_full)
+
+    value_cols = INDICATOR_COLUMNS[3:]
+    merged = df_incr.merge(df_full, on=["symbol_id", "date"], suffixes=("", "_full"))
+
+    mismatches = 0
+    for col in value_cols:
+        a = merged[col].astype(float)
+        b = merged[f"{col}_full"].astype(float)
+        bad = ~((a.isna() & b.isna()) | ((a - b).abs() <= VERIFY_TOLERANCE))
+        if bad.any():
+            mismatches += int(bad.sum())
+            first = merged[bad].iloc[0]
+            log(
+                f"⚠️ VERIFY {timeframe} {col} | {int(bad.sum())} rows differ | "
+                f"e.g. symbol {first['symbol_id']} {first['date']}: "
+                f"{first[col]} vs {first[f'{col}_full']}"
+            )
+
+    return mismatches
@@ -0,0 +1,298 @@
+import numpy as np
+import pandas as pd
+from services.indicators_helper import calculate_rsi_series
+
+# Same periods as calculate_indicators
+RSI_PERIODS = (3, 9, 14)
+SMA_PERIODS = (20, 50, 200)
+BB_PERIOD = 20
+BB_STD_MULT = 2
+ATR_PERIOD = 14
+ST_ATR_PERIOD = 10
+ST_MULTIPLIER = 3
+EMA_RSI_SPAN = 3
+WMA_RSI_PERIOD = 21
+MACD_SPANS = (12, 26, 9)
+HIGH_LOW_WINDOW = 252
+
+STATE_VERSION = 2
+
+#################################################################################################
+# Small helpers. The EWM step mirrors pandas' adjust=False recursion (including its
+# alpha for `span` and the normalisation by old_wt + new_wt) so that incremental values
+# match a full recompute.
+#################################################################################################
+def _span_alpha(span):
+    return 1.0 / (1.0 + (span - 1) / 2.0)
+
+def _ewm_step(prev, x, alpha):
+    if prev is None or np.isnan(prev):
+        return x
+    old_wt = 1.0 - alpha
+    return (old_wt * prev + alpha * x) / (old_wt + alpha)
+
+def _r2(value):
+    return float(np.round(value, 2))
+
+def _to_json(value):
+    """NaN is not valid JSON; store it as null."""
+    if value is None:
+        return None
+    value = float(value)
+    return None if np.isnan(value) else value
+
+def _from_json(value):
+    return np.nan if value is None else float(value)
+
+def _tail(values, size):
+    return [_to_json(v) for v in values[-size:]] if size > 0 else []
+
+def _true_range(high, low, prev_close):
+    parts = [high - low]
+    if prev_close is not None and not np.isnan(prev_close):
+        parts += [abs(high - prev_close), abs(low - prev_close)]
+    parts = [p for p in parts if not np.isnan(p)]
+    return max(parts) if parts else np.nan
+
+def _rsi_value(avg_gain, avg_loss, nobs, period):
+    if nobs < period or avg_gain is None or not avg_loss:
+        return 100.0
+    return _r2(100 - (100 / (1 + avg_gain / avg_loss)))
+
+#################################################################################################
+# One step of the Supertrend band recursion (same rules as calculate_supertrend).
+# NaN bands stay NaN, exactly like the legacy loop.
+#################################################################################################
+def _supertrend_step(state, high, low, close, atr_rounded):
+    hl2 = (high + low) / 2
+    basic_ub = hl2 + ST_MULTIPLIER * atr_rounded
+    basic_lb = hl2 - ST_MULTIPLIER * atr_rounded
+
+    if state.get("st_n", 0) == 0:
+        final_ub, final_lb = basic_ub, basic_lb
+        supertrend, direction = final_ub, -1
+    else:
+        prev_ub = _from_json(state["st_final_ub"])
+        prev_lb = _from_json(state["st_final_lb"])
+        prev_st = _from_json(state["st_value"])
+        prev_close = _from_json(state["prev_close"])
+
+        final_ub = basic_ub if (basic_ub < prev_ub or prev_close > prev_ub) else prev_ub
+        final_lb = basic_lb if (basic_lb > prev_lb or prev_close < prev_lb) else prev_lb
+
+        if close > prev_st:
+            supertrend, direction = final_lb, 1
+        else:
+            supertrend, direction = final_ub, -1
+
+    state["st_final_ub"] = _to_json(final_ub)
+    state["st_final_lb"] = _to_json(final_lb)
+    state["st_value"] = _to_json(supertrend)
+    state["st_n"] = state.get("st_n", 0) + 1
+    return supertrend, direction
+
+#################################################################################################
+# Streaming step of the rolling high/low monotonic deques (same result as
+# rolling_extreme_kernel). `window` holds [bar index, value] pairs with decreasing (max)
+# or increasing (min) values; NaN values are not pushed, their bar indices are kept in
+# `nan_idx` so the result stays NaN until the window holds HIGH_LOW_WINDOW valid values.
+#################################################################################################
+def _extreme_step(side, i, value, keep_max):
+    window = side["window"]
+    if np.isnan(value):
+        side["nan_idx"].append(i)
+    else:
+        if keep_max:
+            while window and window[-1][1] <= value:
+                window.pop()
+        else:
+            while window and window[-1][1] >= value:
+                window.pop()
+        window.append([i, value])
+
+    oldest = i - HIGH_LOW_WINDOW + 1
+    while window and window[0][0] < oldest:
+        window.pop(0)
+    side["nan_idx"] = [j for j in side["nan_idx"] if j >= oldest]
+
+    if oldest < 0 or side["nan_idx"] or not window:
+        return np.nan
+    return window[0][1]
+
+def _seed_extreme(values, keep_max):
+    side = {"window": [], "nan_idx": []}
+    n = len(values)
+    for i in range(max(0, n - HIGH_LOW_WINDOW), n):
+        _extreme_step(side, i, float(values[i]), keep_max)
+    return side
+
+#################################################################################################
+# Builds the state of one symbol/timeframe from its full price history
+# (frame sorted by date with high, low, close, adj_close).
+#################################################################################################
+def seed_indicator_state(df: pd.DataFrame) -> dict:
+    close = df["close"].astype(float)
+    high = df["high"].astype(float)
+    low = df["low"].astype(float)
+
+    state = {"version": STATE_VERSION, "n": int(len(df))}
+    state["prev_close"] = _to_json(close.iloc[-1])
+    state["adj_tail"] = _tail(df["adj_close"].astype(float).tolist(), max(SMA_PERIODS) - 1)
+    state["close_tail"] = _tail(close.tolist(), BB_PERIOD - 1)
+
+    # RSI (Wilder) raw averages + number of observed deltas
+    delta = close.diff()
+    gain = delta.clip(lower=0)
+    loss = -delta.clip(upper=0)
+    nobs = int(delta.notna().sum())
+    state["rsi"] = {}
+    for period in RSI_PERIODS:
+        avg_gain = gain.ewm(alpha=1/period, adjust=False).mean().iloc[-1]
+        avg_loss = loss.ewm(alpha=1/period, adjust=False).mean().iloc[-1]
+        state["rsi"][str(period)] = [_to_json(avg_gain), _to_json(avg_loss), nobs]
+
+    # EMA / WMA of the (rounded) RSI 9 series
+    rsi_9 = calculate_rsi_series(close, 9)
+    state["ema_rsi"] = _to_json(rsi_9.ewm(span=EMA_RSI_SPAN, adjust=False).mean().iloc[-1])
+    state["rsi9_tail"] = _tail(rsi_9.tolist(), WMA_RSI_PERIOD - 1)
+
+    # ATRs (raw EWM of true range + observation count)
+    prev_close = close.shift()
+    tr = pd.concat(
+        [high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1
+    ).max(axis=1)
+    tr_nobs = int(tr.notna().sum())
+    state["atr"] = {}
+    for period in (ATR_PERIOD, ST_ATR_PERIOD):
+        atr = tr.ewm(alpha=1/period, adjust=False).mean().iloc[-1]
+        state["atr"][str(period)] = [_to_json(atr), tr_nobs]
+
+    # Supertrend bands: replay the band recursion over the history
+    atr_st = tr.ewm(alpha=1/ST_ATR_PERIOD, adjust=False, min_periods=ST_ATR_PERIOD).mean().round(2)
+    bands = {"st_n": 0}
+    prev = None
+    for h, l, c, a in zip(high.to_numpy(), low.to_numpy(), close.to_numpy(), atr_st.to_numpy()):
+        bands["prev_close"] = prev
+        _supertrend_step(bands, h, l, c, a)
+        prev = _to_json(c)
+    for key in ("st_final_ub", "st_final_lb", "st_value", "st_n"):
+        state[key] = bands[key]
+
+    # MACD EMAs
+    fast, slow, signal = MACD_SPANS
+    ema_fast = close.ewm(span=fast, adjust=False).mean()
+    ema_slow = close.ewm(span=slow, adjust=False).mean()
+    macd = ema_fast - ema_slow
+    state["ema_fast"] = _to_json(ema_fast.iloc[-1])
+    state["ema_slow"] = _to_json(ema_slow.iloc[-1])
+    state["macd_signal"] = _to_json(macd.ewm(span=signal, adjust=False).mean().iloc[-1])
+
+    # Rolling high/low deques (only the last HIGH_LOW_WINDOW bars matter)
+    state["high_max"] = _seed_extreme(high.to_numpy(), True)
+    state["low_min"] = _seed_extreme(low.to_numpy(), False)
+
+    return state
+
+#################################################################################################
+# Advances `state` by one bar in O(1) and returns the indicator row for that bar.
+# `bar` needs date, high, low, close and adj_close. The state dict is updated in place.
+#################################################################################################
+def update_indicator_state(state: dict, bar) -> dict:
+    high = float(bar["high"])
+    low = float(bar["low"])
+    close = float(bar["close"])
+    adj_close = float(bar["adj_close"])
+    prev_close = _from_json(state.get("prev_close"))
+    has_prev = state.get("n", 0) > 0
+
+    row = {"date": bar["date"]}
+
+    # SMAs of adj_close
+    adj_window = [_from_json(v) for v in state.get("adj_tail", [])] + [adj_close]
+    for period in SMA_PERIODS:
+        row[f"sma_{period}"] = (
+            _r2(np.mean(adj_window[-period:])) if len(adj_window) >= period else np.nan
+        )
+
+    # RSIs
+    delta = close - prev_close if has_prev else np.nan
+    for period in RSI_PERIODS:
+        avg_gain, avg_loss, nobs = state["rsi"].get(str(period), [None, None, 0])
+        if not np.isnan(delta):
+            alpha = 1 / period
+            avg_gain = _ewm_step(avg_gain, max(delta, 0.0), alpha)
+            avg_loss = _ewm_step(avg_loss, -min(delta, 0.0), alpha)
+            nobs += 1
+        state["rsi"][str(period)] = [_to_json(avg_gain), _to_json(avg_loss), nobs]
+        row[f"rsi_{period}"] = _rsi_value(avg_gain, avg_loss, nobs, period)
+
+    # EMA(3) / WMA(21) of RSI 9
+    rsi_9 = row["rsi_9"]
+    ema_rsi = _ewm_step(state.get("ema_rsi"), rsi_9, _span_alpha(EMA_RSI_SPAN))
+    state["ema_rsi"] = _to_json(ema_rsi)
+    row["ema_rsi_9_3"] = _r2(ema_rsi)
+
+    rsi_window = [_from_json(v) for v in state.get("rsi9_tail", [])] + [rsi_9]
+    if len(rsi_window) >= WMA_RSI_PERIOD:
+        weights = np.arange(1, WMA_RSI_PERIOD + 1)
+        row["wma_rsi_9_21"] = _r2(np.dot(rsi_window[-WMA_RSI_PERIOD:], weights) / weights.sum())
+    else:
+        row["wma_rsi_9_21"] = np.nan
+
+    # Bollinger bands of close
+    close_window = [_from_json(v) for v in state.get("close_tail", [])] + [close]
+    if len(close_window) >= BB_PERIOD:
+        window = close_window[-BB_PERIOD:]
+        mid = np.mean(window)
+        std = np.std(window, ddof=1)
+        row["bb_upper"] = _r2(mid + BB_STD_MULT * std)
+        row["bb_middle"] = _r2(mid)
+        row["bb_lower"] = _r2(mid - BB_STD_MULT * std)
+    else:
+        row["bb_upper"] = row["bb_middle"] = row["bb_lower"] = np.nan
+
+    # ATRs
+    tr = _true_range(high, low, prev_close if has_prev else None)
+    atr_rounded = {}
+    for period in (ATR_PERIOD, ST_ATR_PERIOD):
+        atr, nobs = state["atr"].get(str(period), [None, 0])
+        if not np.isnan(tr):
+            atr = _ewm_step(atr, tr, 1 / period)
+            nobs += 1
+        state["atr"][str(period)] = [_to_json(atr), nobs]
+        atr_rounded[period] = _r2(atr) if nobs >= period and atr is not None else np.nan
+    row["atr_14"] = atr_rounded[ATR_PERIOD]
+
+    # Supertrend (uses the previous close, so run before prev_close moves on)
+    supertrend, direction = _supertrend_step(state, high, low, close, atr_rounded[ST_ATR_PERIOD])
+    row["supertrend"] = _r2(supertrend)
+    row["supertrend_dir"] = direction
+
+    # MACD
+    fast, slow, signal = MACD_SPANS
+    ema_fast = _ewm_step(state.get("ema_fast"), close, _span_alpha(fast))
+    ema_slow = _ewm_step(state.get("ema_slow"), close, _span_alpha(slow))
+    macd = ema_fast - ema_slow
+    macd_signal = _ewm_step(state.get("macd_signal"), macd, _span_alpha(signal))
+    state["ema_fast"] = _to_json(ema_fast)
+    state["ema_slow"] = _to_json(ema_slow)
+    state["macd_signal"] = _to_json(macd_signal)
+    row["macd"] = _r2(macd)
+    row["macd_signal"] = _r2(macd_signal)
+
+    # % change vs previous close
+    row["pct_price_change"] = _r2((close / prev_close - 1) * 100) if has_prev else np.nan
+
+    # Rolling high/low (bar index = number of bars seen before this one)
+    i = state.get("n", 0)
+    row["high_252"] = _r2(_extreme_step(state["high_max"], i, high, True))
+    row["low_252"] = _r2(_extreme_step(state["low_min"], i, low, False))
+
+    # Roll the windows forward
+    state["adj_tail"] = _tail(adj_window, max(SMA_PERIODS) - 1)
+    state["close_tail"] = _tail(close_window, BB_PERIOD - 1)
+    state["rsi9_tail"] = _tail(rsi_window, WMA_RSI_PERIOD - 1)
+    state["prev_close"] = _to_json(close)
+    state["n"] = state.get("n", 0) + 1
+
+    return row
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import traceback
+from collections import deque
 from config.logger import log
 from typing import Tuple, Callable
 
@@ -21,6 +22,12 @@ def safe_indicator(func: Callable) -> Callable:
 
             index = args[0].index if args and hasattr(args[0], "index") else pd.Index([])
 
+            if func.__name__ == "calculate_high_low":
+                return (
+                    pd.Series(index=index, dtype=float),
+                    pd.Series(index=index, dtype=float)
+                )
+
             if func.__name__ == "calculate_supertrend":
                 return (
                     pd.Series(index=index, dtype=float),
@@ -86,6 +93,52 @@ def calculate_macd(close: pd.Series) -> Tuple[pd.Series, pd.Series]:
 
     return macd.round(2), signal.round(2)
 
+#################################################################################################
+# Single-pass Supertrend band recursion on plain arrays.
+# `starts` (optional bool array) marks the first row of each symbol in a stacked panel,
+# where the recursion restarts. NaN bands propagate exactly like the pandas version.
+#################################################################################################
+def supertrend_kernel(
+    high: np.ndarray, low: np.ndarray, close: np.ndarray, atr: np.ndarray,
+    multiplier: float = 3, starts: np.ndarray | None = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    hl2 = (high + low) / 2
+    basic_ub = (hl2 + multiplier * atr).tolist()
+    basic_lb = (hl2 - multiplier * atr).tolist()
+    close_l = close.tolist()
+    n = len(close_l)
+    restart = starts.tolist() if starts is not None else [False] * n
+
+    supertrend = [np.nan] * n
+    direction = [-1] * n
+    final_ub = final_lb = prev_st = np.nan
+
+    for i in range(n):
+        ub = basic_ub[i]
+        lb = basic_lb[i]
+
+        if i == 0 or restart[i]:
+            final_ub, final_lb = ub, lb
+            prev_st = final_ub
+            supertrend[i] = prev_st
+            continue
+
+        prev_close = close_l[i - 1]
+        if not (ub < final_ub or prev_close > final_ub):
+            ub = final_ub
+        if not (lb > final_lb or prev_close < final_lb):
+            lb = final_lb
+        final_ub, final_lb = ub, lb
+
+        if close_l[i] > prev_st:
+            direction[i] = 1
+            prev_st = final_lb
+        else:
+            prev_st = final_ub
+        supertrend[i] = prev_st
+
+    return np.round(np.array(supertrend, dtype=float), 2), np.array(direction, dtype=int)
+
 #################################################################################################
 @safe_indicator
 def calculate_supertrend(
@@ -93,6 +146,48 @@ def calculate_supertrend(
 ) -> Tuple[pd.Series, pd.Series]:
     """Calculates Supertrend and trend direction."""
     atr = calculate_atr(df, atr_period)
+    supertrend, direction = supertrend_kernel(
+        df["high"].to_numpy(dtype=float),
+        df["low"].to_numpy(dtype=float),
+        df["close"].to_numpy(dtype=float),
+        atr.to_numpy(dtype=float),
+        multiplier
+    )
+    return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+
+#################################################################################################
+def calculate_supertrend_panel(
+    df: pd.DataFrame, groups: pd.Series, atr_period: int = 10, multiplier: int = 3
+) -> Tuple[pd.Series, pd.Series]:
+    """Supertrend for a stacked multi-symbol frame (rows sorted by group, then date)."""
+    prev_close = df["close"].groupby(groups, sort=False).shift()
+    tr = pd.concat(
+        [df["high"] - df["low"], (df["high"] - prev_close).abs(), (df["low"] - prev_close).abs()],
+        axis=1
+    ).max(axis=1)
+    atr = (
+        tr.groupby(groups, sort=False)
+        .ewm(alpha=1/atr_period, adjust=False, min_periods=atr_period).mean()
+        .droplevel(0).round(2)
+    )
+    starts = (groups != groups.shift()).to_numpy()
+
+    supertrend, direction = supertrend_kernel(
+        df["high"].to_numpy(dtype=float),
+        df["low"].to_numpy(dtype=float),
+        df["close"].to_numpy(dtype=float),
+        atr.reindex(df.index).to_numpy(dtype=float),
+        multiplier,
+        starts
+    )
+    return pd.Series(supertrend, index=df.index), pd.Series(direction, index=df.index)
+
+#################################################################################################
+def calculate_supertrend_legacy(
+    df: pd.DataFrame, atr_period: int = 10, multiplier: int = 3
+) -> Tuple[pd.Series, pd.Series]:
+    """Original pandas/.iloc implementation, kept as the reference for bench_indicators.py."""
+    atr = calculate_atr(df, atr_period)
     hl2 = (df["high"] + df["low"]) / 2
 
     basic_ub = hl2 + multiplier * atr
@@ -138,12 +233,104 @@ def calculate_ema(series: pd.Series, period: int) -> pd.Series:
     """Calculates Exponential Moving Average."""
     return series.ewm(span=period, adjust=False).mean().round(2)
 
+#################################################################################################
+# Rolling weighted mean via convolution; weights[-1] applies to the newest value.
+# Like rolling(len(weights)).apply(...), a window containing NaN (or fewer than
+# len(weights) values) gives NaN. `starts` (optional bool array) marks the first row
+# of each symbol in a stacked panel so windows never cross symbols.
+#################################################################################################
+def weighted_moving_average(
+    values: np.ndarray, weights: np.ndarray, starts: np.ndarray | None = None
+) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    period = len(weights)
+    n = len(values)
+
+    out = np.full(n, np.nan)
+    if n < period:
+        return out
+
+    missing = np.isnan(values)
+    filled = np.where(missing, 0.0, values)
+    out[period - 1:] = np.convolve(filled, weights[::-1], "valid") / weights.sum()
+
+    if missing.any():
+        nan_in_window = np.convolve(missing, np.ones(period), "valid") > 0
+        out[period - 1:][nan_in_window] = np.nan
+
+    if starts is not None:
+        idx = np.arange(n)
+        group_start = np.maximum.accumulate(np.where(starts, idx, 0))
+        out[idx - group_start < period - 1] = np.nan
+
+    return out
+
 #################################################################################################
 @safe_indicator
 def calculate_wma(series: pd.Series, period: int) -> pd.Series:
     """Calculates Weighted Moving Average."""
-    weights = np.arange(1, period + 1)
-    wma = series.rolling(period).apply(
-        lambda x: np.dot(x, weights) / weights.sum(), raw=True
-    )
-    return wma.round(2)
\ No newline at end of file
+    wma = weighted_moving_average(series.to_numpy(dtype=float), np.arange(1, period + 1))
+    return pd.Series(wma, index=series.index).round(2)
+
+#################################################################################################
+# Rolling max (how="max") or min (how="min") over `window` rows with a monotonic deque:
+# every row is pushed and popped at most once, so the pass is O(n) for any window.
+# Same result as rolling(window).max() / .min(): NaN until the window holds `window`
+# non-NaN values. `starts` marks the first row of each symbol in a stacked panel.
+#################################################################################################
+def rolling_extreme_kernel(
+    values: np.ndarray, window: int, how: str = "max", starts: np.ndarray | None = None
+) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    vals = values.tolist()
+    n = len(vals)
+    restart = starts.tolist() if starts is not None else [False] * n
+    keep_max = how == "max"
+
+    out = [np.nan] * n
+    window_idx = deque()   # indices with decreasing (max) / increasing (min) values
+
+    for i in range(n):
+        if restart[i]:
+            window_idx.clear()
+
+        v = vals[i]
+        if v == v:   # skip NaN
+            if keep_max:
+                while window_idx and vals[window_idx[-1]] <= v:
+                    window_idx.pop()
+            else:
+                while window_idx and vals[window_idx[-1]] >= v:
+                    window_idx.pop()
+            window_idx.append(i)
+
+        while window_idx and window_idx[0] <= i - window:
+            window_idx.popleft()
+
+        if window_idx:
+            out[i] = vals[window_idx[0]]
+
+    out = np.array(out, dtype=float)
+
+    # Incomplete windows: fewer than `window` valid values (or rows of the symbol)
+    valid = np.concatenate([[0], np.cumsum(~np.isnan(values))])
+    idx = np.arange(n)
+    valid_in_window = valid[idx + 1] - valid[np.maximum(idx + 1 - window, 0)]
+    out[valid_in_window < window] = np.nan
+
+    if starts is not None:
+        group_start = np.maximum.accumulate(np.where(starts, idx, 0))
+        out[idx - group_start < window - 1] = np.nan
+
+    return out
+
+#################################################################################################
+@safe_indicator
+def calculate_high_low(
+    df: pd.DataFrame, window: int = 252, starts: np.ndarray | None = None
+) -> Tuple[pd.Series, pd.Series]:
+    """Rolling `window`-bar high of `high` and low of `low` (52 weeks of daily bars)."""
+    high = rolling_extreme_kernel(df["high"].to_numpy(dtype=float), window, "max", starts)
+    low = rolling_extreme_kernel(df["low"].to_numpy(dtype=float), window, "min", starts)
+    return pd.Series(high, index=df.index).round(2), pd.Series(low, index=df.index).round(2)
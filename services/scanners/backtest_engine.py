@@ -0,0 +1,274 @@
+import numpy as np
+import pandas as pd
+from config.logger import log
+
+# Composite key = symbol_id * KEY_STRIDE + days since epoch (sorted like ORDER BY symbol_id, date)
+KEY_STRIDE = 1_000_000
+
+# Holding periods (bars after the entry bar) kept in the forward-returns table
+FORWARD_HORIZONS = (1, 5, 10, 20)
+
+#################################################################################################
+# Daily open/close panel of many symbols held as flat, (symbol_id, date)-sorted arrays.
+# Trades are resolved with np.searchsorted on a composite key instead of one query per
+# signal; every lookup below mirrors one of the per-signal SQL queries it replaces.
+#################################################################################################
+class PricePanel:
+    def __init__(self, df: pd.DataFrame):
+        df = df.sort_values(["symbol_id", "date"]).reset_index(drop=True)
+        self.symbol_id = df["symbol_id"].to_numpy(dtype=np.int64)
+        self.date = pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[ns]")
+        self.open = df["open"].to_numpy(dtype=float)
+        self.close = df["close"].to_numpy(dtype=float)
+        self.keys = make_keys(self.symbol_id, self.date)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _valid(self, pos, symbol_ids):
+        ok = (pos >= 0) & (pos < len(self.keys))
+        safe = np.clip(pos, 0, max(len(self.keys) - 1, 0))
+        if len(self.keys):
+            ok &= self.symbol_id[safe] == symbol_ids
+        return np.where(ok, pos, -1)
+
+    def locate_on(self, symbol_ids, dates):
+        """Row with date == d (…AND date = %s)."""
+        q = make_keys(symbol_ids, dates)
+        pos = np.searchsorted(self.keys, q, side="left")
+        pos = self._valid(pos, symbol_ids)
+        hit = pos >= 0
+        hit[hit] = self.keys[pos[hit]] == q[hit]
+        return np.where(hit, pos, -1)
+
+    def locate_after(self, symbol_ids, dates):
+        """First row with date > d (…AND date > %s ORDER BY date ASC LIMIT 1)."""
+        q = make_keys(symbol_ids, dates)
+        return self._valid(np.searchsorted(self.keys, q, side="right"), symbol_ids)
+
+    def locate_on_or_before(self, symbol_ids, dates):
+        """Last row with date <= d (…AND date <= %s ORDER BY date DESC LIMIT 1)."""
+        q = make_keys(symbol_ids, dates)
+        return self._valid(np.searchsorted(self.keys, q, side="right") - 1, symbol_ids)
+
+    def shift(self, pos, bars, symbol_ids):
+        """Row `bars` trading rows after pos for the same symbol (-1 if out of range)."""
+        pos = np.asarray(pos)
+        shifted = np.where(pos >= 0, pos + bars, -1)
+        return self._valid(shifted, symbol_ids)
+
+    def take(self, values, pos):
+        """values[pos] with NaN/NaT where pos == -1."""
+        pos = np.asarray(pos)
+        out = values[np.clip(pos, 0, max(len(values) - 1, 0))] if len(values) else np.empty(len(pos), values.dtype)
+        if np.issubdtype(values.dtype, np.datetime64):
+            return np.where(pos >= 0, out, np.datetime64("NaT"))
+        return np.where(pos >= 0, out, np.nan)
+
+#################################################################################################
+def make_keys(symbol_ids, dates) -> np.ndarray:
+    days = pd.to_datetime(dates).to_numpy(dtype="datetime64[D]").astype(np.int64)
+    return np.asarray(symbol_ids, dtype=np.int64) * KEY_STRIDE + days
+
+#################################################################################################
+# Loads the daily open/close panel of `symbol_ids` between start_date and end_date
+# (end_date=None → up to the latest bar) in a single query.
+#################################################################################################
+def load_price_panel(conn, price_table, symbol_ids, start_date, end_date=None) -> PricePanel:
+    symbol_ids = sorted({int(s) for s in symbol_ids})
+    sql = f"""
+        SELECT symbol_id, date, open, close
+        FROM {price_table}
+        WHERE timeframe = '1d'
+          AND symbol_id = ANY(%s)
+          AND date >= %s
+    """
+    params = [symbol_ids, pd.Timestamp(start_date).date()]
+    if end_date is not None:
+        sql += " AND date <= %s"
+        params.append(pd.Timestamp(end_date).date())
+
+    df = pd.read_sql(sql + " ORDER BY symbol_id, date", conn, params=tuple(params))
+    log(f"📦 Price panel loaded | {len(symbol_ids)} symbols | {len(df)} rows")
+    return PricePanel(df)
+
+#################################################################################################
+# WEEKLY rules: entry at the signal day's open, exit at the close of the last bar on or
+# before the following Friday (entry + Week(weekday=4)).
+# Adds entry_date, entry_price, exit_date, exit_price (NaN/NaT when not tradable).
+#################################################################################################
+def resolve_weekly_trades(panel: PricePanel, signals: pd.DataFrame) -> pd.DataFrame:
+    trades = signals.copy()
+    sids = trades["symbol_id"].to_numpy(dtype=np.int64)
+
+    entry_pos = panel.locate_on(sids, trades["date"])
+    entry_date = pd.to_datetime(panel.take(panel.date, entry_pos))
+    friday = entry_date + pd.offsets.Week(weekday=4)
+    exit_pos = np.where(
+        entry_pos >= 0,
+        panel.locate_on_or_before(sids, friday.fillna(pd.Timestamp(0))),
+        -1
+    )
+
+    trades["entry_date"] = entry_date
+    trades["entry_price"] = panel.take(panel.open, entry_pos)
+    trades["exit_date"] = pd.to_datetime(panel.take(panel.date, exit_pos))
+    trades["exit_price"] = panel.take(panel.close, exit_pos)
+    trades["tradable"] = (entry_pos >= 0) & (exit_pos >= 0)
+    return trades
+
+#################################################################################################
+# DAILY rules: entry at the open of the first bar after the signal, exit at the close
+# `hold_bars` bars after the entry bar.
+#################################################################################################
+def resolve_daily_trades(panel: PricePanel, signals: pd.DataFrame, hold_bars: int = 5) -> pd.DataFrame:
+    trades = signals.copy()
+    sids = trades["symbol_id"].to_numpy(dtype=np.int64)
+
+    entry_pos = panel.locate_after(sids, trades["date"])
+    exit_pos = panel.shift(entry_pos, hold_bars, sids)
+
+    trades["entry_date"] = pd.to_datetime(panel.take(panel.date, entry_pos))
+    trades["entry_price"] = panel.take(panel.open, entry_pos)
+    trades["exit_date"] = pd.to_datetime(panel.take(panel.date, exit_pos))
+    trades["exit_price"] = panel.take(panel.close, exit_pos)
+    trades["tradable"] = (entry_pos >= 0) & (exit_pos >= 0)
+    return trades
+
+#################################################################################################
+# Per-signal % returns for many exit rules in one pass over a forward-price matrix.
+#   entry="next_open"   → open of the first bar after the signal (daily backtest)
+#   entry="signal_open" → open of the signal bar itself (weekly backtest)
+# Columns: "<h>d" = close h bars after the entry bar, plus "week_end" = close of the
+# last bar on or before the Friday after entry. NaN where the exit is not available.
+#################################################################################################
+def holding_period_returns(
+    panel: PricePanel, signals: pd.DataFrame, holding_periods, entry: str = "next_open"
+) -> pd.DataFrame:
+    sids = signals["symbol_id"].to_numpy(dtype=np.int64)
+    dates = signals["date"]
+
+    if entry == "next_open":
+        entry_pos = panel.locate_after(sids, dates)
+    elif entry == "signal_open":
+        entry_pos = panel.locate_on(sids, dates)
+    else:
+        raise ValueError(f"Unsupported entry rule: {entry}")
+
+    holds = np.asarray(list(holding_periods), dtype=np.int64)
+    exit_pos = panel.shift(entry_pos[:, None], holds[None, :], sids[:, None])
+
+    entry_price = panel.take(panel.open, entry_pos)[:, None]
+    exit_close = panel.take(panel.close, exit_pos)
+    matrix = np.round((exit_close - entry_price) / entry_price * 100, 2)
+
+    df = pd.DataFrame(matrix, index=signals.index, columns=[f"{h}d" for h in holds])
+
+    entry_date = pd.to_datetime(panel.take(panel.date, entry_pos))
+    friday = (entry_date + pd.offsets.Week(weekday=4)).fillna(pd.Timestamp(0))
+    week_end_pos = np.where(entry_pos >= 0, panel.locate_on_or_before(sids, friday), -1)
+    week_end_close = panel.take(panel.close, week_end_pos)
+    df["week_end"] = np.round((week_end_close - entry_price[:, 0]) / entry_price[:, 0] * 100, 2)
+
+    return df
+
+#################################################################################################
+# Equal-weight weekly compounding. Every signal of a week gets capital / signals_count
+# (signals without a trade still take their share), so
+#   capital_next = capital * (1 + sum(trade returns) / signals_count)
+# Adds allocation / pnl / return_% to the tradable rows and returns (trades, final_capital).
+#################################################################################################
+def weekly_capital_rollup(trades: pd.DataFrame, initial_capital: float, week_col: str = "week"):
+    weeks = trades.groupby(week_col, sort=True)
+    signals_count = weeks.size()
+
+    ret = (trades["exit_price"] - trades["entry_price"]) / trades["entry_price"]
+    ret_sum = ret.where(trades["tradable"], 0.0).groupby(trades[week_col]).sum()
+    factor = 1 + ret_sum / signals_count
+
+    capital_start = initial_capital * factor.cumprod().shift(fill_value=1.0)
+    final_capital = float(initial_capital * factor.prod()) if len(factor) else float(initial_capital)
+
+    allocation = trades[week_col].map(capital_start / signals_count)
+    shares = allocation / trades["entry_price"]
+    pnl = shares * (trades["exit_price"] - trades["entry_price"])
+
+    trades = trades.assign(
+        allocation=allocation,
+        pnl=pnl,
+        **{"return_%": pnl / allocation * 100}
+    )
+    return trades, final_capital
+
+#################################################################################################
+# Forward prices for every bar of the panel (rows of the forward-returns table):
+#   next_date / next_open       → daily entry (first bar after the signal)
+#   date_Nd / close_Nd          → close N bars after that entry bar
+#   week_end_date / _close      → weekly exit for an entry at this bar's open
+# Values past the end of the data are NaN/NaT.
+#################################################################################################
+def compute_forward_prices(panel: PricePanel, horizons=FORWARD_HORIZONS) -> pd.DataFrame:
+    pos = np.arange(len(panel))
+    sids = panel.symbol_id
+    next_pos = panel.shift(pos, 1, sids)
+
+    df = pd.DataFrame({
+        "symbol_id": sids,
+        "date": panel.date,
+        "open": panel.open,
+        "next_date": panel.take(panel.date, next_pos),
+        "next_open": panel.take(panel.open, next_pos),
+    })
+    for n in horizons:
+        exit_pos = panel.shift(pos, 1 + n, sids)
+        df[f"date_{n}d"] = panel.take(panel.date, exit_pos)
+        df[f"close_{n}d"] = panel.take(panel.close, exit_pos)
+
+    friday = pd.DatetimeIndex(panel.date) + pd.offsets.Week(weekday=4)
+    week_end_pos = panel.locate_on_or_before(sids, friday)
+    df["week_end_date"] = panel.take(panel.date, week_end_pos)
+    df["week_end_close"] = panel.take(panel.close, week_end_pos)
+    return df
+
+#################################################################################################
+# Same trade resolution as resolve_weekly_trades / resolve_daily_trades, but as joins
+# against precomputed forward-returns rows (date columns as datetime64).
+#################################################################################################
+def _as_ns(df: pd.DataFrame) -> pd.DataFrame:
+    """Join keys must share one datetime resolution (CSV and DB dates may differ)."""
+    return df.assign(
+        symbol_id=df["symbol_id"].astype(np.int64),
+        date=pd.to_datetime(df["date"]).astype("datetime64[ns]")
+    )
+
+def resolve_weekly_trades_forward(fwd: pd.DataFrame, signals: pd.DataFrame) -> pd.DataFrame:
+    cols = ["symbol_id", "date", "open", "week_end_date", "week_end_close"]
+    merged = _as_ns(signals[["symbol_id", "date"]]).merge(_as_ns(fwd[cols]), on=["symbol_id", "date"], how="left")
+    merged.index = signals.index
+
+    trades = signals.copy()
+    found = merged["week_end_date"].notna()
+    trades["entry_date"] = merged["date"].where(found)
+    trades["entry_price"] = merged["open"]
+    trades["exit_date"] = merged["week_end_date"]
+    trades["exit_price"] = merged["week_end_close"]
+    trades["tradable"] = found
+    return trades
+
+def resolve_daily_trades_forward(fwd: pd.DataFrame, signals: pd.DataFrame, hold_bars: int = 5) -> pd.DataFrame:
+    cols = ["symbol_id", "date", "next_date", "next_open", f"date_{hold_bars}d", f"close_{hold_bars}d"]
+    left = _as_ns(signals[["symbol_id", "date"]]).reset_index().sort_values("date")
+
+    # Last forward row on or before the signal date → its next bar is the first bar after the signal
+    merged = pd.merge_asof(
+        left, _as_ns(fwd[cols]).sort_values("date"),
+        on="date", by="symbol_id", direction="backward"
+    ).set_index("index").reindex(signals.index)
+
+    trades = signals.copy()
+    trades["entry_date"] = merged["next_date"]
+    trades["entry_price"] = merged["next_open"]
+    trades["exit_date"] = merged[f"date_{hold_bars}d"]
+    trades["exit_price"] = merged[f"close_{hold_bars}d"]
+    trades["tradable"] = merged["next_date"].notna() & merged[f"date_{hold_bars}d"].notna()
+    return trades
@@ -2,12 +2,23 @@ import os
 import pandas as pd
 import traceback
 from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from db.connection import get_db_connection, close_db_connection
 from services.import_export_service import export_to_csv
 from config.logger import log
 from config.db_table import ASSET_TABLE_MAP
+from services.scanners.backtest_engine import (
+    FORWARD_HORIZONS, load_price_panel, weekly_capital_rollup,
+    resolve_weekly_trades, resolve_daily_trades,
+    resolve_weekly_trades_forward, resolve_daily_trades_forward,
+    holding_period_returns
+)
+from services.forward_returns_service import load_forward_returns
+from services.calendar_service import get_calendar
 
 LOOKBACK_DAYS = 365
+INITIAL_CAPITAL = 1_000_000   # weekly backtest starting capital
+HOLD_BARS = 5                 # daily backtest holding period (bars)
 
 #################################################################################################
 # Helper: get next Monday after a given date
@@ -17,12 +28,238 @@ def next_monday(dt):
     return dt + timedelta(days=days_ahead)
 
 
+#################################################################################################
+# Reads every scanner CSV of a folder → {file_name: signals sorted by date}.
+# Files that are empty or miss symbol_id / yahoo_symbol / date are skipped.
+#################################################################################################
+def read_scanner_csvs(folder_path: str, csv_files: list) -> dict:
+    scanners = {}
+    for file_name in csv_files:
+        try:
+            df_csv = pd.read_csv(os.path.join(folder_path, file_name))
+            if df_csv.empty:
+                log(f"⚠ Skipping {file_name} | Empty file")
+                continue
+
+            missing = [c for c in ['symbol_id', 'yahoo_symbol', 'date'] if c not in df_csv.columns]
+            if missing:
+                log(f"⚠ Skipping {file_name} | Missing column: {missing[0]}")
+                continue
+
+            df_csv['date'] = pd.to_datetime(df_csv['date'])
+            scanners[file_name] = df_csv.sort_values('date')
+
+        except Exception as e_file:
+            log(f"❌ Error reading {file_name} | {e_file}")
+            traceback.print_exc()
+
+    return scanners
+
+#################################################################################################
+# Summary stats over the (rounded) per-trade returns of one scanner
+#################################################################################################
+def trade_stats(trade_returns: pd.Series) -> dict:
+    if trade_returns.empty:
+        return {"total_trades": 0, "win_%": 0.0, "max_profit_%": 0.0, "max_loss_%": 0.0}
+
+    total_trades = len(trade_returns)
+    return {
+        "total_trades": total_trades,
+        "win_%": round((trade_returns > 0).sum() / total_trades * 100, 2),
+        "max_profit_%": round(trade_returns.max(), 2),
+        "max_loss_%": round(trade_returns.min(), 2)
+    }
+
+#################################################################################################
+# Per-scanner building blocks shared by the serial backtests and run_backtests_parallel
+#################################################################################################
+def _load_symbols(conn, symbol_table: str, symbol_ids=None) -> pd.DataFrame:
+    # symbol_id → yahoo_symbol & name mapping
+    if symbol_ids is None:
+        return pd.read_sql(
+            f"SELECT symbol_id, yahoo_symbol, name FROM {symbol_table}", conn
+        ).set_index("symbol_id")
+
+    return pd.read_sql(
+        f"SELECT symbol_id, yahoo_symbol, name FROM {symbol_table} WHERE symbol_id = ANY(%s)",
+        conn, params=(sorted({int(s) for s in symbol_ids}),)
+    ).set_index("symbol_id")
+
+
+def _load_weekly_source(conn, asset_type: str, price_table: str, signals: pd.DataFrame, use_forward_returns: bool):
+    # One price panel (or forward-returns slice) for the given signals
+    # (exit is at most 7 days after the signal)
+    if use_forward_returns:
+        return load_forward_returns(
+            conn, asset_type,
+            signals['symbol_id'].unique(),
+            signals['date'].min(),
+            signals['date'].max()
+        )
+    return load_price_panel(
+        conn, price_table,
+        signals['symbol_id'].unique(),
+        signals['date'].min(),
+        signals['date'].max() + timedelta(days=7)
+    )
+
+
+def _load_daily_source(conn, asset_type: str, price_table: str, signals: pd.DataFrame, use_forward_returns: bool):
+    if use_forward_returns:
+        # Signals may fall on non-trading days: start a little earlier for the as-of join
+        return load_forward_returns(
+            conn, asset_type,
+            signals['symbol_id'].unique(),
+            signals['date'].min() - timedelta(days=10),
+            signals['date'].max()
+        )
+    # Open-ended: exits may fall past the last signal
+    return load_price_panel(
+        conn, price_table,
+        signals['symbol_id'].unique(),
+        signals['date'].min()
+    )
+
+
+#################################################################################################
+# True when the exits of the latest signals are already in the data: the last session on or
+# before their Friday (see resolve_weekly_trades) is not after the last loaded bar.
+# Without a calendar the latest week is always treated as incomplete.
+#################################################################################################
+def _latest_week_complete(df_csv: pd.DataFrame, source, calendar, use_forward_returns: bool) -> bool:
+    if calendar is None or df_csv.empty:
+        return False
+    last_bar = source['week_end_date'].max() if use_forward_returns else (source.date.max() if len(source) else None)
+    if last_bar is None or pd.isna(last_bar):
+        return False
+    friday = df_csv['date'].max() + pd.offsets.Week(weekday=4)
+    exit_session = calendar.session_on_or_before(friday)
+    return exit_session is not None and pd.Timestamp(exit_session) <= pd.Timestamp(last_bar)
+
+
+def _weekly_scanner_trades(
+    scanner: str, df_csv: pd.DataFrame, source, symbols: pd.DataFrame, use_forward_returns: bool, calendar=None
+):
+    # Week bucket (Monday-based); skip the latest week unless the calendar says its exits are in
+    df_csv = df_csv.copy()
+    df_csv['week'] = df_csv['date'].dt.to_period('W-MON').dt.start_time
+    if not _latest_week_complete(df_csv, source, calendar, use_forward_returns):
+        df_csv = df_csv[df_csv['week'] != df_csv['week'].max()]
+
+    if use_forward_returns:
+        trades = resolve_weekly_trades_forward(source, df_csv)
+    else:
+        trades = resolve_weekly_trades(source, df_csv)
+    trades, final_capital = weekly_capital_rollup(trades, INITIAL_CAPITAL)
+    trades = trades[trades['tradable']]
+
+    trades_df = pd.DataFrame({
+        "scanner": scanner,
+        "symbol_id": trades['symbol_id'],
+        "yahoo_symbol": trades['symbol_id'].map(symbols['yahoo_symbol']).fillna(''),
+        "symbol_name": trades['symbol_id'].map(symbols['name']).fillna(''),
+        "signal_date": trades['date'],
+        "entry_date": trades['entry_date'],
+        "exit_date": trades['exit_date'],
+        "allocation": trades['allocation'].round(2),
+        "pnl": trades['pnl'].round(2),
+        "return_%": trades['return_%'].round(2)
+    })
+
+    final_capital = round(final_capital, 2)
+    net_pnl = round(final_capital - INITIAL_CAPITAL, 2)
+    total_return_pct = round((net_pnl / INITIAL_CAPITAL) * 100, 2)
+
+    summary = {
+        "scanner": scanner,
+        **trade_stats(trades_df['return_%']),
+        "final_capital": final_capital,
+        "net_pnl": net_pnl,
+        "total_return_%": total_return_pct
+    }
+    return trades_df, summary
+
+
+def _daily_scanner_trades(scanner: str, df_csv: pd.DataFrame, source, symbols: pd.DataFrame, use_forward_returns: bool):
+    if use_forward_returns:
+        trades = resolve_daily_trades_forward(source, df_csv, hold_bars=HOLD_BARS)
+    else:
+        trades = resolve_daily_trades(source, df_csv, hold_bars=HOLD_BARS)
+    trades = trades[trades['tradable']]
+
+    trade_return_pct = (trades['exit_price'] - trades['entry_price']) / trades['entry_price'] * 100
+    trades_df = pd.DataFrame({
+        "scanner": scanner,
+        "symbol_id": trades['symbol_id'],
+        "yahoo_symbol": trades['symbol_id'].map(symbols['yahoo_symbol']).fillna(''),
+        "symbol_name": trades['symbol_id'].map(symbols['name']).fillna(''),
+        "signal_date": trades['date'],
+        "entry_date": trades['entry_date'],
+        "exit_date": trades['exit_date'],
+        "entry_price": trades['entry_price'].round(2),
+        "exit_price": trades['exit_price'].round(2),
+        "return_%": trade_return_pct.round(2)
+    })
+
+    summary = {
+        "scanner": scanner,
+        **trade_stats(trades_df['return_%'])
+    }
+    return trades_df, summary
+
+
+def _report_weekly(all_trades: list, all_summaries: list, folder_path: str) -> pd.DataFrame:
+    # EXPORT all trades to CSV
+    all_trades = [t for t in all_trades if not t.empty]
+    all_trades_df = pd.concat(all_trades, ignore_index=True) if all_trades else pd.DataFrame()
+    if not all_trades_df.empty:
+        export_to_csv(all_trades_df, folder_path, "all_trades_details")
+        log(f"🎯 Full trade details exported | Total trades: {len(all_trades_df)}")
+
+    # SUMMARY: print only
+    summary_df = pd.DataFrame(all_summaries)
+    if not summary_df.empty:
+        summary_df = summary_df.sort_values("scanner")
+        print("\n================= SCANNER PERFORMANCE SUMMARY =================")
+        print(summary_df.to_string(index=False,
+                                   columns=[
+                                       "scanner", "total_trades", "win_%",
+                                       "max_profit_%", "max_loss_%",
+                                       "final_capital", "net_pnl", "total_return_%"
+                                   ]))
+        print("===============================================================\n")
+
+    # Return summary only (prevents printing thousands of trades)
+    return summary_df
+
+
+def _report_daily(all_trades: list, all_summaries: list, folder_path: str):
+    trades_df = pd.concat(all_trades, ignore_index=True) if all_trades else pd.DataFrame()
+    if not trades_df.empty:
+        export_to_csv(trades_df, folder_path, "fixed_5day_trades")
+        log(f"🎯 Trades exported | Total trades: {len(trades_df)}")
+
+    summary_df = pd.DataFrame(all_summaries)
+    if not summary_df.empty:
+        summary_df = summary_df.sort_values("scanner")
+        print("\n================= SCANNER PERFORMANCE SUMMARY =================")
+        print(summary_df.to_string(index=False))
+        print("===============================================================\n")
+
+    return trades_df, summary_df
+
 #################################################################################################
 # WEEKLY BACKTEST: buy on signal day’s open, sell on Friday's close
+# The daily price panel for all scanners is loaded once; entries, exits and the
+# weekly capital compounding are resolved on arrays (see backtest_engine).
+# use_forward_returns=True joins the signals to {asset}_forward_returns instead.
 #################################################################################################
-def backtest_weekly_scanners(asset_type: str = "india_equity", folder_path: str = None):
-    INITIAL_CAPITAL = 1_000_000
-    all_trades_df = pd.DataFrame()
+def backtest_weekly_scanners(
+    asset_type: str = "india_equity",
+    folder_path: str = None,
+    use_forward_returns: bool = False
+):
+    all_trades = []
     all_summaries = []
 
     if not folder_path or not os.path.exists(folder_path):
@@ -43,148 +280,25 @@ def backtest_weekly_scanners(asset_type: str = "india_equity", folder_path: str
         conn = get_db_connection()
         log(f"🔍 Starting weekly backtest for {len(csv_files)} scanner files...")
 
-        # symbol_id → yahoo_symbol & name mapping
-        symbol_map = pd.read_sql(
-            f"SELECT symbol_id, yahoo_symbol, name FROM {symbol_table}",
-            conn
-        ).set_index('symbol_id').to_dict('index')
+        symbols = _load_symbols(conn, symbol_table)
 
-        for file_name in csv_files:
-            # print("\n" + "="*70)
-            # print(f"📂 SCANNER : {file_name.replace('.csv','')}")
-            # print("="*70)
+        scanners = read_scanner_csvs(folder_path, csv_files)
+        if not scanners:
+            return pd.DataFrame()
 
-            current_capital = INITIAL_CAPITAL
-            weekly_capital_log = []
-            trades_list = []
+        # One price panel (or forward-returns slice) for every scanner
+        all_signals = pd.concat(scanners.values(), ignore_index=True)
+        source = _load_weekly_source(conn, asset_type, price_table, all_signals, use_forward_returns)
+        calendar = get_calendar(asset_type)
 
+        for file_name, df_csv in scanners.items():
+            scanner = file_name.replace(".csv", "")
             try:
-                path = os.path.join(folder_path, file_name)
-                df_csv = pd.read_csv(path)
-                if df_csv.empty:
-                    log(f"⚠ Skipping {file_name} | Empty file")
-                    continue
-
-                for col in ['symbol_id', 'yahoo_symbol', 'date']:
-                    if col not in df_csv.columns:
-                        log(f"⚠ Skipping {file_name} | Missing column: {col}")
-                        continue
-
-                df_csv['date'] = pd.to_datetime(df_csv['date'])
-                df_csv = df_csv.sort_values('date')
-
-                # Week bucket (Monday-based)
-                df_csv['week'] = df_csv['date'].dt.to_period('W-MON').apply(lambda x: x.start_time)
-                last_week_start = df_csv['week'].max()
-
-                for week_start, week_df in df_csv.groupby('week'):
-                    if week_start == last_week_start:
-                        continue  # skip incomplete latest week
-
-                    signals_count = len(week_df)
-                    if signals_count == 0:
-                        continue
-
-                    allocation_per_trade = current_capital / signals_count
-                    weekly_pnl = 0.0
-
-                    for _, row in week_df.iterrows():
-                        symbol_id = row['symbol_id']
-                        signal_date = row['date']
-
-                        # ENTRY (signal day open)
-                        entry_sql = f"""
-                            SELECT date, open
-                            FROM {price_table}
-                            WHERE symbol_id=%s AND timeframe='1d' AND date=%s
-                            ORDER BY date ASC
-                            LIMIT 1
-                        """
-                        entry_df = pd.read_sql(entry_sql, conn,
-                                               params=(symbol_id, signal_date.strftime("%Y-%m-%d")))
-                        if entry_df.empty:
-                            continue
-
-                        entry_date = pd.to_datetime(entry_df.iloc[0]['date'])
-                        entry_price = entry_df.iloc[0]['open']
-
-                        # EXIT (Friday close)
-                        friday_date = entry_date + pd.offsets.Week(weekday=4)
-                        exit_sql = f"""
-                            SELECT date, close
-                            FROM {price_table}
-                            WHERE symbol_id=%s AND timeframe='1d' AND date <= %s
-                            ORDER BY date DESC
-                            LIMIT 1
-                        """
-                        exit_df = pd.read_sql(exit_sql, conn,
-                                              params=(symbol_id, friday_date.strftime("%Y-%m-%d")))
-                        if exit_df.empty:
-                            continue
-
-                        exit_date = pd.to_datetime(exit_df.iloc[0]['date'])
-                        exit_price = exit_df.iloc[0]['close']
-
-                        shares = allocation_per_trade / entry_price
-                        trade_pnl = shares * (exit_price - entry_price)
-                        trade_return_pct = (trade_pnl / allocation_per_trade) * 100
-                        weekly_pnl += trade_pnl
-
-                        symbol_name = symbol_map.get(symbol_id, {}).get('name', '')
-                        yahoo_symbol = symbol_map.get(symbol_id, {}).get('yahoo_symbol', '')
-
-                        trades_list.append({
-                            "scanner": file_name.replace(".csv", ""),
-                            "symbol_id": symbol_id,
-                            "yahoo_symbol": yahoo_symbol,
-                            "symbol_name": symbol_name,
-                            "signal_date": signal_date,
-                            "entry_date": entry_date,
-                            "exit_date": exit_date,
-                            "allocation": round(allocation_per_trade, 2),
-                            "pnl": round(trade_pnl, 2),
-                            "return_%": round(trade_return_pct, 2)
-                        })
-
-                    # Update capital
-                    if weekly_pnl != 0:
-                        current_capital += weekly_pnl
-                        weekly_capital_log.append({
-                            "week": week_start,
-                            "signals": signals_count,
-                            "weekly_pnl": round(weekly_pnl, 2),
-                            "capital_end": round(current_capital, 2)
-                        })
-
-                # STATS
-                trade_returns = [t['return_%'] for t in trades_list]
-                if trade_returns:
-                    total_trades = len(trade_returns)
-                    win_pct = round(sum(1 for r in trade_returns if r > 0) / total_trades * 100, 2)
-                    max_profit_pct = round(max(trade_returns), 2)
-                    max_loss_pct = round(min(trade_returns), 2)
-                else:
-                    total_trades = 0
-                    win_pct = max_profit_pct = max_loss_pct = 0.0
-
-                final_capital = round(current_capital, 2)
-                net_pnl = round(final_capital - INITIAL_CAPITAL, 2)
-                total_return_pct = round((net_pnl / INITIAL_CAPITAL) * 100, 2)
-
-                all_summaries.append({
-                    "scanner": file_name.replace(".csv", ""),
-                    "total_trades": total_trades,
-                    "win_%": win_pct,
-                    "max_profit_%": max_profit_pct,
-                    "max_loss_%": max_loss_pct,
-                    "final_capital": final_capital,
-                    "net_pnl": net_pnl,
-                    "total_return_%": total_return_pct
-                })
-
-                # Keep all trades for export
-                if trades_list:
-                    all_trades_df = pd.concat([all_trades_df, pd.DataFrame(trades_list)], ignore_index=True)
+                trades_df, summary = _weekly_scanner_trades(
+                    scanner, df_csv, source, symbols, use_forward_returns, calendar
+                )
+                all_trades.append(trades_df)
+                all_summaries.append(summary)
 
             except Exception as e_file:
                 log(f"❌ Error processing {file_name} | {e_file}")
@@ -195,32 +309,18 @@ def backtest_weekly_scanners(asset_type: str = "india_equity", folder_path: str
             close_db_connection(conn)
             log("🔒 Database connection closed")
 
-    # EXPORT all trades to CSV
-    if not all_trades_df.empty:
-        export_to_csv(all_trades_df, folder_path, "all_trades_details")
-        log(f"🎯 Full trade details exported | Total trades: {len(all_trades_df)}")
-
-    # SUMMARY: print only
-    summary_df = pd.DataFrame(all_summaries)
-    if not summary_df.empty:
-        summary_df = summary_df.sort_values("scanner")
-        print("\n================= SCANNER PERFORMANCE SUMMARY =================")
-        print(summary_df.to_string(index=False,
-                                   columns=[
-                                       "scanner", "total_trades", "win_%",
-                                       "max_profit_%", "max_loss_%",
-                                       "final_capital", "net_pnl", "total_return_%"
-                                   ]))
-        print("===============================================================\n")
-
-    # Return summary only (prevents printing thousands of trades)
-    return summary_df
+    return _report_weekly(all_trades, all_summaries, folder_path)
 
 
 #################################################################################################
 # DAILY BACKTEST: buy next day after signal, sell after 5 trading days
+# use_forward_returns=True joins the signals to {asset}_forward_returns instead.
 #################################################################################################
-def backtest_daily_scanners(asset_type: str = "india_equity", folder_path: str = None):
+def backtest_daily_scanners(
+    asset_type: str = "india_equity",
+    folder_path: str = None,
+    use_forward_returns: bool = False
+):
     all_trades = []
     all_summaries = []
 
@@ -242,97 +342,30 @@ def backtest_daily_scanners(asset_type: str = "india_equity", folder_path: str =
         conn = get_db_connection()
         log(f"🔍 Starting daily backtest for {len(csv_files)} scanner files...")
 
-        symbol_map = pd.read_sql(
-            f"SELECT symbol_id, yahoo_symbol, name FROM {symbol_table}",
-            conn
-        ).set_index("symbol_id").to_dict("index")
+        symbols = _load_symbols(conn, symbol_table)
+
+        scanners = read_scanner_csvs(folder_path, csv_files)
+        if not scanners:
+            return pd.DataFrame(), pd.DataFrame()
+
+        # One price panel for every scanner
+        all_signals = pd.concat(scanners.values(), ignore_index=True)
+        if use_forward_returns and HOLD_BARS not in FORWARD_HORIZONS:
+            log(f"⚠ No forward column for {HOLD_BARS} bars | falling back to the price panel")
+            use_forward_returns = False
 
-        for file_name in csv_files:
+        source = _load_daily_source(conn, asset_type, price_table, all_signals, use_forward_returns)
+
+        for file_name, df_csv in scanners.items():
+            scanner = file_name.replace(".csv", "")
             print("\n" + "=" * 70)
-            print(f"📂 SCANNER : {file_name.replace('.csv','')}")
+            print(f"📂 SCANNER : {scanner}")
             print("=" * 70)
 
             try:
-                path = os.path.join(folder_path, file_name)
-                df_csv = pd.read_csv(path)
-                if df_csv.empty:
-                    log(f"⚠ Skipping {file_name} | Empty file")
-                    continue
-
-                for col in ['symbol_id', 'yahoo_symbol', 'date']:
-                    if col not in df_csv.columns:
-                        log(f"⚠ Skipping {file_name} | Missing column: {col}")
-                        continue
-
-                df_csv['date'] = pd.to_datetime(df_csv['date'])
-                df_csv = df_csv.sort_values('date')
-
-                for _, row in df_csv.iterrows():
-                    symbol_id   = row['symbol_id']
-                    signal_date = row['date']
-
-                    entry_sql = f"""
-                        SELECT date, open
-                        FROM {price_table}
-                        WHERE symbol_id=%s AND timeframe='1d' AND date > %s
-                        ORDER BY date ASC
-                        LIMIT 1
-                    """
-                    entry_df = pd.read_sql(entry_sql, conn, params=(symbol_id, signal_date.strftime("%Y-%m-%d")))
-                    if entry_df.empty:
-                        continue
-
-                    entry_date  = pd.to_datetime(entry_df.iloc[0]['date'])
-                    entry_price = entry_df.iloc[0]['open']
-
-                    exit_sql = f"""
-                        SELECT date, close
-                        FROM {price_table}
-                        WHERE symbol_id=%s AND timeframe='1d' AND date > %s
-                        ORDER BY date ASC
-                        LIMIT 1 OFFSET 4
-                    """
-                    exit_df = pd.read_sql(exit_sql, conn, params=(symbol_id, entry_date.strftime("%Y-%m-%d")))
-                    if exit_df.empty:
-                        continue
-
-                    exit_date  = pd.to_datetime(exit_df.iloc[0]['date'])
-                    exit_price = exit_df.iloc[0]['close']
-
-                    trade_return_pct = ((exit_price - entry_price) / entry_price) * 100
-                    symbol_name = symbol_map.get(symbol_id, {}).get("name", "")
-                    yahoo_symbol = symbol_map.get(symbol_id, {}).get("yahoo_symbol", "")
-
-                    all_trades.append({
-                        "scanner": file_name.replace(".csv", ""),
-                        "symbol_id": symbol_id,
-                        "yahoo_symbol": yahoo_symbol,
-                        "symbol_name": symbol_name,
-                        "signal_date": signal_date,
-                        "entry_date": entry_date,
-                        "exit_date": exit_date,
-                        "entry_price": round(entry_price, 2),
-                        "exit_price": round(exit_price, 2),
-                        "return_%": round(trade_return_pct, 2)
-                    })
-
-                trade_returns = [t['return_%'] for t in all_trades if t['scanner'] == file_name.replace(".csv", "")]
-                if trade_returns:
-                    total_trades = len(trade_returns)
-                    win_pct = round(sum(1 for r in trade_returns if r > 0) / total_trades * 100, 2)
-                    max_profit_pct = round(max(trade_returns), 2)
-                    max_loss_pct   = round(min(trade_returns), 2)
-                else:
-                    total_trades = 0
-                    win_pct = max_profit_pct = max_loss_pct = 0.0
-
-                all_summaries.append({
-                    "scanner": file_name.replace(".csv", ""),
-                    "total_trades": total_trades,
-                    "win_%": win_pct,
-                    "max_profit_%": max_profit_pct,
-                    "max_loss_%": max_loss_pct
-                })
+                trades_df, summary = _daily_scanner_trades(scanner, df_csv, source, symbols, use_forward_returns)
+                all_trades.append(trades_df)
+                all_summaries.append(summary)
 
             except Exception as e_file:
                 log(f"❌ Error processing {file_name} | {e_file}")
@@ -343,16 +376,184 @@ def backtest_daily_scanners(asset_type: str = "india_equity", folder_path: str =
             close_db_connection(conn)
             log("🔒 Database connection closed")
 
-    trades_df = pd.DataFrame(all_trades)
-    if not trades_df.empty:
-        export_to_csv(trades_df, folder_path, "fixed_5day_trades")
-        log(f"🎯 Trades exported | Total trades: {len(trades_df)}")
+    return _report_daily(all_trades, all_summaries, folder_path)
 
-    summary_df = pd.DataFrame(all_summaries)
-    if not summary_df.empty:
-        summary_df = summary_df.sort_values("scanner")
-        print("\n================= SCANNER PERFORMANCE SUMMARY =================")
-        print(summary_df.to_string(index=False))
-        print("===============================================================\n")
 
-    return trades_df, summary_df
\ No newline at end of file
+#################################################################################################
+# Process-pool worker: backtests ONE scanner file end to end on the worker's own pooled
+# connection (the pool is per process, see db.connection) and loads only the prices that
+# file needs. The trading calendar is built once by the parent and shipped with the task.
+# Returns (file_name, trades_df, summary); summary is None if the file was skipped.
+#################################################################################################
+def _backtest_file(task: tuple):
+    mode, asset_type, folder_path, file_name, use_forward_returns, calendar = task
+    symbol_table, price_table, _, _ = ASSET_TABLE_MAP[asset_type]
+    scanner = file_name.replace(".csv", "")
+
+    scanners = read_scanner_csvs(folder_path, [file_name])
+    if not scanners:
+        return file_name, pd.DataFrame(), None
+    df_csv = scanners[file_name]
+
+    conn = get_db_connection()
+    try:
+        symbols = _load_symbols(conn, symbol_table, df_csv['symbol_id'].unique())
+        if mode == "weekly":
+            source = _load_weekly_source(conn, asset_type, price_table, df_csv, use_forward_returns)
+        else:
+            source = _load_daily_source(conn, asset_type, price_table, df_csv, use_forward_returns)
+    finally:
+        close_db_connection(conn)
+
+    if mode == "weekly":
+        trades_df, summary = _weekly_scanner_trades(
+            scanner, df_csv, source, symbols, use_forward_returns, calendar
+        )
+    else:
+        trades_df, summary = _daily_scanner_trades(scanner, df_csv, source, symbols, use_forward_returns)
+
+    return file_name, trades_df, summary
+
+#################################################################################################
+# PARALLEL BACKTEST: the per-file backtests of a scanner folder (e.g. one file per year from
+# scanner_play_multi_years) fanned out across a process pool.
+# Trades and summaries are merged in file-name order, so the output does not depend on
+# which worker finishes first, and match backtest_weekly_scanners / backtest_daily_scanners.
+# mode="weekly" returns the summary, mode="daily" returns (trades, summary) — as the serial ones.
+#################################################################################################
+def run_backtests_parallel(
+    asset_type: str = "india_equity",
+    folder_path: str = None,
+    mode: str = "weekly",
+    use_forward_returns: bool = False,
+    max_workers: int | None = None
+):
+    if mode not in ("weekly", "daily"):
+        raise ValueError(f"Unsupported backtest mode: {mode}")
+
+    empty = pd.DataFrame() if mode == "weekly" else (pd.DataFrame(), pd.DataFrame())
+
+    if not folder_path or not os.path.exists(folder_path):
+        log(f"❌ Invalid folder path: {folder_path}")
+        return empty
+
+    if asset_type not in ASSET_TABLE_MAP:
+        raise ValueError(f"Unsupported asset_type: {asset_type}")
+
+    csv_files = sorted(f for f in os.listdir(folder_path) if f.endswith(".csv"))
+    if not csv_files:
+        log("❌ No scanner CSVs found")
+        return empty
+
+    if mode == "daily" and use_forward_returns and HOLD_BARS not in FORWARD_HORIZONS:
+        log(f"⚠ No forward column for {HOLD_BARS} bars | falling back to the price panel")
+        use_forward_returns = False
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(csv_files))
+    log(f"🔍 Starting parallel {mode} backtest | {len(csv_files)} scanner files | {max_workers} processes")
+
+    # Built here once: each worker would otherwise rebuild it from the price tables
+    calendar = get_calendar(asset_type) if mode == "weekly" else None
+
+    results = {}
+    tasks = [(mode, asset_type, folder_path, f, use_forward_returns, calendar) for f in csv_files]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(_backtest_file, task): task[3] for task in tasks}
+        for future in as_completed(futures):
+            file_name = futures[future]
+            try:
+                _, trades_df, summary = future.result()
+                results[file_name] = (trades_df, summary)
+                log(f"✔ Backtested {file_name} | {len(trades_df)} trades")
+            except Exception as e_file:
+                log(f"❌ Error processing {file_name} | {e_file}")
+                traceback.print_exc()
+
+    # Deterministic merge: file-name order
+    all_trades, all_summaries = [], []
+    for file_name in csv_files:
+        if file_name not in results or results[file_name][1] is None:
+            continue
+        trades_df, summary = results[file_name]
+        all_trades.append(trades_df)
+        all_summaries.append(summary)
+
+    if mode == "weekly":
+        return _report_weekly(all_trades, all_summaries, folder_path)
+    return _report_daily(all_trades, all_summaries, folder_path)
+
+
+#################################################################################################
+# HOLDING-PERIOD SWEEP: every scanner × every exit rule in one vectorized pass.
+# Returns one row per (scanner, exit) with the same stats as the daily backtest
+# (hold 5 with entry="next_open" reproduces backtest_daily_scanners) and prints the
+# average-return table (exit rule × scanner).
+#################################################################################################
+def sweep_holding_periods(
+    asset_type: str = "india_equity",
+    folder_path: str = None,
+    holding_periods=range(1, 31),
+    entry: str = "next_open"       # "next_open" (daily rule) or "signal_open" (weekly rule)
+) -> pd.DataFrame:
+    if not folder_path or not os.path.exists(folder_path):
+        log(f"❌ Invalid folder path: {folder_path}")
+        return pd.DataFrame()
+
+    if asset_type not in ASSET_TABLE_MAP:
+        raise ValueError(f"Unsupported asset_type: {asset_type}")
+
+    _, price_table, _, _ = ASSET_TABLE_MAP[asset_type]
+    holding_periods = list(holding_periods)
+    conn = None
+
+    try:
+        csv_files = [f for f in os.listdir(folder_path) if f.endswith(".csv")]
+        scanners = read_scanner_csvs(folder_path, csv_files)
+        if not scanners:
+            log("❌ No scanner CSVs found")
+            return pd.DataFrame()
+
+        signals = pd.concat(
+            [df.assign(scanner=f.replace(".csv", "")) for f, df in scanners.items()],
+            ignore_index=True
+        )
+        log(f"🔍 Holding-period sweep | {len(scanners)} scanners | {len(signals)} signals | "
+            f"{len(holding_periods)} periods | entry={entry}")
+
+        conn = get_db_connection()
+        panel = load_price_panel(
+            conn, price_table,
+            signals['symbol_id'].unique(),
+            signals['date'].min()
+        )
+
+    finally:
+        if conn:
+            close_db_connection(conn)
+
+    returns = holding_period_returns(panel, signals, holding_periods, entry=entry)
+
+    # Long format: one row per (scanner, exit rule) with its trade stats
+    grouped = returns.groupby(signals['scanner'])
+    stats = pd.DataFrame({
+        "total_trades": grouped.count().stack(),
+        "win_%": (grouped.apply(lambda r: (r > 0).sum() / r.notna().sum() * 100)).stack(),
+        "avg_return_%": grouped.mean().stack(),
+        "max_profit_%": grouped.max().stack(),
+        "max_loss_%": grouped.min().stack(),
+    })
+    stats.index.names = ["scanner", "exit"]
+    stats = stats.reset_index()
+    stats[["win_%", "avg_return_%", "max_profit_%", "max_loss_%"]] = (
+        stats[["win_%", "avg_return_%", "max_profit_%", "max_loss_%"]].fillna(0.0).round(2)
+    )
+
+    export_to_csv(stats, folder_path, f"holding_period_sweep_{entry}")
+
+    table = stats.pivot(index="exit", columns="scanner", values="avg_return_%")
+    table = table.reindex([f"{h}d" for h in holding_periods] + ["week_end"])
+    print("\n============ AVG RETURN % BY EXIT RULE (rows) × SCANNER ============")
+    print(table.to_string())
+    print("=====================================================================\n")
+
+    return stats
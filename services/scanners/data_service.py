@@ -7,6 +7,26 @@ from config.db_table import ASSET_TABLE_MAP
 
 LOOKBACK_DAYS = 365
 
+#################################################################################################
+# Attaches to every daily row the latest `other` row of the same symbol dated on or
+# before it (sorted as-of join, memory linear in rows). Daily rows with no such
+# row are dropped, as the previous merge + filter + groupby().last() did.
+#################################################################################################
+def align_asof(df_daily: pd.DataFrame, df_other: pd.DataFrame, date_col: str) -> pd.DataFrame:
+    df_other = df_other.dropna(subset=[date_col]).sort_values(date_col)
+
+    df = pd.merge_asof(
+        df_daily.sort_values('date'),
+        df_other,
+        left_on='date',
+        right_on=date_col,
+        by='symbol_id',
+        direction='backward'
+    )
+    df = df.dropna(subset=[date_col])
+
+    return df.sort_values(['symbol_id', 'date']).reset_index(drop=True)
+
 #################################################################################################
 # Fetches OHLC price and technical indicators for all symbols over 
 # the specified lookback period, merging daily, weekly, and monthly indicator values
@@ -34,7 +54,8 @@ def get_base_data(
                 d.pct_price_change, 
                 d.rsi_3, d.rsi_9, d.rsi_14, 
                 d.ema_rsi_9_3, d.wma_rsi_9_21,
-                d.sma_20, d.sma_50, d.sma_200
+                d.sma_20, d.sma_50, d.sma_200,
+                d.high_252, d.low_252
             FROM {indicator_table} d
             JOIN {price_table} p
               ON p.symbol_id = d.symbol_id
@@ -62,7 +83,8 @@ def get_base_data(
             'open','high','low','close','adj_close','volume',
             'pct_price_change',
             'rsi_3','rsi_9','rsi_14','ema_rsi_9_3','wma_rsi_9_21',
-            'sma_20','sma_50','sma_200'
+            'sma_20','sma_50','sma_200',
+            'high_252','low_252'
         ]
         for col in numeric_cols:
             df_daily[col] = pd.to_numeric(df_daily[col], errors='coerce')
@@ -86,14 +108,7 @@ def get_base_data(
         df_weekly = pd.read_sql(weekly_sql, conn)
         df_weekly['weekly_date'] = pd.to_datetime(df_weekly['weekly_date'])
 
-        df_daily = df_daily.merge(df_weekly, on='symbol_id', how='left')
-        df_daily = df_daily[df_daily['weekly_date'] <= df_daily['date']]
-        df_daily = (
-            df_daily
-            .sort_values(['symbol_id','date','weekly_date'])
-            .groupby(['symbol_id','date'], as_index=False)
-            .last()
-        )
+        df_daily = align_asof(df_daily, df_weekly, 'weekly_date')
 
         # ---------------------------------------------------
         # MONTHLY indicators
@@ -114,14 +129,7 @@ def get_base_data(
         df_monthly = pd.read_sql(monthly_sql, conn)
         df_monthly['monthly_date'] = pd.to_datetime(df_monthly['monthly_date'])
 
-        df_daily = df_daily.merge(df_monthly, on='symbol_id', how='left')
-        df_daily = df_daily[df_daily['monthly_date'] <= df_daily['date']]
-        df_daily = (
-            df_daily
-            .sort_values(['symbol_id','date','monthly_date'])
-            .groupby(['symbol_id','date'], as_index=False)
-            .last()
-        )
+        df_daily = align_asof(df_daily, df_monthly, 'monthly_date')
 
         print(f"✅ FINAL BASE DATA ROWS: {len(df_daily)}")
         return df_daily
@@ -137,11 +145,14 @@ def get_base_data(
 # This function pulls weekly stock data and indicators, computes trend and momentum 
 # conditions (SMA slope, pullback to recent lows, and improving closes), and returns 
 # only those weeks where the stock shows a bullish continuation setup
+# warmup_weeks > 0 reads that many extra weeks before start_date, so the SMA / LAG / MIN
+# windows of the first weeks are complete (only weeks from start_date are returned)
 #################################################################################################
 def get_base_data_weekly(
     asset_type: str = "india_equity", 
     start_date: str | None = None, 
-    end_date: str | None = None
+    end_date: str | None = None,
+    warmup_weeks: int = 0
 ) -> pd.DataFrame:
 
     conn = get_db_connection()
@@ -164,6 +175,9 @@ def get_base_data_weekly(
         # -----------------------------
         start_date = start_date or "2000-01-01"
         end_date = end_date or "2099-12-31"
+        price_start_date = (
+            pd.Timestamp(start_date) - pd.Timedelta(weeks=warmup_weeks)
+        ).strftime("%Y-%m-%d")
 
         # -----------------------------
         # SQL query
@@ -184,7 +198,7 @@ def get_base_data_weekly(
                     ) AS sma_20
                 FROM {price_table} ep
                 WHERE ep.timeframe = '1wk'
-                AND ep.date BETWEEN '{start_date}' AND '{end_date}'
+                AND ep.date BETWEEN '{price_start_date}' AND '{end_date}'
             ),
 
             weekly_with_lags AS (
@@ -251,7 +265,8 @@ def get_base_data_weekly(
             JOIN {symbol_table} s
             ON p.{id_col} = s.{id_col}
 
-            WHERE p.close > p.sma_20
+            WHERE p.date >= '{start_date}'
+            AND p.close > p.sma_20
             AND p.low <= p.min_low_4w
             AND p.sma_20_2w_ago < p.sma_20
             AND p.close >= p.close_1w_ago
@@ -0,0 +1,195 @@
+import os
+import time
+import itertools
+import traceback
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from db.connection import get_db_connection, close_db_connection
+from services.import_export_service import export_to_csv
+from services.scanners.data_service import get_base_data, get_base_data_weekly
+from services.scanners.backtest_engine import load_price_panel, holding_period_returns
+from services.scanners.scanner_HM import hilega_milega_mask, HM_DEFAULT_PARAMS
+from services.scanners.scanner_weekly import weekly_momentum_mask, WEEKLY_DEFAULT_PARAMS
+from services.scanners.scanner_play import play_mask, PLAY_DEFAULT_PARAMS
+from config.db_table import ASSET_TABLE_MAP
+from config.paths import SCANNER_FOLDER_PARAMS
+from config.logger import log
+
+# scanner → mask function, default thresholds, base-data source and backtest rule
+# (entry / exit as in backtest_daily_scanners and backtest_weekly_scanners;
+#  hold = bars passed to holding_period_returns, "exit" = the returns column scored)
+SCANNER_RULES = {
+    "hilega_milega": {
+        "mask": hilega_milega_mask, "defaults": HM_DEFAULT_PARAMS,
+        "base": "daily", "entry": "next_open", "exit": "5d", "hold": 5,
+    },
+    "weekly": {
+        "mask": weekly_momentum_mask, "defaults": WEEKLY_DEFAULT_PARAMS,
+        "base": "weekly", "entry": "signal_open", "exit": "week_end", "hold": 1,
+    },
+    "play": {
+        "mask": play_mask, "defaults": PLAY_DEFAULT_PARAMS,
+        "base": "weekly", "entry": "signal_open", "exit": "week_end", "hold": 1,
+    },
+}
+
+# Default grids around the current thresholds (anything not listed keeps its default)
+PARAM_GRIDS = {
+    "hilega_milega": {
+        "rsi3_rsi9_min": [1.05, 1.10, 1.15, 1.20, 1.25],
+        "rsi9_ema_min": [1.00, 1.02, 1.04, 1.06],
+        "rsi3_max": [50, 60, 70],
+        "pct_change_max": [3, 5, 8],
+    },
+    "weekly": {
+        "rsi3_rsi9_min": [1.05, 1.10, 1.15, 1.20, 1.25],
+        "rsi9_ema_min": [1.00, 1.02, 1.04, 1.06],
+        "rsi3_min": [40, 50, 60],
+        "close_min": [50, 100, 200],
+    },
+}
+PARAM_GRIDS["play"] = PARAM_GRIDS["weekly"]
+
+# Per-process state, set once by _init_worker (base features + per-row forward returns)
+_WORKER = {}
+
+#################################################################################################
+def _init_worker(scanner: str, features: pd.DataFrame, returns: np.ndarray) -> None:
+    _WORKER["mask"] = SCANNER_RULES[scanner]["mask"]
+    _WORKER["features"] = features
+    _WORKER["returns"] = returns
+
+#################################################################################################
+# Evaluates a chunk of parameter sets: one boolean mask per set over the whole base frame,
+# then stats over the forward returns of the selected rows.
+#################################################################################################
+def _evaluate_chunk(param_sets: list) -> list:
+    mask_fn = _WORKER["mask"]
+    features = _WORKER["features"]
+    returns = _WORKER["returns"]
+
+    results = []
+    for params in param_sets:
+        selected = mask_fn(features, params).to_numpy(dtype=bool)
+        r = returns[selected]
+        r = r[~np.isnan(r)]
+        trades = len(r)
+        results.append({
+            **params,
+            "signals": int(selected.sum()),
+            "total_trades": trades,
+            "win_%": round(float((r > 0).sum()) / trades * 100, 2) if trades else 0.0,
+            "avg_return_%": round(float(r.mean()), 2) if trades else 0.0,
+            "total_return_%": round(float(r.sum()), 2) if trades else 0.0,
+            "max_profit_%": round(float(r.max()), 2) if trades else 0.0,
+            "max_loss_%": round(float(r.min()), 2) if trades else 0.0,
+        })
+    return results
+
+#################################################################################################
+# Grid search over scanner thresholds.
+#   1. base data and the daily price panel are loaded once
+#   2. every base row gets its forward return under the scanner's backtest rule
+#   3. parameter sets are evaluated as boolean masks, chunked across a process pool
+# Returns all parameter sets ranked by win rate, then average return
+# (sets with fewer than min_trades trades go last), and exports them to CSV.
+#################################################################################################
+def run_param_search(
+    scanner: str = "hilega_milega",
+    start_date: str = "2015-01-01",
+    end_date: str | None = None,
+    asset_type: str = "india_equity",
+    grid: dict | None = None,
+    min_trades: int = 30,
+    max_workers: int | None = None,
+    chunk_size: int = 50,
+    top_n: int = 20
+) -> pd.DataFrame:
+    if scanner not in SCANNER_RULES:
+        raise ValueError(f"Unsupported scanner: {scanner}")
+    if asset_type not in ASSET_TABLE_MAP:
+        raise ValueError(f"Unsupported asset_type: {asset_type}")
+
+    rule = SCANNER_RULES[scanner]
+    grid = grid or PARAM_GRIDS[scanner]
+    end_date = end_date or pd.Timestamp.today().strftime("%Y-%m-%d")
+    _, price_table, _, _ = ASSET_TABLE_MAP[asset_type]
+    start = time.time()
+
+    try:
+        # ---------------------------------------------------
+        # 1. Base data (once)
+        # ---------------------------------------------------
+        if rule["base"] == "daily":
+            df_base = get_base_data(start_date, end_date, asset_type)
+        else:
+            df_base = get_base_data_weekly(asset_type=asset_type, start_date=start_date, end_date=end_date)
+
+        if df_base is None or df_base.empty:
+            log(f"❌ No base data for {scanner} | {start_date} → {end_date}")
+            return pd.DataFrame()
+
+        df_base = df_base.reset_index(drop=True)
+        df_base["date"] = pd.to_datetime(df_base["date"])
+
+        # ---------------------------------------------------
+        # 2. Forward return of every base row (one panel load)
+        # ---------------------------------------------------
+        conn = get_db_connection()
+        try:
+            panel = load_price_panel(conn, price_table, df_base["symbol_id"].unique(), df_base["date"].min())
+        finally:
+            close_db_connection(conn)
+
+        returns = holding_period_returns(panel, df_base, [rule["hold"]], entry=rule["entry"])[rule["exit"]].to_numpy()
+
+        # ---------------------------------------------------
+        # 3. Grid → chunks → process pool
+        # ---------------------------------------------------
+        keys = list(grid)
+        param_sets = [
+            {**rule["defaults"], **dict(zip(keys, values))}
+            for values in itertools.product(*(grid[k] for k in keys))
+        ]
+        chunks = [param_sets[i:i + chunk_size] for i in range(0, len(param_sets), chunk_size)]
+        features = df_base.drop(columns=["yahoo_symbol", "name"], errors="ignore")
+        max_workers = max_workers or os.cpu_count() or 1
+
+        log(f"🔎 Param search | {scanner} | {len(df_base)} base rows | "
+            f"{len(param_sets)} parameter sets | {max_workers} processes")
+
+        results = []
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(scanner, features, returns)
+        ) as pool:
+            for chunk_result in pool.map(_evaluate_chunk, chunks):
+                results.extend(chunk_result)
+
+        # ---------------------------------------------------
+        # 4. Rank + export
+        # ---------------------------------------------------
+        df_results = pd.DataFrame(results)
+        df_results["eligible"] = df_results["total_trades"] >= min_trades
+        df_results = df_results.sort_values(
+            ["eligible", "win_%", "avg_return_%", "total_trades"],
+            ascending=[False, False, False, False]
+        ).reset_index(drop=True)
+        df_results.insert(0, "rank", range(1, len(df_results) + 1))
+
+        folder_path = os.path.join(SCANNER_FOLDER_PARAMS, asset_type)
+        export_to_csv(df_results, folder_path, f"param_search_{scanner}")
+
+        log(f"✅ Param search finished | {len(param_sets)} sets | {time.time() - start:.1f}s")
+        print(f"\n================= TOP {top_n} PARAMETER SETS | {scanner} =================")
+        print(df_results.head(top_n).to_string(index=False))
+        print("=" * 80 + "\n")
+
+        return df_results
+
+    except Exception as e:
+        log(f"❌ run_param_search failed | {e}")
+        traceback.print_exc()
+        return pd.DataFrame()
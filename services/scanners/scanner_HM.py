@@ -10,24 +10,45 @@ from config.logger import log
 
 LOOKBACK_DAYS = 60
 
+# Thresholds of the Hilega-Milega rules (tunable via param_search)
+HM_DEFAULT_PARAMS = {
+    "adj_close_min": 100,        # adj_close >= x
+    "rsi3_rsi9_min": 1.15,       # rsi_3 / rsi_9 >= x
+    "rsi9_ema_min": 1.04,        # rsi_9 / ema_rsi_9_3 >= x
+    "ema_wma_min": 1.0,          # ema_rsi_9_3 / wma_rsi_9_21 >= x
+    "rsi3_max": 60,              # rsi_3 < x
+    "rsi3_weekly_min": 50,       # rsi_3_weekly > x
+    "rsi3_monthly_min": 50,      # rsi_3_monthly > x
+    "pct_change_max": 5,         # pct_price_change <= x
+}
+
+#################################################################################################
+# Boolean mask of the Hilega-Milega rules for the given thresholds.
+#################################################################################################
+def hilega_milega_mask(df: pd.DataFrame, params: dict | None = None) -> pd.Series:
+    p = {**HM_DEFAULT_PARAMS, **(params or {})}
+    return (
+        (df['adj_close'] >= p["adj_close_min"]) &
+        (df['adj_close'] < df['sma_20']) &
+        (df['rsi_3'] / df['rsi_9'] >= p["rsi3_rsi9_min"]) &
+        (df['rsi_9'] / df['ema_rsi_9_3'] >= p["rsi9_ema_min"]) &
+        (df['ema_rsi_9_3'] / df['wma_rsi_9_21'] >= p["ema_wma_min"]) &
+        (df['rsi_3'] < p["rsi3_max"]) &
+        (df['rsi_3_weekly'] > p["rsi3_weekly_min"]) &
+        (df['rsi_3_monthly'] > p["rsi3_monthly_min"]) &
+        (df['pct_price_change'] <= p["pct_change_max"])
+    )
+
 #################################################################################################
 # Applies the Hilega-Milega scanner rules to base data.
 #################################################################################################
-def apply_hilega_milega_logic(df: pd.DataFrame) -> pd.DataFrame:
+def apply_hilega_milega_logic(df: pd.DataFrame, params: dict | None = None) -> pd.DataFrame:
     if df.empty:
         return df
     # Filter as per original logic
-    df_filtered = df[
-        (df['adj_close'] >= 100) &
-        (df['adj_close'] < df['sma_20']) &
-        (df['rsi_3'] / df['rsi_9'] >= 1.15) &
-        (df['rsi_9'] / df['ema_rsi_9_3'] >= 1.04) &
-        (df['ema_rsi_9_3'] / df['wma_rsi_9_21'] >= 1) &
-        (df['rsi_3'] < 60) &
-        (df['rsi_3_weekly'] > 50) &
-        (df['rsi_3_monthly'] > 50) &
-        (df['pct_price_change'] <= 5)
-    ].sort_values(['date','yahoo_symbol'], ascending=[False, True])
+    df_filtered = df[hilega_milega_mask(df, params)].sort_values(
+        ['date','yahoo_symbol'], ascending=[False, True]
+    )
 
     return df_filtered
 
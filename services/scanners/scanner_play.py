@@ -5,36 +5,55 @@ import os
 from services.cleanup_service import delete_files_in_folder
 from services.import_export_service import export_to_csv
 from services.scanners.backtest_service import (
-    backtest_weekly_scanners, 
-    backtest_daily_scanners
+    backtest_daily_scanners,
+    run_backtests_parallel
 )
 from services.scanners.data_service import get_base_data_weekly
 from config.paths import SCANNER_FOLDER_PLAY
 from config.logger import log
 
 LOOKBACK_DAYS = 365
+# Extra weeks read before the first year so SMA-20 (+2w lag) / 4w-low windows start complete
+PLAY_WARMUP_WEEKS = 26
+
+# Thresholds of the playground rules (tunable via param_search)
+PLAY_DEFAULT_PARAMS = {
+    "close_min": 100,
+    "rsi3_rsi9_min": 1.15,
+    "rsi9_ema_min": 1.04,
+    "ema_wma_min": 1.0,
+    "rsi3_min": 50,
+}
 
 #################################################################################################
-# Applies the filters on data to identify qualifying stocks.
+# Boolean mask of the playground rules for the given thresholds.
 #################################################################################################
-def apply_scanner_logic(df: pd.DataFrame) -> pd.DataFrame:
-    if df.empty:
-        return df
+def play_mask(df: pd.DataFrame, params: dict | None = None) -> pd.Series:
+    p = {**PLAY_DEFAULT_PARAMS, **(params or {})}
 
     # ---------------------------------------------------
     # CHANGE CODE
     # ---------------------------------------------------
-    df_filtered = df[
-        (df['close'] >= 100)
-        & (df['rsi_3'] / df['rsi_9'] >= 1.15)
-        & (df['rsi_9'] / df['ema_rsi_9_3'] >= 1.04)
-        & (df['ema_rsi_9_3'] / df['wma_rsi_9_21'] >= 1)
-        & (df['rsi_3'] > 50)
-    ].sort_values(['date','yahoo_symbol'], ascending=[False, True])
+    return (
+        (df['close'] >= p["close_min"])
+        & (df['rsi_3'] / df['rsi_9'] >= p["rsi3_rsi9_min"])
+        & (df['rsi_9'] / df['ema_rsi_9_3'] >= p["rsi9_ema_min"])
+        & (df['ema_rsi_9_3'] / df['wma_rsi_9_21'] >= p["ema_wma_min"])
+        & (df['rsi_3'] > p["rsi3_min"])
+    )
     # ---------------------------------------------------
     # CHANGE CODE
     # ---------------------------------------------------
 
+#################################################################################################
+# Applies the filters on data to identify qualifying stocks.
+#################################################################################################
+def apply_scanner_logic(df: pd.DataFrame, params: dict | None = None) -> pd.DataFrame:
+    if df.empty:
+        return df
+
+    df_filtered = df[play_mask(df, params)].sort_values(['date','yahoo_symbol'], ascending=[False, True])
+
     return df_filtered
 
 
@@ -104,14 +123,61 @@ def run_scanner(
         traceback.print_exc()
         return pd.DataFrame()
 
+#################################################################################################
+# Load-once mode of scanner_play_multi_years: one weekly base-data query over the whole
+# span (window stats continuous across year edges), scanner rules applied once, then the
+# signals are sliced per year in memory and written to the same per-year CSVs.
+#################################################################################################
+def run_scanner_span(
+    years: list,
+    asset_type: str = "india_equity",
+    folder_path: str | None = None,
+) -> list:
+    log("🔍 Fetching base data for the full span...")
+    df_base = get_base_data_weekly(
+                asset_type=asset_type,
+                start_date=f"{min(years)}-01-01",
+                end_date=f"{max(years)}-12-31",
+                warmup_weeks=PLAY_WARMUP_WEEKS
+            )
+
+    if df_base is None or df_base.empty:
+        log(f"❌ No base data found for {min(years)} → {max(years)}")
+        return []
+
+    log("⚙️ Applying Scanner logic...")
+    df_signals = apply_scanner_logic(df_base)
+    signal_years = pd.to_datetime(df_signals['date']).dt.year
+
+    results = []
+    for year in years:
+        print(f"\n🔹 YEAR {year}")
+        df_year = df_signals[signal_years == year].copy()
+        print(f"➡ Rows found: {len(df_year)}")
+
+        if df_year.empty:
+            log(f"⚠ No stocks met scanner criteria for year: {year}")
+            continue
+
+        path = export_to_csv(df_year, str(folder_path), str(year))
+        log(f"✅ Scanner results saved to: {path}")
+
+        df_year["year"] = year
+        results.append(df_year)
+
+    return results
+
 #################################################################################################
 # Runs the scanner year-by-year across multiple years, aggregates results, 
 # and performs backtesting on all generated signals.
+# load_once=True (default) fetches the whole span in one query (see run_scanner_span);
+# load_once=False runs one query per year as before.
 #################################################################################################
 def scanner_play_multi_years(
     start_year: str, 
     lookback_years: int,
-    asset_type: str = "india_equity"
+    asset_type: str = "india_equity",
+    load_once: bool = True
 ):
     try:
         log("🧹 Clearing scanner folder...")
@@ -119,28 +185,35 @@ def scanner_play_multi_years(
         delete_files_in_folder(folder_path)
 
         start_year_int = int(start_year)
+        years = [start_year_int - i for i in range(lookback_years)]
         all_years_results = []
 
-        for i in range(lookback_years):
-            year = start_year_int - i
-            start_date = f"{year}-01-01"
-            end_date   = f"{year}-12-31"
-
-            print(f"\n🔹 YEAR {year}")
-
-            df_year = run_scanner(
-                    start_date = start_date,
-                    end_date = end_date, 
-                    file_name=str(year), 
+        if load_once:
+            all_years_results = run_scanner_span(
+                    years=years,
                     asset_type=asset_type,
-                    folder_path = folder_path
+                    folder_path=folder_path
                 )
-            
-            print(f"➡ Rows found: {len(df_year)}")
+        else:
+            for year in years:
+                start_date = f"{year}-01-01"
+                end_date   = f"{year}-12-31"
+
+                print(f"\n🔹 YEAR {year}")
+
+                df_year = run_scanner(
+                        start_date = start_date,
+                        end_date = end_date, 
+                        file_name=str(year), 
+                        asset_type=asset_type,
+                        folder_path = folder_path
+                    )
+
+                print(f"➡ Rows found: {len(df_year)}")
 
-            if not df_year.empty:
-                df_year["year"] = year
-                all_years_results.append(df_year)
+                if not df_year.empty:
+                    df_year["year"] = year
+                    all_years_results.append(df_year)
 
         if all_years_results:
             final_df = pd.concat(all_years_results, ignore_index=True)
@@ -148,10 +221,10 @@ def scanner_play_multi_years(
         else:
             final_df = pd.DataFrame()
             print("⚠ No results across years")
-        # Weekly Scanner Backtest
-        df_backtest = backtest_weekly_scanners(asset_type=asset_type,folder_path=folder_path)
+        # Weekly Scanner Backtest (one process per year file)
+        df_backtest = run_backtests_parallel(asset_type=asset_type,folder_path=folder_path,mode="weekly")
         # Daily Scanner Backtest
-        # df_backtest = backtest_daily_scanners(asset_type=asset_type,folder_path=folder_path)
+        # df_backtest = run_backtests_parallel(asset_type=asset_type,folder_path=folder_path,mode="daily")
 
 
         return final_df
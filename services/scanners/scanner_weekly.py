@@ -10,20 +10,38 @@ from config.logger import log
 
 LOOKBACK_DAYS = 365
 
+# Thresholds of the weekly momentum rules (tunable via param_search)
+WEEKLY_DEFAULT_PARAMS = {
+    "close_min": 100,            # close >= x
+    "rsi3_rsi9_min": 1.15,       # rsi_3 / rsi_9 >= x
+    "rsi9_ema_min": 1.04,        # rsi_9 / ema_rsi_9_3 >= x
+    "ema_wma_min": 1.0,          # ema_rsi_9_3 / wma_rsi_9_21 >= x
+    "rsi3_min": 50,              # rsi_3 > x
+}
+
+#################################################################################################
+# Boolean mask of the weekly momentum rules for the given thresholds.
+#################################################################################################
+def weekly_momentum_mask(df: pd.DataFrame, params: dict | None = None) -> pd.Series:
+    p = {**WEEKLY_DEFAULT_PARAMS, **(params or {})}
+    return (
+        (df['close'] >= p["close_min"]) &
+        (df['rsi_3'] / df['rsi_9'] >= p["rsi3_rsi9_min"]) &
+        (df['rsi_9'] / df['ema_rsi_9_3'] >= p["rsi9_ema_min"]) &
+        (df['ema_rsi_9_3'] / df['wma_rsi_9_21'] >= p["ema_wma_min"]) &
+        (df['rsi_3'] > p["rsi3_min"])
+    )
+
 #################################################################################################
 # APPLY SCANNER LOGIC
 #################################################################################################
 
-def apply_scanner_logic(df: pd.DataFrame) -> pd.DataFrame:
+def apply_scanner_logic(df: pd.DataFrame, params: dict | None = None) -> pd.DataFrame:
     try:
         # Filter as per original logic
-        df_filtered = df[
-            (df['close'] >= 100) &
-            (df['rsi_3'] / df['rsi_9'] >= 1.15) &
-            (df['rsi_9'] / df['ema_rsi_9_3'] >= 1.04) &
-            (df['ema_rsi_9_3'] / df['wma_rsi_9_21'] >= 1) &
-            (df['rsi_3'] > 50)
-        ].sort_values(['date','yahoo_symbol'], ascending=[False, True])
+        df_filtered = df[weekly_momentum_mask(df, params)].sort_values(
+            ['date','yahoo_symbol'], ascending=[False, True]
+        )
 
         return df_filtered  # Return filtered signals
 
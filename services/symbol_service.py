@@ -1,96 +1,115 @@
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import traceback
 from config.logger import log
-from db.connection import get_db_connection, close_db_connection
+from db.connection import get_db_connection, close_db_connection, db_session
+from db.bulk import copy_frame
+from db.sql import (
+    SQL_SYMBOL_STAGING, SQL_SYMBOL_INSERT, SQL_SYMBOL_PATCH,
+    SQL_SYMBOL_REACTIVATE, SQL_SYMBOL_DROPPED, SQL_SYMBOL_DEACTIVATE
+)
 from config.db_table import SYMBOL_SOURCES,ASSET_TABLE_MAP
+from config.nse_constants import SYMBOL_DEACTIVATE_MAX_PCT
+
+SYMBOL_COLUMNS = ["name", "yahoo_symbol", "exchange"]
+DIFF_KEYS = ("inserted", "patched", "reactivated", "deactivated")
+
+_column_cache = {}               # (table, column) → bool, looked up once per process
 
 #################################################################################################
 # Checks whether a given column exists in a PostgreSQL table using information_schema.
+# The answer is cached per process (the schema does not change under a running refresh).
 #################################################################################################  
 def table_has_column(conn, table, column):
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_name = %s
-              AND column_name = %s
-        """, (table, column))
-        return cur.fetchone() is not None
+    key = (table, column)
+    if key not in _column_cache:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT 1
+                FROM information_schema.columns
+                WHERE table_name = %s
+                  AND column_name = %s
+            """, (table, column))
+            _column_cache[key] = cur.fetchone() is not None
+    return _column_cache[key]
+#################################################################################################
+# Reads a symbol CSV into clean (name, yahoo_symbol, exchange) rows, one per yahoo_symbol.
 #################################################################################################
-# Loads symbols from a CSV and safely inserts/updates them into one symbol table, 
-# reactivating entries if needed.
+def read_symbol_csv(csv_path) -> pd.DataFrame:
+    df = pd.read_csv(csv_path)
+    df.columns = [c.lower().strip() for c in df.columns]
+
+    required = set(SYMBOL_COLUMNS)
+    if not required.issubset(df.columns):
+        raise ValueError(
+            f"{csv_path} must have columns {required}, found {set(df.columns)}"
+        )
+
+    df = df[SYMBOL_COLUMNS].dropna()
+    df = pd.DataFrame({
+        "name": df["name"].astype(str).str.strip(),
+        "yahoo_symbol": df["yahoo_symbol"].astype(str).str.strip().str.upper(),
+        "exchange": df["exchange"].astype(str).str.strip().str.upper(),
+    })
+    df = df[df["yahoo_symbol"] != ""]
+    return df.drop_duplicates("yahoo_symbol").reset_index(drop=True)
 #################################################################################################
-def refresh_one_symbol_table(table_name: str, csv_path):
+# Loads symbols from a CSV and syncs one symbol table to it in a single transaction:
+#   1. COPY the CSV rows into a temp staging table
+#   2. insert new symbols, fill in blank name / exchange
+#   3. reactivate listed symbols, deactivate active symbols missing from the CSV
+#      (skipped when more than SYMBOL_DEACTIVATE_MAX_PCT would go — likely a truncated file)
+# Returns the diff: {inserted, patched, reactivated, deactivated} → sorted yahoo_symbols
+#################################################################################################
+def refresh_one_symbol_table(table_name: str, csv_path) -> dict:
     conn = None
+    diff = {k: [] for k in DIFF_KEYS}
     try:
         log(f"🔄 Refreshing {table_name} from {csv_path}")
-        conn = get_db_connection()
-
-        df = pd.read_csv(csv_path)
-        df.columns = [c.lower().strip() for c in df.columns]
+        df = read_symbol_csv(csv_path)
 
-        required = {"name", "yahoo_symbol", "exchange"}
-        if not required.issubset(df.columns):
-            raise ValueError(
-                f"{csv_path} must have columns {required}, found {set(df.columns)}"
-            )
+        if df.empty:
+            log(f"⚠️ No records in {csv_path}")
+            return diff
 
-        df = df[list(required)].dropna().drop_duplicates()
+        conn = get_db_connection()
+        staging_table = f"{table_name}_stage"
+        fmt = {"symbol_table": table_name, "staging_table": staging_table}
 
-        records = [
-            (
-                r["name"].strip(),
-                r["yahoo_symbol"].strip().upper(),
-                r["exchange"].strip().upper()
-            )
-            for _, r in df.iterrows()
-        ]
+        with conn.cursor() as cur:
+            cur.execute(SQL_SYMBOL_STAGING.format(**fmt))
+            copy_frame(cur, df, staging_table, SYMBOL_COLUMNS)
 
-        if not records:
-            log(f"⚠️ No records in {csv_path}")
-            return
+            cur.execute(SQL_SYMBOL_INSERT.format(**fmt))
+            diff["inserted"] = sorted(r[0] for r in cur.fetchall())
 
-        with conn.cursor() as cur:
+            cur.execute(SQL_SYMBOL_PATCH.format(**fmt))
+            diff["patched"] = sorted(r[0] for r in cur.fetchall())
 
-            # -----------------------------------------
-            # INSERT new symbols
-            # -----------------------------------------
-            cur.executemany(f"""
-                INSERT INTO {table_name} (name, yahoo_symbol, exchange)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (yahoo_symbol) DO NOTHING
-            """, records)
-
-            # -----------------------------------------
-            # UPDATE missing fields
-            # -----------------------------------------
-            cur.executemany(f"""
-                UPDATE {table_name}
-                SET
-                    name = %s,
-                    exchange = %s
-                WHERE yahoo_symbol = %s
-                  AND (
-                        name IS NULL OR name = '' OR
-                        exchange IS NULL OR exchange = ''
-                      )
-            """, [
-                (name, exchange, yahoo_symbol)
-                for name, yahoo_symbol, exchange in records
-            ])
-
-            # -----------------------------------------
-            # Reactivate if column exists
-            # -----------------------------------------
             if table_has_column(conn, table_name, "is_active"):
-                cur.executemany(
-                    f"UPDATE {table_name} SET is_active = TRUE WHERE yahoo_symbol = %s",
-                    [(r[1],) for r in records]
-                )
+                cur.execute(SQL_SYMBOL_REACTIVATE.format(**fmt))
+                diff["reactivated"] = sorted(r[0] for r in cur.fetchall())
+
+                cur.execute(SQL_SYMBOL_DROPPED.format(**fmt))
+                dropped = cur.fetchall()
+                if dropped:
+                    n_dropped, n_active = dropped[0][1], dropped[0][2]
+                    if n_dropped > n_active * SYMBOL_DEACTIVATE_MAX_PCT:
+                        log(
+                            f"⚠️ {table_name}: {n_dropped}/{n_active} active symbols missing from "
+                            f"{csv_path} — deactivation skipped"
+                        )
+                    else:
+                        cur.execute(SQL_SYMBOL_DEACTIVATE.format(**fmt), ([r[0] for r in dropped],))
+                        diff["deactivated"] = sorted(r[0] for r in cur.fetchall())
 
         conn.commit()
-        log(f"✅ {table_name}: {len(records)} symbols refreshed")
+        log(
+            f"✅ {table_name}: {len(df)} symbols refreshed | "
+            + ", ".join(f"{k}={len(diff[k])}" for k in DIFF_KEYS)
+        )
+        return diff
 
     except Exception as e:
         log(f"❌ Error refreshing {table_name}: {e}")
@@ -103,18 +122,46 @@ def refresh_one_symbol_table(table_name: str, csv_path):
         if conn:
             close_db_connection(conn)
 #################################################################################################
-# Orchestrates a full refresh of all symbol tables by iterating through configured CSV sources.
+# Orchestrates a full refresh of all symbol tables (one thread + pooled connection per CSV
+# source) and prints the per-table diff. Returns {table: diff}; failed tables are left out.
 #################################################################################################
-def refresh_symbols():
+def refresh_symbols(max_workers: int | None = None) -> dict:
     log("🚀 Starting full symbol refresh")
-
-    for table, csv_path in SYMBOL_SOURCES:
-        try:
-            refresh_one_symbol_table(table, csv_path)
-        except Exception:
-            log(f"⚠️ Skipped {table} due to error")
-
+    max_workers = max_workers or len(SYMBOL_SOURCES)
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(refresh_one_symbol_table, table, csv_path): table
+            for table, csv_path in SYMBOL_SOURCES
+        }
+        for future in as_completed(futures):
+            table = futures[future]
+            try:
+                results[table] = future.result()
+            except Exception:
+                log(f"⚠️ Skipped {table} due to error")
+
+    print_symbol_diff(results)
     log("🎯 Symbol refresh completed")
+    return results
+#################################################################################################
+# Prints the symbol refresh diff: one count line per table, then the changed symbols
+#################################################################################################
+def print_symbol_diff(results: dict, max_listed: int = 20):
+    print(f"\n{'TABLE':<24}" + "".join(f"{k.upper():>13}" for k in DIFF_KEYS))
+    for table, _ in SYMBOL_SOURCES:
+        if table not in results:
+            print(f"{table:<24}{'FAILED':>13}")
+            continue
+        print(f"{table:<24}" + "".join(f"{len(results[table][k]):>13}" for k in DIFF_KEYS))
+
+    for table, _ in SYMBOL_SOURCES:
+        for k in DIFF_KEYS:
+            symbols = results.get(table, {}).get(k, [])
+            if symbols:
+                more = f" … +{len(symbols) - max_listed}" if len(symbols) > max_listed else ""
+                print(f"  {table} {k}: {', '.join(symbols[:max_listed])}{more}")
 #################################################################################################
 # Orchestrates a full refresh of all symbol tables by iterating through configured CSV sources.
 # Retrieves symbol IDs and codes for any asset type.
@@ -194,26 +241,26 @@ def get_latest_trading_date(asset_type: str, timeframe: str = "1d"):
     if asset_type not in ASSET_TABLE_MAP:
         raise ValueError(f"Unsupported asset_type: {asset_type}")
 
-    table_name = ASSET_TABLE_MAP[asset_type][1]  # 0 = symbol table, 1 = price table
+    symbol_table, table_name = ASSET_TABLE_MAP[asset_type][0], ASSET_TABLE_MAP[asset_type][1]
 
-    conn = None
     try:
-        conn = get_db_connection()
-
-        # ------------------------------
-        # Build SQL query
-        # ------------------------------
-        # Only equity and index tables have is_active, others may not
-        use_is_active = asset_type in {"india_equity", "usa_equity", "india_index", "usa_index"}
+        with db_session() as conn:
+            # ------------------------------
+            # Build SQL query
+            # ------------------------------
+            # Only equity and index symbols are filtered on is_active
+            # (the flag lives on the symbol table, not the price table)
+            use_is_active = asset_type in {"india_equity", "usa_equity", "india_index", "usa_index"}
 
-        sql = f"SELECT MAX(date) AS latest_date FROM {table_name} WHERE timeframe = %s"
-        params = [timeframe]
+            sql = f"SELECT MAX(date) AS latest_date FROM {table_name} WHERE timeframe = %s"
+            params = [timeframe]
 
-        if use_is_active:
-            sql += " AND is_active = TRUE"
+            if use_is_active:
+                sql += f" AND symbol_id IN (SELECT symbol_id FROM {symbol_table} WHERE is_active = TRUE)"
 
-        df = pd.read_sql(sql, conn, params=params)
-        latest = df.iloc[0]["latest_date"]
+            with conn.cursor() as cur:
+                cur.execute(sql, params)
+                latest = cur.fetchone()[0]
 
         if not latest:
             return None
@@ -228,16 +275,11 @@ def get_latest_trading_date(asset_type: str, timeframe: str = "1d"):
     except Exception as e:
         log(f"❗ Error fetching latest trading date from {table_name}: {e}")
         return None
-
-    finally:
-        if conn:
-            close_db_connection(conn)
 #################################################################################################
 # Returns the latest trading date where delivery percentage (delv_pct)
 # is available for all symbols for the specified timeframe.
 #################################################################################################
 def get_latest_equity_date_no_delv(asset_type: str, timeframe: str = "1d"):
-    conn = get_db_connection()
     try:
         sql = f"""
         SELECT MAX(date) AS latest_valid_date
@@ -246,14 +288,15 @@ def get_latest_equity_date_no_delv(asset_type: str, timeframe: str = "1d"):
           AND delv_pct IS NOT NULL;
         """
 
-        # Use params with %s placeholder
-        df = pd.read_sql(sql, conn, params=[timeframe])
-        latest = df.iloc[0]["latest_valid_date"]
+        with db_session() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (timeframe,))
+                latest = cur.fetchone()[0]
 
         if not latest:
             return None
 
-        # If latest is a string, convert to date (sometimes read_sql returns string)
+        # If latest is a string, convert to date
         if isinstance(latest, str):
             return datetime.strptime(latest, "%Y-%m-%d").date()
         else:
@@ -262,6 +305,3 @@ def get_latest_equity_date_no_delv(asset_type: str, timeframe: str = "1d"):
     except Exception as e:
         log(f"❗ Error fetching latest date: {e}")
         return None
-
-    finally:
-        close_db_connection(conn)
\ No newline at end of file
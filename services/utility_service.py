@@ -1,12 +1,10 @@
 from rich.table import Table
 from rich.console import Console
-from db.connection import get_db_connection, close_db_connection
+from db.connection import db_session
 from config.db_table import DATA_TABLES
 
 def show_latest_dates():
     console = Console()
-    conn = get_db_connection()
-    cur = conn.cursor()
 
     # # Table list for all asset types
     # tables = [
@@ -33,7 +31,7 @@ def show_latest_dates():
     table.add_column("1WK", justify="center")
     table.add_column("1MO", justify="center")
 
-    try:
+    with db_session() as conn, conn.cursor() as cur:
         for tbl in DATA_TABLES:
             sql = f"""
                 SELECT
@@ -51,8 +49,4 @@ def show_latest_dates():
 
             table.add_row(tbl, d1, d1w, d1m)
 
-        console.print(table)
-
-    finally:
-        cur.close()
-        close_db_connection(conn)
\ No newline at end of file
+    console.print(table)
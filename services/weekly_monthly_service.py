@@ -1,94 +1,279 @@
+import traceback
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from psycopg2.extras import execute_values
 from db.connection import get_db_connection, close_db_connection
+from db.bulk import frame_to_records
 from config.logger import log
 from config.db_table import ASSET_TABLE_MAP
 
 #################################################################################################
 # Refresh 52-week high/low stats for any asset in ASSET_TABLE_MAP (PostgreSQL version)
+# One server-side INSERT ... SELECT ... GROUP BY ... ON CONFLICT per asset:
+#   mode = "full" → every symbol with daily bars in the last year
+#   mode = "incr" → only symbols with bars dated on/after their stats as_of_date,
+#                   plus symbols that have no stats row yet
 #################################################################################################
-def refresh_week52_high_low_stats(asset_key: str):
+WEEK52_MODES = ("full", "incr")
+
+
+def refresh_week52_high_low_stats(asset_key: str, mode: str = "full") -> int:
     """
     asset_key: key from ASSET_TABLE_MAP, e.g., 'india_equity', 'crypto', 'forex'
+    Returns the number of stats rows written.
     """
     if asset_key not in ASSET_TABLE_MAP:
         log(f"❌ Unknown asset_key: {asset_key}")
-        return
+        return 0
+    if mode not in WEEK52_MODES:
+        raise ValueError("mode must be 'full' or 'incr'")
 
     symbol_table, price_table, _, stats_table = ASSET_TABLE_MAP[asset_key]
-    col_id = "symbol_id"  # all tables use symbol_id
+
+    if mode == "incr":
+        symbol_filter = f"""
+              AND p.symbol_id IN (
+                  SELECT p2.symbol_id
+                  FROM {price_table} p2
+                  JOIN {stats_table} st ON st.symbol_id = p2.symbol_id
+                  WHERE p2.timeframe = '1d' AND p2.date >= st.as_of_date
+                  UNION
+                  SELECT sy.symbol_id
+                  FROM {symbol_table} sy
+                  WHERE NOT EXISTS (SELECT 1 FROM {stats_table} st WHERE st.symbol_id = sy.symbol_id)
+              )"""
+    else:
+        symbol_filter = ""
+
+    sql = f"""
+        INSERT INTO {stats_table} (symbol_id, week52_high, week52_low, as_of_date)
+        SELECT p.symbol_id, MAX(p.high), MIN(p.low), CURRENT_DATE
+        FROM {price_table} p
+        WHERE p.timeframe = '1d'
+          AND p.date >= CURRENT_DATE - INTERVAL '1 year'{symbol_filter}
+        GROUP BY p.symbol_id
+        HAVING MAX(p.high) IS NOT NULL
+        ON CONFLICT (symbol_id) DO UPDATE SET
+            week52_high = EXCLUDED.week52_high,
+            week52_low  = EXCLUDED.week52_low,
+            as_of_date  = EXCLUDED.as_of_date
+    """
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            log(f"📊 Updating 52W stats for {price_table} | mode={mode}")
+            cur.execute(sql)
+            rows = cur.rowcount
+        conn.commit()
+
+        log(f"✅ {stats_table}: Updated {rows} rows")
+        return rows
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        log(f"❌ 52W update failed for {asset_key}: {e}")
+        traceback.print_exc()
+        return 0
+
+    finally:
+        if conn:
+            close_db_connection(conn)
+
+
+#################################################################################################
+# Refresh all 52-week stats for all assets (one thread + pooled connection per asset)
+#################################################################################################
+def refresh_all_week52_stats(mode: str = "full", max_workers: int | None = None) -> dict:
+    asset_keys = list(ASSET_TABLE_MAP.keys())
+    max_workers = max_workers or len(asset_keys)
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(refresh_week52_high_low_stats, asset_key, mode): asset_key
+            for asset_key in asset_keys
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    log(f"✅ 52W stats refreshed | {mode} | " + ", ".join(f"{k}={results[k]}" for k in asset_keys))
+    return results
+
+#################################################################################################
+# Period anchors used for derived bars:
+# - '1wk' → Monday of the week
+# - '1mo' → 1st of the month
+#################################################################################################
+PERIOD_TIMEFRAMES = ("1wk", "1mo")
+BAR_COLUMNS = ["symbol_id", "date", "open", "high", "low", "close", "adj_close", "volume"]
+
+
+def period_start(dates: pd.Series, timeframe: str) -> pd.Series:
+    dates = pd.to_datetime(dates)
+    if timeframe == "1wk":
+        return dates.dt.normalize() - pd.to_timedelta(dates.dt.weekday, unit="D")
+    if timeframe == "1mo":
+        return dates.dt.to_period("M").dt.start_time
+    raise ValueError(f"Unsupported timeframe: {timeframe}")
+
+
+#################################################################################################
+# Vectorized OHLCV resampling of daily bars (many symbols at once) into weekly or monthly bars.
+# Input columns: symbol_id, date, open, high, low, close, adj_close, volume
+# Output: one row per (symbol_id, period start) dated on the period anchor.
+#################################################################################################
+def resample_daily_bars(df_daily: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    if df_daily.empty:
+        return pd.DataFrame(columns=BAR_COLUMNS)
+
+    df = df_daily.sort_values(["symbol_id", "date"]).copy()
+    df["period"] = period_start(df["date"], timeframe)
+
+    bars = (
+        df.groupby(["symbol_id", "period"], sort=True)
+        .agg(
+            open=("open", "first"),
+            high=("high", "max"),
+            low=("low", "min"),
+            close=("close", "last"),
+            adj_close=("adj_close", "last"),
+            volume=("volume", "sum"),
+        )
+        .reset_index()
+        .rename(columns={"period": "date"})
+    )
+    bars["date"] = bars["date"].dt.date
+    return bars[BAR_COLUMNS]
+
+
+#################################################################################################
+# Builds weekly (Monday-anchored) and monthly (1st-of-month) bars from the stored daily bars
+# in <asset>_price_data and upserts them, replacing the Yahoo 1wk/1mo downloads.
+#   mode = "full" → rebuild every period from all daily history
+#   mode = "incr" → rebuild only the periods containing `since` and later
+#                   (since defaults to the latest stored daily date)
+#   symbol_ids     → limit the rebuild to these symbols (e.g. after a re-adjusted history)
+#################################################################################################
+def build_weekly_monthly_bars(
+    asset_type: str,
+    mode: str = "full",
+    since=None,
+    timeframes=PERIOD_TIMEFRAMES,
+    block_size: int = 500,
+    symbol_ids=None
+):
+    if asset_type not in ASSET_TABLE_MAP:
+        log(f"❌ Unknown asset_type: {asset_type}")
+        return
+    if mode not in ("full", "incr"):
+        raise ValueError("mode must be 'full' or 'incr'")
+
+    _, price_table, _, _ = ASSET_TABLE_MAP[asset_type]
+    conn = None
 
     try:
         conn = get_db_connection()
         cur = conn.cursor()
-        log(f"📊 Updating 52W stats for {price_table}")
+        log(f"🧮 Deriving {', '.join(timeframes)} bars for {price_table} | mode={mode}")
 
         # -----------------------------
-        # Get all symbols with daily data
+        # Period starts to rebuild
         # -----------------------------
-        cur.execute(f"""
-            SELECT DISTINCT {col_id}
-            FROM {price_table}
-            WHERE timeframe = '1d'
-        """)
-        ids = [r[0] for r in cur.fetchall()]
-        if not ids:
-            log(f"⚠ No daily data found in {price_table}, skipping")
-            return
+        starts = {}
+        if mode == "incr":
+            if since is None:
+                cur.execute(f"SELECT MAX(date) FROM {price_table} WHERE timeframe = '1d'")
+                since = cur.fetchone()[0]
+            if since is None:
+                log(f"⚠ No daily data in {price_table}, skipping")
+                return
+            since_ts = pd.Series([pd.to_datetime(since)])
+            starts = {tf: period_start(since_ts, tf).iloc[0] for tf in timeframes}
+            load_from = min(starts.values()).date()
+            log(f"   Rebuilding periods from {load_from}")
 
         # -----------------------------
-        # Fetch 52-week high/low
+        # Symbols with daily data
         # -----------------------------
-        placeholders = ','.join(['%s'] * len(ids))
-        cur.execute(f"""
-            SELECT {col_id}, MAX(high), MIN(low)
-            FROM {price_table}
-            WHERE timeframe = '1d'
-              AND {col_id} IN ({placeholders})
-              AND date >= CURRENT_DATE - INTERVAL '1 year'
-            GROUP BY {col_id}
-        """, ids)
-
-        results = [(sid, high, low) for sid, high, low in cur.fetchall() if high is not None]
-        if not results:
-            log(f"⚠ No 52W data found in {price_table}")
+        if mode == "incr":
+            cur.execute(f"""
+                SELECT DISTINCT symbol_id FROM {price_table}
+                WHERE timeframe = '1d' AND date >= %s
+            """, (load_from,))
+        else:
+            cur.execute(f"SELECT DISTINCT symbol_id FROM {price_table} WHERE timeframe = '1d'")
+        ids = sorted(r[0] for r in cur.fetchall())
+        if symbol_ids is not None:
+            wanted = set(symbol_ids)
+            ids = [i for i in ids if i in wanted]
+        if not ids:
+            log(f"⚠ No daily data found in {price_table}, skipping")
             return
 
+        upsert_sql = f"""
+            INSERT INTO {price_table}
+            (symbol_id, timeframe, date, open, high, low, close, adj_close, volume)
+            VALUES %s
+            ON CONFLICT (symbol_id, timeframe, date)
+            DO UPDATE SET
+                open      = EXCLUDED.open,
+                high      = EXCLUDED.high,
+                low       = EXCLUDED.low,
+                close     = EXCLUDED.close,
+                adj_close = EXCLUDED.adj_close,
+                volume    = EXCLUDED.volume
+        """
+
+        totals = {tf: 0 for tf in timeframes}
+
         # -----------------------------
-        # UPSERT into stats table
+        # Process symbols in blocks
         # -----------------------------
-        for sid, high52, low52 in results:
-            cur.execute(f"""
-                INSERT INTO {stats_table} (
-                    {col_id}, week52_high, week52_low, as_of_date
+        for i in range(0, len(ids), block_size):
+            block = ids[i:i + block_size]
+
+            sql = f"""
+                SELECT symbol_id, date, open, high, low, close, adj_close, volume
+                FROM {price_table}
+                WHERE timeframe = '1d' AND symbol_id = ANY(%s)
+            """
+            params = [block]
+            if mode == "incr":
+                sql += " AND date >= %s"
+                params.append(load_from)
+
+            df_daily = pd.read_sql(sql, conn, params=params)
+            if df_daily.empty:
+                continue
+
+            for tf in timeframes:
+                bars = resample_daily_bars(df_daily, tf)
+                if mode == "incr":
+                    bars = bars[pd.to_datetime(bars["date"]) >= starts[tf]]
+                if bars.empty:
+                    continue
+
+                bars.insert(1, "timeframe", tf)
+                records = frame_to_records(
+                    bars,
+                    ["symbol_id", "timeframe", "date", "open", "high", "low", "close", "adj_close", "volume"]
                 )
-                VALUES (%s, %s, %s, CURRENT_DATE)
-                ON CONFLICT ({col_id}) DO UPDATE SET
-                    week52_high = EXCLUDED.week52_high,
-                    week52_low  = EXCLUDED.week52_low,
-                    as_of_date  = EXCLUDED.as_of_date
-            """, (sid, high52, low52))
+                execute_values(cur, upsert_sql, records, page_size=5000)
+                totals[tf] += len(records)
 
-        conn.commit()
-        log(f"✅ {stats_table}: Updated {len(results)} rows")
+            conn.commit()
+
+        log(f"✅ {price_table}: derived bars " + ", ".join(f"{tf}={n}" for tf, n in totals.items()))
 
     except Exception as e:
         if conn:
             conn.rollback()
-        log(f"❌ 52W update failed for {asset_key}: {e}")
-        import traceback; traceback.print_exc()
+        log(f"❌ Derived bar build failed for {asset_type}: {e}")
+        traceback.print_exc()
 
     finally:
-        try:
-            if cur:
-                cur.close()
-        except:
-            pass
         if conn:
             close_db_connection(conn)
-
-
-#################################################################################################
-# Refresh all 52-week stats for all assets
-#################################################################################################
-def refresh_all_week52_stats():
-    for asset_key in ASSET_TABLE_MAP.keys():
-        refresh_week52_high_low_stats(asset_key)
\ No newline at end of file
@@ -3,16 +3,17 @@ import traceback
 from datetime import datetime, date, timedelta
 import yfinance as yf
 import pandas as pd
-from tqdm import tqdm
 from config.logger import log
 from config.paths import YAHOO_DIR
-from config.nse_constants import FREQUENCIES
+from config.nse_constants import (
+    FREQUENCIES, YAHOO_BATCH_SIZE, YAHOO_MAX_WORKERS,
+    YAHOO_RATE_PER_SEC, YAHOO_MAX_RETRIES, YAHOO_BACKOFF_BASE, YAHOO_TIMEOUT
+)
 from db.connection import get_db_connection, close_db_connection
 from config.db_table import ASSET_TABLE_MAP  # use this
+from services.download_executor import run_downloads
+from services.calendar_service import get_calendar
 
-SKIP_MONTHLY = (date.today().day != 1)
-today_weekday = datetime.now().weekday()
-SKIP_WEEKLY = today_weekday != 0   # Monday = 0
 
 
 # ============================================================
@@ -22,7 +23,10 @@ def download_yahoo_data_all_timeframes(
     asset_type,
     symbols="ALL",          # "ALL" or "AAPL,MSFT"
     mode="full",           # "full" | "incr"
-    latest_dt=None         # required if mode="incr"
+    latest_dt=None,        # required if mode="incr"
+    batch_size=YAHOO_BATCH_SIZE,  # tickers per yf.download call
+    max_workers=YAHOO_MAX_WORKERS,# concurrent download threads (batch_size=1 only)
+    timeframes=FREQUENCIES        # e.g. ["1d"] when 1wk/1mo are derived locally
 ):
     conn = None
     failed_symbols = []  # Track all failures
@@ -48,11 +52,20 @@ def download_yahoo_data_all_timeframes(
         if mode not in ("full", "incr"):
             raise ValueError("mode must be 'full' or 'incr'")
 
+        start_date = end_date = None
+
         if mode == "incr":
             if not latest_dt:
                 raise ValueError("latest_dt is required for incremental mode")
             start_date = pd.to_datetime(latest_dt).date() + timedelta(days=1)
             end_date = (datetime.today() + timedelta(days=1)).strftime("%Y-%m-%d")
+
+            # Nothing to fetch until the market has a session after latest_dt
+            next_session = get_calendar(asset_type).next_session(pd.to_datetime(latest_dt).date())
+            if next_session is None or next_session > date.today():
+                log(f"✔ No {asset_type} session after {latest_dt}, skipping download")
+                print(f"\n✔ No new {asset_type.upper()} session since {latest_dt}, nothing to download")
+                return
             log(f"Incremental download from {start_date} → {end_date}")
 
         # -------------------------------
@@ -80,59 +93,88 @@ def download_yahoo_data_all_timeframes(
 
         log(f"📌 {len(rows)} symbols loaded for {asset_type}")
 
+        # -------------------------------
+        # DOWNLOAD SYMBOL → CSV NAME MAP
+        # -------------------------------
+        symbol_map = {}
+        for symbol_id, yahoo_symbol in rows:
+            download_symbol = yahoo_symbol
+
+            # NSE adjustment
+            if asset_type == "india_equity" and not yahoo_symbol.endswith(".NS"):
+                download_symbol = f"{yahoo_symbol}.NS"
+
+            symbol_map[download_symbol] = yahoo_symbol
+
+        download_symbols = list(symbol_map.keys())
+        batch_size = max(1, int(batch_size or 1))
+        batches = [
+            download_symbols[i:i + batch_size]
+            for i in range(0, len(download_symbols), batch_size)
+        ]
+        log(f"📦 {len(batches)} batches of up to {batch_size} symbols per timeframe")
+
+        # yf.download keeps its results in module-level state, so multi-ticker
+        # batches cannot run side by side; they fan out via yfinance's own threads.
+        # Single-symbol units go through yf.Ticker and can use the thread pool.
+        if batch_size > 1 and max_workers > 1:
+            log("ℹ Batched mode: running batches one at a time (max_workers=1)")
+            max_workers = 1
+
         # -------------------------------
         # PROCESS ALL TIMEFRAMES
         # -------------------------------
-        for timeframe in FREQUENCIES:
+        for timeframe in timeframes:
             timeframe_path = os.path.join(YAHOO_DIR, timeframe)
             os.makedirs(timeframe_path, exist_ok=True)
 
             print(f"\nDownloading {asset_type.upper()} | timeframe: {timeframe}")
 
-            for symbol_id, yahoo_symbol in tqdm(rows, desc=f"{timeframe}", ncols=100):
-                download_symbol = yahoo_symbol
-
-                # NSE adjustment
-                if asset_type == "india_equity" and not yahoo_symbol.endswith(".NS"):
-                    download_symbol = f"{yahoo_symbol}.NS"
-
-                csv_path = os.path.join(timeframe_path, f"{yahoo_symbol}.csv")
-
-                try:
-                    if mode == "full":
-                        df = yf.download(
-                            download_symbol,
-                            period="max",
-                            interval=timeframe,
-                            auto_adjust=False,
-                            progress=False
-                        )
-                    else:
-                        df = yf.download(
-                            download_symbol,
-                            start=start_date,
-                            end=end_date,
-                            interval=timeframe,
-                            auto_adjust=False,
-                            progress=False
-                        )
+            def fetch(batch, timeout=None, timeframe=timeframe):
+                return download_yahoo_batch(
+                    batch,
+                    timeframe=timeframe,
+                    mode=mode,
+                    start_date=start_date,
+                    end_date=end_date,
+                    timeout=timeout
+                )
+
+            results, failed_batches = run_downloads(
+                batches,
+                fetch,
+                max_workers=max_workers,
+                rate_per_sec=YAHOO_RATE_PER_SEC,
+                max_retries=YAHOO_MAX_RETRIES,
+                backoff_base=YAHOO_BACKOFF_BASE,
+                timeout=YAHOO_TIMEOUT,
+                cost_fn=len,
+                desc=f"{timeframe}"
+            )
+
+            for batch in failed_batches:
+                log(f"Download failed: batch of {len(batch)} | {timeframe}")
+                failed_symbols.extend(batch)
+
+            # -------------------------------
+            # SPLIT BATCH → ONE CSV PER SYMBOL
+            # -------------------------------
+            for batch, frames in results:
+                for download_symbol in batch:
+                    df = frames.get(download_symbol)
 
                     if df is None or df.empty:
                         log(f"No data downloaded: {download_symbol} | {timeframe}")
                         failed_symbols.append(download_symbol)
                         continue
 
-                    # Fix MultiIndex columns if present
-                    if isinstance(df.columns, pd.MultiIndex):
-                        df.columns = df.columns.droplevel(1)
-
-                    df.reset_index(inplace=True)
-                    df.to_csv(csv_path, index=False)
-
-                except Exception as e:
-                    log(f"Download failed: {download_symbol} | {timeframe} | {e}")
-                    traceback.print_exc()
-                    failed_symbols.append(download_symbol)
+                    try:
+                        csv_path = os.path.join(timeframe_path, f"{symbol_map[download_symbol]}.csv")
+                        df = df.reset_index()
+                        df.to_csv(csv_path, index=False)
+                    except Exception as e:
+                        log(f"Save failed: {download_symbol} | {timeframe} | {e}")
+                        failed_symbols.append(download_symbol)
 
         # -------------------------------
         # LOG ALL FAILED SYMBOLS AT END
@@ -151,4 +193,82 @@ def download_yahoo_data_all_timeframes(
 
     finally:
         if conn:
-            close_db_connection(conn)
\ No newline at end of file
+            close_db_connection(conn)
+
+
+# ============================================================
+# Downloads one group of tickers with a single Yahoo call
+# and splits the result into {download_symbol: DataFrame}.
+# Symbols missing from the result (or all-NaN) are simply absent
+# from the returned dict so the caller can mark them as failed.
+# ============================================================
+def download_yahoo_batch(
+    tickers,
+    timeframe,
+    mode="full",
+    start_date=None,
+    end_date=None,
+    timeout=None
+):
+    kwargs = {
+        "interval": timeframe,
+        "auto_adjust": False,
+        "progress": False,
+    }
+    if mode == "full":
+        kwargs["period"] = "max"
+    else:
+        kwargs["start"] = start_date
+        kwargs["end"] = end_date
+
+    # -------------------------------
+    # SINGLE TICKER → yf.Ticker (no shared module state, thread-safe)
+    # -------------------------------
+    if len(tickers) == 1:
+        history_kwargs = {k: v for k, v in kwargs.items() if k != "progress"}
+        df = yf.Ticker(tickers[0]).history(actions=False, timeout=timeout, **history_kwargs)
+        if df is None or df.empty:
+            return {}
+
+        # Match yf.download output: naive dates, "Date" index
+        if getattr(df.index, "tz", None) is not None:
+            df.index = df.index.tz_localize(None)
+        df.index.name = "Date"
+        return {tickers[0]: df}
+
+    # -------------------------------
+    # MULTI TICKER → (ticker, field) columns
+    # -------------------------------
+    df = yf.download(list(tickers), group_by="ticker", threads=True, timeout=timeout, **kwargs)
+    if df is None or df.empty:
+        return {}
+
+    return split_multi_ticker_frame(df, tickers)
+
+
+# ============================================================
+# Splits a group_by="ticker" yf.download frame into per-symbol
+# frames, dropping the padding rows of dates a ticker never traded.
+# ============================================================
+def split_multi_ticker_frame(df, tickers):
+    frames = {}
+
+    if not isinstance(df.columns, pd.MultiIndex):
+        # yfinance collapsed the frame (only one ticker returned data)
+        if len(tickers) == 1:
+            frames[tickers[0]] = df
+        return frames
+
+    available = set(df.columns.get_level_values(0))
+    for ticker in tickers:
+        if ticker not in available:
+            continue
+
+        sub = df[ticker].dropna(how="all")
+        if sub.empty:
+            continue
+
+        sub.columns.name = None
+        frames[ticker] = sub
+
+    return frames
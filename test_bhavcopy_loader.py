@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("requests")
+
+from services.bhavcopy_loader import bhavcopy_symbol_map, build_bhavcopy_bars, find_bhavcopy_adjustments
+from services.calendar_service import TradingCalendar
+
+# =====================================================
+# FIXTURES
+# =====================================================
+HEADER = (
+    "SYMBOL, SERIES, DATE1, PREV_CLOSE, OPEN_PRICE, HIGH_PRICE, LOW_PRICE, LAST_PRICE, CLOSE_PRICE, "
+    "AVG_PRICE, TTL_TRD_QNTY, TURNOVER_LACS, NO_OF_TRADES, DELIV_QTY, DELIV_PER\n"
+)
+SYMBOLS = pd.DataFrame({"symbol_id": [1, 2], "yahoo_symbol": ["ABC.NS", "XYZ.NS"]})
+# Stored close of the session before the first file (Fri 03-Jan-2025)
+LAST_CLOSE = pd.DataFrame({"symbol_id": [1, 2], "date": pd.to_datetime(["2025-01-03"] * 2).date, "close": [100.0, 50.0]})
+NSE = TradingCalendar("NSE", pd.bdate_range("2025-01-01", "2025-01-31"), "2025-01-01", "2025-01-31")
+
+def write_bhavcopy(folder, day, rows):
+    """rows: (symbol, prev_close, close)"""
+    path = folder / f"sec_bhavdata_full_{pd.Timestamp(day).strftime('%d%m%Y')}.csv"
+    label = pd.Timestamp(day).strftime("%d-%b-%Y")
+    path.write_text(HEADER + "".join(
+        f"{sym}, EQ, {label}, {prev:.2f}, {close}, {close}, {close}, {close}, {close:.2f}, 0, 100, 0, 0, 0, 50\n"
+        for sym, prev, close in rows
+    ))
+    return str(path)
+
+def adjustments(files):
+    bars = build_bhavcopy_bars(files, bhavcopy_symbol_map(SYMBOLS))
+    return find_bhavcopy_adjustments(bars, LAST_CLOSE, calendar=NSE)
+
+# =====================================================
+# TESTS
+# =====================================================
+def test_missing_session_is_not_a_corporate_action(tmp_path):
+    # 07-Jan is not loaded (failed download): 08-Jan PREV_CLOSE is the 07-Jan close
+    files = [
+        write_bhavcopy(tmp_path, "2025-01-06", [("ABC", 100.0, 104.0), ("XYZ", 50.0, 51.0)]),
+        write_bhavcopy(tmp_path, "2025-01-08", [("ABC", 110.0, 111.0), ("XYZ", 47.0, 46.0)]),
+    ]
+    assert adjustments(files) == []
+
+def test_gap_after_stored_close_is_not_compared(tmp_path):
+    # The first file is two sessions after the last stored close
+    files = [write_bhavcopy(tmp_path, "2025-01-07", [("ABC", 108.0, 109.0), ("XYZ", 50.0, 51.0)])]
+    assert adjustments(files) == []
+
+def test_restated_prev_close_on_consecutive_sessions_is_flagged(tmp_path):
+    # ABC 1:2 split on 07-Jan: PREV_CLOSE restated to half the 06-Jan close
+    files = [
+        write_bhavcopy(tmp_path, "2025-01-06", [("ABC", 100.0, 104.0), ("XYZ", 50.0, 51.0)]),
+        write_bhavcopy(tmp_path, "2025-01-07", [("ABC", 52.0, 53.0), ("XYZ", 51.0, 52.0)]),
+    ]
+    assert adjustments(files) == [1]
+
+def test_restated_prev_close_against_stored_close_is_flagged(tmp_path):
+    files = [write_bhavcopy(tmp_path, "2025-01-06", [("ABC", 100.0, 101.0), ("XYZ", 25.0, 26.0)])]
+    assert adjustments(files) == [2]
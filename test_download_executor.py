@@ -0,0 +1,71 @@
+import time
+import threading
+from services.download_executor import TokenBucket, run_downloads
+
+# =====================================================
+# CONFIG
+# =====================================================
+RATE = 40.0          # tokens (tickers) per second
+BATCH_SIZE = 60      # tickers per batch: larger than the default bucket (capacity = RATE)
+BATCHES = 3
+TOLERANCE = 1.05     # allowed overshoot of the configured rate
+
+# =====================================================
+# HELPERS
+# =====================================================
+def timed_batches(batches, rate_per_sec, max_workers):
+    starts = []
+    lock = threading.Lock()
+
+    def fetch(batch, timeout=None):
+        with lock:
+            starts.append(time.monotonic())
+        return len(batch)
+
+    results, failed = run_downloads(
+        batches, fetch, max_workers=max_workers, rate_per_sec=rate_per_sec, cost_fn=len, desc="test"
+    )
+    return sorted(starts), results, failed
+
+def effective_rate(starts, batch_size):
+    """Tickers paid for before the last start, per second (the first batch rides the full bucket)."""
+    return (len(starts) - 1) * batch_size / (starts[-1] - starts[0])
+
+# =====================================================
+# TESTS
+# =====================================================
+def test_batched_downloads_respect_per_ticker_rate():
+    batches = [[f"T{b}_{i}" for i in range(BATCH_SIZE)] for b in range(BATCHES)]
+    starts, results, failed = timed_batches(batches, RATE, max_workers=BATCHES)
+
+    assert len(results) == BATCHES and not failed
+    rate = effective_rate(starts, BATCH_SIZE)
+    assert rate <= RATE * TOLERANCE, f"{rate:.1f} tickers/s against a limit of {RATE}"
+
+def test_bucket_charges_full_cost_above_capacity():
+    bucket = TokenBucket(rate=100.0, capacity=10)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire(50)
+    elapsed = time.monotonic() - start
+    # Each acquire after the first waits for the previous 50 tokens to be refilled
+    assert elapsed >= 3 * 50 / 100.0 / TOLERANCE, f"{elapsed:.2f}s"
+
+def test_small_requests_are_not_delayed():
+    bucket = TokenBucket(rate=100.0)
+    start = time.monotonic()
+    for _ in range(50):
+        bucket.acquire(1)
+    assert time.monotonic() - start < 0.1
+
+# =====================================================
+# MAIN
+# =====================================================
+if __name__ == "__main__":
+    for test in (
+        test_batched_downloads_respect_per_ticker_rate,
+        test_bucket_charges_full_cost_above_capacity,
+        test_small_requests_are_not_delayed,
+    ):
+        test()
+        print(f"✔ {test.__name__}")